@@ -13,13 +13,17 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/4/6 14:21
 # @Desc    : 异步Aiomysql的增删改查封装
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Tuple, Union
 
 import aiomysql
 
+from async_db_batch import AsyncBatchWriteMixin
+
+
+class AsyncMysqlDB(AsyncBatchWriteMixin):
 
-class AsyncMysqlDB:
     def __init__(self, pool: aiomysql.Pool) -> None:
+        super().__init__()
         self.__pool = pool
 
     async def query(self, sql: str, *args: Union[str, int]) -> List[Dict[str, Any]]:
@@ -105,3 +109,16 @@ class AsyncMysqlDB:
             async with conn.cursor() as cur:
                 rows = await cur.execute(sql, args)
                 return rows
+
+    def _upsert_clause(self, key_fields: Tuple[str, ...], update_fields: List[str]) -> str:
+        if not update_fields:
+            # 没有可更新的字段时用一个无副作用的赋值，使重复的行被忽略
+            update_fields = [key_fields[0]]
+        updatestr = ','.join(f'`{field}`=VALUES(`{field}`)' for field in update_fields)
+        return f"ON DUPLICATE KEY UPDATE {updatestr}"
+
+    async def _execute_chunk(self, sql: str, rows: List[List[Any]]) -> int:
+        async with self.__pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                # aiomysql 会把 INSERT ... VALUES 的 executemany 改写成一条多行 VALUES 语句
+                return await cur.executemany(sql, rows)
@@ -0,0 +1,110 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : MySQL / SQLite 封装共用的批量写入逻辑，两种数据库只在占位符、upsert 子句和分片执行方式上不同
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+
+class AsyncBatchWriteMixin:
+    # 批量写入时每个分片的最大行数，MySQL 避免超过 max_allowed_packet，SQLite 避免长时间占用写锁
+    BATCH_CHUNK_SIZE = 500
+    # SQL 参数占位符
+    PLACEHOLDER = "%s"
+
+    def __init__(self) -> None:
+        # 按 (类型, 表名, 字段集合, ...) 缓存生成好的SQL模板
+        self._sql_cache: Dict[Tuple, str] = {}
+
+    def _upsert_clause(self, key_fields: Tuple[str, ...], update_fields: List[str]) -> str:
+        """
+        INSERT 语句后追加的冲突处理子句
+        :param key_fields: 唯一键字段
+        :param update_fields: 冲突时需要更新的字段，可能为空
+        :return:
+        """
+        raise NotImplementedError
+
+    async def _execute_chunk(self, sql: str, rows: List[List[Any]]) -> int:
+        """
+        执行一个分片的 executemany
+        :param sql:
+        :param rows: 不超过 BATCH_CHUNK_SIZE 行的参数
+        :return: 影响的行数
+        """
+        raise NotImplementedError
+
+    def _insert_sql(self, table_name: str, fields: Tuple[str, ...]) -> str:
+        cache_key = ("insert", table_name, fields)
+        sql = self._sql_cache.get(cache_key)
+        if sql is None:
+            fieldstr = ','.join(f'`{field}`' for field in fields)
+            valstr = ','.join([self.PLACEHOLDER] * len(fields))
+            # VALUES 后的空格不能省略，aiomysql 依赖它识别可改写为多行 VALUES 的语句
+            sql = f"INSERT INTO {table_name} ({fieldstr}) VALUES ({valstr})"
+            self._sql_cache[cache_key] = sql
+        return sql
+
+    def _upsert_sql(self, table_name: str, fields: Tuple[str, ...], key_fields: Tuple[str, ...],
+                    insert_only_fields: Tuple[str, ...]) -> str:
+        cache_key = ("upsert", table_name, fields, key_fields, insert_only_fields)
+        sql = self._sql_cache.get(cache_key)
+        if sql is None:
+            update_fields = [f for f in fields if f not in key_fields and f not in insert_only_fields]
+            sql = f"{self._insert_sql(table_name, fields)} {self._upsert_clause(key_fields, update_fields)}"
+            self._sql_cache[cache_key] = sql
+        return sql
+
+    @staticmethod
+    def _group_by_fields(items: Sequence[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[List[Any]]]:
+        """
+        按字段集合对记录分组，同一组的记录可以复用同一条SQL模板
+        """
+        groups: Dict[Tuple[str, ...], List[List[Any]]] = {}
+        for item in items:
+            fields = tuple(item.keys())
+            groups.setdefault(fields, []).append([item[field] for field in fields])
+        return groups
+
+    async def _executemany(self, sql: str, rows: List[List[Any]]) -> int:
+        effect_rows = 0
+        for start in range(0, len(rows), self.BATCH_CHUNK_SIZE):
+            effect_rows += await self._execute_chunk(sql, rows[start:start + self.BATCH_CHUNK_SIZE])
+        return effect_rows
+
+    async def items_to_table(self, table_name: str, items: Sequence[Dict[str, Any]]) -> int:
+        """
+        表中批量插入数据
+        :param table_name: 表名
+        :param items: 多条记录的字典信息
+        :return: 影响的行数
+        """
+        effect_rows = 0
+        for fields, rows in self._group_by_fields(items).items():
+            effect_rows += await self._executemany(self._insert_sql(table_name, fields), rows)
+        return effect_rows
+
+    async def upsert_many(self, table_name: str, items: Sequence[Dict[str, Any]], key: Union[str, Sequence[str]],
+                          insert_only_fields: Sequence[str] = ("add_ts",)) -> int:
+        """
+        批量插入或更新数据，依赖表上 key 对应的唯一索引，冲突处理子句由 _upsert_clause 按数据库生成
+        :param table_name: 表名
+        :param items: 多条记录的字典信息
+        :param key: 唯一键字段名，联合唯一键传字段列表
+        :param insert_only_fields: 只在插入时写入、更新时保留原值的字段
+        :return: 影响的行数
+        """
+        key_fields = (key,) if isinstance(key, str) else tuple(key)
+        effect_rows = 0
+        for fields, rows in self._group_by_fields(items).items():
+            sql = self._upsert_sql(table_name, fields, key_fields, tuple(insert_only_fields))
+            effect_rows += await self._executemany(sql, rows)
+        return effect_rows
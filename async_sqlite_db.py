@@ -13,14 +13,49 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/4/6 14:21
 # @Desc    : 异步SQLite的增删改查封装
-from typing import Any, Dict, List, Union
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import aiosqlite
 
+from async_db_batch import AsyncBatchWriteMixin
+
+
+class AsyncSqliteDB(AsyncBatchWriteMixin):
+    PLACEHOLDER = "?"
+    # 长连接初始化时执行的pragma，WAL模式下读写互不阻塞，synchronous=NORMAL 避免每次提交都 fsync
+    PRAGMAS: Tuple[str, ...] = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-65536",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA busy_timeout=5000",
+    )
 
-class AsyncSqliteDB:
     def __init__(self, db_path: str) -> None:
+        super().__init__()
         self.__db_path = db_path
+        self.__conn: Optional[aiosqlite.Connection] = None
+        self.__connect_lock = asyncio.Lock()
+        # 所有协程共用一个连接，写操作需要串行化，避免 execute 与 commit 被其他协程穿插
+        self.__write_lock = asyncio.Lock()
+
+    async def _get_conn(self) -> aiosqlite.Connection:
+        """
+        获取长连接，首次调用时建立连接并设置pragma
+        :return:
+        """
+        if self.__conn is not None:
+            return self.__conn
+        async with self.__connect_lock:
+            if self.__conn is None:
+                conn = await aiosqlite.connect(self.__db_path)
+                conn.row_factory = aiosqlite.Row
+                for pragma in self.PRAGMAS:
+                    await conn.execute(pragma)
+                self.__conn = conn
+        return self.__conn
 
     async def query(self, sql: str, *args: Union[str, int]) -> List[Dict[str, Any]]:
         """
@@ -29,11 +64,10 @@ class AsyncSqliteDB:
         :param args: sql中传递动态参数列表
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            conn.row_factory = aiosqlite.Row
-            async with conn.execute(sql, args) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows] if rows else []
+        conn = await self._get_conn()
+        async with conn.execute(sql, args) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows] if rows else []
 
     async def get_first(self, sql: str, *args: Union[str, int]) -> Union[Dict[str, Any], None]:
         """
@@ -42,11 +76,10 @@ class AsyncSqliteDB:
         :param args:sql中传递动态参数列表
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            conn.row_factory = aiosqlite.Row
-            async with conn.execute(sql, args) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
+        conn = await self._get_conn()
+        async with conn.execute(sql, args) as cursor:
+            row = await cursor.fetchone()
+            return dict(row) if row else None
 
     async def item_to_table(self, table_name: str, item: Dict[str, Any]) -> int:
         """
@@ -60,7 +93,8 @@ class AsyncSqliteDB:
         fieldstr = ','.join(fields)
         valstr = ','.join(['?'] * len(item))
         sql = f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr})"
-        async with aiosqlite.connect(self.__db_path) as conn:
+        conn = await self._get_conn()
+        async with self.__write_lock:
             async with conn.execute(sql, values) as cursor:
                 await conn.commit()
                 return cursor.lastrowid
@@ -83,7 +117,8 @@ class AsyncSqliteDB:
         upsets_str = ','.join(upsets)
         values.append(value_where)
         sql = f'UPDATE {table_name} SET {upsets_str} WHERE {field_where}=?'
-        async with aiosqlite.connect(self.__db_path) as conn:
+        conn = await self._get_conn()
+        async with self.__write_lock:
             async with conn.execute(sql, values) as cursor:
                 await conn.commit()
                 return cursor.rowcount
@@ -95,7 +130,8 @@ class AsyncSqliteDB:
         :param args:
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
+        conn = await self._get_conn()
+        async with self.__write_lock:
             async with conn.execute(sql, args) as cursor:
                 await conn.commit()
                 return cursor.rowcount
@@ -106,6 +142,42 @@ class AsyncSqliteDB:
         :param sql_script: SQL脚本内容
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
+        conn = await self._get_conn()
+        async with self.__write_lock:
             await conn.executescript(sql_script)
-            await conn.commit()
\ No newline at end of file
+            await conn.commit()
+
+    def _upsert_clause(self, key_fields: Tuple[str, ...], update_fields: List[str]) -> str:
+        conflictstr = ','.join(f'`{field}`' for field in key_fields)
+        if not update_fields:
+            return f"ON CONFLICT({conflictstr}) DO NOTHING"
+        updatestr = ','.join(f'`{field}`=excluded.`{field}`' for field in update_fields)
+        return f"ON CONFLICT({conflictstr}) DO UPDATE SET {updatestr}"
+
+    async def _execute_chunk(self, sql: str, rows: List[List[Any]]) -> int:
+        conn = await self._get_conn()
+        # 每个分片在一个事务内执行完再提交，避免逐行提交
+        async with self.__write_lock:
+            try:
+                async with conn.executemany(sql, rows) as cursor:
+                    effect_rows = cursor.rowcount
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        return effect_rows
+
+    async def close(self) -> None:
+        """
+        关闭长连接，关闭前做一次 WAL checkpoint，把 -wal 文件中的数据合并回主库文件
+        :return:
+        """
+        if self.__conn is None:
+            return
+        async with self.__write_lock:
+            conn, self.__conn = self.__conn, None
+            try:
+                await conn.commit()
+                await conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                await conn.close()
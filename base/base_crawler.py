@@ -9,13 +9,29 @@
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
 
 
+import asyncio
+import json
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from collections import OrderedDict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Dict, List, Optional, Tuple
 
+import httpx
 from playwright.async_api import BrowserContext, BrowserType, Playwright
 
+import config
+from tools import utils
+from tools.adaptive_concurrency import adaptive_concurrency_hook
+from tools.rate_limiter import rate_limit_hook
+
 
 class AbstractCrawler(ABC):
+    # 是否支持分布式爬取（--role coordinator / worker），支持的爬虫需要实现
+    # build_distributed_tasks(self) -> List[WorkTask] 和 async handle_task(self, task, queue)
+    supports_distributed: bool = False
+    # 支持断点续爬（--resume）的爬取类型，其他爬取类型恢复时仍然从头开始
+    checkpoint_crawler_types: Tuple[str, ...] = ()
+
     @abstractmethod
     async def start(self):
         """
@@ -56,7 +72,6 @@ class AbstractCrawler(ABC):
         # 默认实现：回退到标准模式
         return await self.launch_browser(playwright.chromium, playwright_proxy, user_agent, headless)
 
-
 class AbstractLogin(ABC):
     @abstractmethod
     async def begin(self):
@@ -76,6 +91,72 @@ class AbstractLogin(ABC):
 
 
 class AbstractStore(ABC):
+    # 每个存储类在一次运行中只有一个实例，文件句柄、缓冲区等状态可以跨多次写入保留
+    _instances: Dict[type, "AbstractStore"] = {}
+
+    @classmethod
+    def get_instance(cls) -> "AbstractStore":
+        """
+        获取存储类的单例，存储工厂通过它创建存储对象
+        Returns:
+
+        """
+        instance = AbstractStore._instances.get(cls)
+        if instance is None:
+            instance = cls()
+            if config.ENABLE_WRITE_BEHIND:
+                from store.write_behind import WriteBehindStore
+                instance = WriteBehindStore(instance)
+            AbstractStore._instances[cls] = instance
+        return instance
+
+    @classmethod
+    async def close_all(cls):
+        """
+        程序退出时把所有存储实例的缓冲数据落盘并释放资源
+        Returns:
+
+        """
+        while AbstractStore._instances:
+            _, instance = AbstractStore._instances.popitem()
+            try:
+                await instance.flush()
+                await instance.close()
+            except Exception as e:
+                utils.logger.error(f"[AbstractStore.close_all] close {instance.__class__.__name__} error: {e}")
+
+    async def open(self):
+        """
+        打开存储需要的资源，在开始爬取前调用
+        """
+        pass
+
+    async def flush(self):
+        """
+        把缓冲的数据写入存储
+        """
+        pass
+
+    async def close(self):
+        """
+        释放存储占用的资源（文件句柄等）
+        """
+        pass
+
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        """
+        批量存储同一类型的数据，默认逐条调用 store_{store_type}，支持批量写入的存储可以重写
+        Args:
+            store_type: 存储类型，如 content、comment、creator
+            items:
+
+        Returns:
+
+        """
+        store_method = getattr(self, f"store_{store_type}")
+        for item in items:
+            await store_method(item)
+
     @abstractmethod
     async def store_content(self, content_item: Dict):
         pass
@@ -100,6 +181,13 @@ class AbstractStoreImage(ABC):
 
 
 class AbstractApiClient(ABC):
+    # 创建过连接池的客户端实例，程序退出时通过 close_all 统一关闭
+    _opened_clients: List["AbstractApiClient"] = []
+    # 按代理缓存的长连接 httpx 客户端，按最近使用顺序排列，超过 HTTP_CLIENT_CACHE_SIZE 时关闭最久未用的
+    _http_clients: Optional["OrderedDict[str, httpx.AsyncClient]"] = None
+    # 被淘汰的客户端在后台关闭，close 时等待它们关闭完成
+    _closing_clients: Optional[List[asyncio.Task]] = None
+
     @abstractmethod
     async def request(self, method, url, **kwargs):
         pass
@@ -107,3 +195,93 @@ class AbstractApiClient(ABC):
     @abstractmethod
     async def update_cookies(self, browser_context: BrowserContext):
         pass
+
+    def get_http_client(self, proxies=None) -> httpx.AsyncClient:
+        """
+        获取按代理复用的 httpx 客户端，连接保持长连接，避免每个请求都重新建立 TCP/TLS 连接
+        运行中切换代理后，旧代理的客户端超过缓存数量时会被关闭，不会一直占用连接池到程序退出
+        Args:
+            proxies: httpx 代理配置，不同代理使用不同的客户端
+
+        Returns:
+
+        """
+        if self._http_clients is None:
+            self._http_clients = OrderedDict()
+            self._closing_clients = []
+            AbstractApiClient._opened_clients.append(self)
+        key = json.dumps(proxies, sort_keys=True) if isinstance(proxies, dict) else str(proxies)
+        client = self._http_clients.get(key)
+        if client is not None and not client.is_closed:
+            self._http_clients.move_to_end(key)
+        else:
+            client = httpx.AsyncClient(
+                proxies=proxies,
+                http2=http2_enabled(),
+                limits=httpx.Limits(
+                    max_connections=config.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+                ),
+                # 各平台的 Cookie 都由客户端通过请求头显式传入，这里不保存响应中的 Cookie，和每次新建客户端的行为保持一致
+                cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+                event_hooks=get_event_hooks(),
+            )
+            self._http_clients[key] = client
+            self._http_clients.move_to_end(key)
+            while len(self._http_clients) > max(1, config.HTTP_CLIENT_CACHE_SIZE):
+                _, stale_client = self._http_clients.popitem(last=False)
+                self._closing_clients = [task for task in self._closing_clients if not task.done()]
+                self._closing_clients.append(asyncio.create_task(stale_client.aclose()))
+        return client
+
+    async def close(self):
+        """
+        关闭该客户端的所有 httpx 连接池
+        """
+        http_clients, self._http_clients = self._http_clients or {}, None
+        closing_clients, self._closing_clients = self._closing_clients or [], None
+        if self in AbstractApiClient._opened_clients:
+            AbstractApiClient._opened_clients.remove(self)
+        for client in http_clients.values():
+            await client.aclose()
+        if closing_clients:
+            await asyncio.gather(*closing_clients, return_exceptions=True)
+
+    @classmethod
+    async def close_all(cls):
+        """
+        关闭所有客户端的 httpx 连接池
+        """
+        for api_client in list(AbstractApiClient._opened_clients):
+            try:
+                await api_client.close()
+            except Exception as e:
+                utils.logger.error(f"[AbstractApiClient.close_all] close {api_client.__class__.__name__} error: {e}")
+
+
+def get_event_hooks() -> Dict[str, list]:
+    """
+    连接池客户端的 httpx 事件钩子：请求前统一限速，响应后上报自适应并发的成功 / 封禁信号
+    """
+    event_hooks = {"request": [], "response": []}
+    if config.ENABLE_RATE_LIMIT:
+        event_hooks["request"].append(rate_limit_hook)
+    if config.ENABLE_ADAPTIVE_CONCURRENCY:
+        event_hooks["response"].append(adaptive_concurrency_hook)
+    return event_hooks
+
+
+def http2_enabled() -> bool:
+    """
+    是否使用 HTTP/2，开启后需要安装 h2（pip install httpx[http2]），未安装时回退到 HTTP/1.1
+    """
+    if not config.ENABLE_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        utils.logger.warning("[http2_enabled] ENABLE_HTTP2 is on but h2 is not installed, fall back to HTTP/1.1")
+        config.ENABLE_HTTP2 = False
+        return False
@@ -0,0 +1,67 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 对比 execjs 逐次调用和常驻 Node 进程池的签名耗时
+#            运行方式（项目根目录）：python -m benchmarks.bench_js_sign --rounds 50
+import argparse
+import asyncio
+from typing import Any, Dict
+
+import execjs
+
+import config
+from benchmarks.common import measure, measure_async, summarize
+from tools.js_sign_pool import JsSignPool
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+DOUYIN_PARAMS = "device_platform=webapp&aid=6383&channel=channel_pc_web&aweme_id=7345678901234567890"
+ZHIHU_URL = "/api/v4/search_v3?gk_version=gz-gaokao&t=general&q=python&correction=1&offset=0&limit=20"
+ZHIHU_COOKIES = "d_c0=AECXh5Yq8xiPTtb9ABCDEFGHIJKLMNOPQRS=|1718000000;"
+
+CASES = [
+    ("douyin", "libs/douyin.js", "sign_datail", (DOUYIN_PARAMS, USER_AGENT)),
+    ("zhihu", "libs/zhihu.js", "get_sign", (ZHIHU_URL, ZHIHU_COOKIES)),
+]
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    return (f"{result['name']:<28} mean={result['mean_ms']:8.2f}ms  p50={result['p50_ms']:8.2f}ms  "
+            f"p90={result['p90_ms']:8.2f}ms  p99={result['p99_ms']:8.2f}ms  throughput={result['ops_per_sec']:8.1f}/s")
+
+
+async def main(rounds: int, pool_size: int, concurrency: int):
+    config.ENABLE_JS_SIGN_POOL = True
+    for name, script_path, method, args in CASES:
+        with open(script_path, mode="r", encoding="utf-8-sig") as f:
+            ctx = execjs.compile(f.read())
+        execjs_durations = measure(lambda: ctx.call(method, *args), rounds)
+        print(format_result(summarize(f"{name} execjs", execjs_durations)))
+
+        pool = JsSignPool(script_path, size=pool_size)
+        try:
+            # 预热：启动所有进程并加载脚本，不计入单次调用耗时
+            await asyncio.gather(*[pool.call(method, *args) for _ in range(pool.size)])
+            pool_durations, throughput = await measure_async(
+                lambda: pool.call(method, *args), rounds, 0, concurrency
+            )
+        finally:
+            await pool.close()
+        print(format_result(summarize(f"{name} node pool(size={pool_size})", pool_durations, throughput)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="execjs vs node worker pool sign benchmark")
+    parser.add_argument("--rounds", type=int, default=30, help="sequential calls per case")
+    parser.add_argument("--pool-size", type=int, default=config.JS_SIGN_POOL_SIZE, help="node worker processes")
+    parser.add_argument("--concurrency", type=int, default=10, help="max concurrent calls when measuring pool throughput")
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds, args.pool_size, args.concurrency))
@@ -0,0 +1,173 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 各平台请求签名函数的微基准测试，使用固定输入离线运行，输出单次调用耗时分位数和吞吐量，
+#            可以把结果写成 JSON，和之前版本的结果对比
+#            运行方式（项目根目录）：
+#            python -m benchmarks.bench_sign --rounds 200 --output sign_result.json
+#            python -m benchmarks.bench_sign --compare sign_result.json
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import config
+from benchmarks.common import measure, measure_async, summarize
+from tools.js_sign_pool import JsSignPool, get_node_path
+
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+
+BILI_IMG_KEY = "7cd084941338484aae1ad9425b84077c"
+BILI_SUB_KEY = "4932caff0ff746eab6f01bf08b70ac45"
+BILI_PARAMS = {
+    "search_type": "video", "keyword": "python", "page": 1, "page_size": 20, "order": "click",
+    "platform": "pc", "highlight": 1, "single_column": 0, "web_location": 1430654,
+}
+
+XHS_A1 = "1902a6c2b0bgs1e8d9mxz4nm0ym1z8o4s2qjd5c3n50000387162"
+XHS_B1 = "I38rHdgsjopgIvesdVwgIC+oIELmBZ5e3VwXLgFTIxS3bqwErFeexd0ekncAzMFYnqthIhJeSBMDKutRI3KsYorWHPtGrbV0PdgDIeZVIxkPIfoxIkgqrfDXwvgeyyvJz9Ve7BW07aquKnDUIeMDGeurrB3OiBaHIAzuI3W/IiHKwUDIPmPUIvqfeUdCaHgsIvoYcn5e3bc1IA=="
+XHS_X_S = "XYW_eyJzaWduU3ZuIjoiNTYiLCJzaWduVHlwZSI6IngyIiwiYXBwSWQiOiJ4aHMtcGMtd2ViIiwic2lnblZlcnNpb24iOiIxIiwicGF5bG9hZCI6IjBkZjVmYjIzIn0="
+XHS_X_T = "1718000000000"
+
+DOUYIN_URL = "/aweme/v1/web/aweme/detail/"
+DOUYIN_PARAMS = "device_platform=webapp&aid=6383&channel=channel_pc_web&aweme_id=7345678901234567890"
+
+ZHIHU_URL = "/api/v4/search_v3?gk_version=gz-gaokao&t=general&q=python&correction=1&offset=0&limit=20"
+ZHIHU_COOKIES = "d_c0=AECXh5Yq8xiPTtb9ABCDEFGHIJKLMNOPQRS=|1718000000;"
+
+
+def python_cases() -> Dict[str, Callable[[], Any]]:
+    from media_platform.bilibili.help import BilibiliSign
+    from media_platform.xhs.help import sign as xhs_sign
+
+    bili_sign = BilibiliSign(BILI_IMG_KEY, BILI_SUB_KEY)
+    return {
+        "bilibili.BilibiliSign.sign": lambda: bili_sign.sign(dict(BILI_PARAMS)),
+        "bilibili.BilibiliSign(new).sign": lambda: BilibiliSign(BILI_IMG_KEY, BILI_SUB_KEY).sign(dict(BILI_PARAMS)),
+        "xhs.help.sign": lambda: xhs_sign(a1=XHS_A1, b1=XHS_B1, x_s=XHS_X_S, x_t=XHS_X_T),
+    }
+
+
+def execjs_cases() -> Dict[str, Callable[[], Any]]:
+    from media_platform.douyin.help import get_a_bogus_from_js
+    from media_platform.zhihu.help import sign as zhihu_sign
+
+    return {
+        "douyin.get_a_bogus_from_js": lambda: get_a_bogus_from_js(DOUYIN_URL, DOUYIN_PARAMS, USER_AGENT),
+        "zhihu.help.sign": lambda: zhihu_sign(ZHIHU_URL, ZHIHU_COOKIES),
+    }
+
+
+def pool_cases() -> Dict[str, Callable[[], Awaitable[Any]]]:
+    from media_platform.douyin.help import get_a_bogus
+    from media_platform.zhihu.help import async_sign
+
+    return {
+        "douyin.get_a_bogus(pool)": lambda: get_a_bogus(DOUYIN_URL, DOUYIN_PARAMS, {}, USER_AGENT),
+        "zhihu.help.async_sign(pool)": lambda: async_sign(ZHIHU_URL, ZHIHU_COOKIES),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    node_path = get_node_path()
+    node_version = ""
+    if node_path:
+        node_version = subprocess.run([node_path, "--version"], capture_output=True, text=True).stdout.strip()
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "node": node_version,
+        "js_sign_pool_size": config.JS_SIGN_POOL_SIZE,
+    }
+
+
+async def run(rounds: int, js_rounds: int, warmup: int, concurrency: int, selected: Optional[str]) -> List[Dict]:
+    results = []
+
+    def enabled(name: str) -> bool:
+        return not selected or selected in name
+
+    for name, func in python_cases().items():
+        if enabled(name):
+            results.append(summarize(name, measure(func, rounds, warmup)))
+
+    if get_node_path():
+        for name, func in execjs_cases().items():
+            if enabled(name):
+                results.append(summarize(name, measure(func, js_rounds, 1)))
+
+        config.ENABLE_JS_SIGN_POOL = True
+        try:
+            for name, func in pool_cases().items():
+                if enabled(name):
+                    durations, throughput = await measure_async(func, rounds, warmup, concurrency)
+                    results.append(summarize(name, durations, throughput))
+        finally:
+            await JsSignPool.close_all()
+    else:
+        print("node not found, skip js-backed signers", file=sys.stderr)
+    return results
+
+
+def print_table(results: List[Dict], baseline: Optional[Dict[str, Dict]] = None):
+    header = f"{'case':<34}{'rounds':>7}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'ops/s':>12}"
+    if baseline:
+        header += f"{'p50 vs base':>14}"
+    print(header)
+    for r in results:
+        line = (f"{r['name']:<34}{r['rounds']:>7}{r['mean_ms']:>10.3f}{r['p50_ms']:>10.3f}"
+                f"{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['ops_per_sec']:>12.1f}")
+        if baseline:
+            base = baseline.get(r["name"])
+            line += f"{(r['p50_ms'] / base['p50_ms'] - 1) * 100:>+13.1f}%" if base and base["p50_ms"] else f"{'-':>14}"
+        print(line)
+    print("(times in ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="request sign functions micro benchmark")
+    parser.add_argument("--rounds", type=int, default=200, help="calls per python / node pool case")
+    parser.add_argument("--js-rounds", type=int, default=20, help="calls per execjs case, each one spawns a node process")
+    parser.add_argument("--warmup", type=int, default=5, help="warmup calls before measuring")
+    parser.add_argument("--concurrency", type=int, default=config.JS_SIGN_POOL_SIZE, help="max concurrent calls of pool cases, used for warmup and throughput")
+    parser.add_argument("--case", type=str, default=None, help="only run cases whose name contains this string")
+    parser.add_argument("--output", type=str, default=None, help="write results to this json file")
+    parser.add_argument("--compare", type=str, default=None, help="baseline json file written by --output")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.rounds, args.js_rounds, args.warmup, args.concurrency, args.case))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {r["name"]: r for r in json.load(f)["results"]}
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 基准测试脚本共用的计时和统计函数
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """
+    最近秩法计算分位数
+    Args:
+        sorted_values: 升序排列的数值
+        q: 分位，0 ~ 100
+
+    Returns:
+
+    """
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name: str, durations: List[float], throughput: Optional[float] = None) -> Dict[str, Any]:
+    """
+    汇总单个用例的耗时统计，单位毫秒
+    Args:
+        name: 用例名称
+        durations: 每次调用的耗时（秒）
+        throughput: 并发场景下测得的每秒调用次数，不传时按顺序调用的平均耗时计算
+
+    Returns:
+
+    """
+    values = sorted(d * 1000 for d in durations)
+    mean = sum(values) / len(values)
+    return {
+        "name": name,
+        "rounds": len(values),
+        "mean_ms": round(mean, 4),
+        "min_ms": round(values[0], 4),
+        "p50_ms": round(percentile(values, 50), 4),
+        "p90_ms": round(percentile(values, 90), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "max_ms": round(values[-1], 4),
+        "ops_per_sec": round(throughput if throughput is not None else 1000 / mean, 2),
+    }
+
+
+def measure(func: Callable[[], Any], rounds: int, warmup: int = 0) -> List[float]:
+    """
+    按顺序调用统计单次耗时
+    Args:
+        func: 被测函数
+        rounds: 计时的调用次数
+        warmup: 计时前的预热调用次数
+
+    Returns: 每次调用的耗时（秒）
+
+    """
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def measure_async(func: Callable[[], Awaitable[Any]], rounds: int, warmup: int,
+                        concurrency: int) -> Tuple[List[float], float]:
+    """
+    先按顺序调用统计单次耗时，再以最多 concurrency 个并发调用 rounds 次统计吞吐量
+    Args:
+        func: 被测的异步函数
+        rounds: 单次耗时和吞吐量各自的调用次数
+        warmup: 预热的批数，每批并发调用 concurrency 次
+        concurrency: 预热和吞吐量测试时同时进行的调用数
+
+    Returns: (每次调用的耗时（秒）, 每秒调用次数)
+
+    """
+    for _ in range(warmup):
+        await asyncio.gather(*[func() for _ in range(concurrency)])
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await func()
+        durations.append(time.perf_counter() - start)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            await func()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[call() for _ in range(rounds)])
+    return durations, rounds / (time.perf_counter() - start)
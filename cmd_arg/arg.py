@@ -21,23 +21,38 @@ async def parse_cmd():
     parser.add_argument('--platform', type=str, 
                         help='Media platform select / 选择媒体平台 (xhs=小红书 | dy=抖音 | ks=快手 | bili=哔哩哔哩 | wb=微博 | tieba=百度贴吧 | zhihu=知乎 | tk=tiktok)',
                         choices=["xhs", "dy", "ks", "bili", "wb", "tieba", "zhihu", "tk"], default=config.PLATFORM)
+    parser.add_argument('--platforms', type=str,
+                        help='Media platforms crawled concurrently in one process, separated by commas / 同时爬取的多个媒体平台，以英文逗号分隔 (e.g. xhs,bili,wb)', default=config.PLATFORMS)
     parser.add_argument('--lt', type=str, 
                         help='Login type / 登录方式 (qrcode=二维码 | phone=手机号 | cookie=Cookie)',
                         choices=["qrcode", "phone", "cookie"], default=config.LOGIN_TYPE)
     parser.add_argument('--type', type=str, 
                         help='Crawler type / 爬取类型 (search=搜索 | detail=详情 | creator=创作者)',
                         choices=["search", "detail", "creator"], default=config.CRAWLER_TYPE)
+    parser.add_argument('--workers', type=int,
+                        help='Number of local sharded worker processes / 本机分片子进程数量', default=config.SHARD_WORKERS)
+    parser.add_argument('--shard_index', type=int,
+                        help='Shard index of this worker process, set by the shard runner / 当前分片序号（由分片运行器设置）', default=config.SHARD_INDEX)
+    parser.add_argument('--shard_count', type=int,
+                        help='Shard count, set by the shard runner / 分片数量（由分片运行器设置）', default=config.SHARD_COUNT)
+    parser.add_argument('--role', type=str,
+                        help='Distributed role / 分布式角色 (coordinator=生成任务入队 | worker=领取任务执行)',
+                        choices=["", "coordinator", "worker"], default=config.DISTRIBUTED_ROLE)
     parser.add_argument('--start', type=int,
                         help='Number of start page / 起始页码', default=config.START_PAGE)
     parser.add_argument('--keywords', type=str,
                         help='Please input keywords / 请输入关键词', default=config.KEYWORDS)
+    parser.add_argument('--keyword_concurrency', type=int,
+                        help='Number of keywords searched concurrently / 同时搜索的关键词数量', default=config.KEYWORD_CONCURRENCY)
+    parser.add_argument('--resume', type=str2bool,
+                        help='''Whether to resume from the last checkpoint / 是否从上次中断的断点继续爬取, supported values case insensitive / 支持的值(不区分大小写) ('yes', 'true', 't', 'y', '1', 'no', 'false', 'f', 'n', '0')''', default=config.RESUME)
     parser.add_argument('--get_comment', type=str2bool,
                         help='''Whether to crawl level one comment / 是否爬取一级评论, supported values case insensitive / 支持的值(不区分大小写) ('yes', 'true', 't', 'y', '1', 'no', 'false', 'f', 'n', '0')''', default=config.ENABLE_GET_COMMENTS)
     parser.add_argument('--get_sub_comment', type=str2bool,
                         help=''''Whether to crawl level two comment / 是否爬取二级评论, supported values case insensitive / 支持的值(不区分大小写) ('yes', 'true', 't', 'y', '1', 'no', 'false', 'f', 'n', '0')''', default=config.ENABLE_GET_SUB_COMMENTS)
     parser.add_argument('--save_data_option', type=str,
-                        help='Where to save the data / 数据保存方式 (csv=CSV文件 | db=MySQL数据库 | json=JSON文件 | sqlite=SQLite数据库)', 
-                        choices=['csv', 'db', 'json', 'sqlite'], default=config.SAVE_DATA_OPTION)
+                        help='Where to save the data / 数据保存方式 (csv=CSV文件 | db=MySQL数据库 | json=JSON文件 | jsonl=JSON Lines文件 | parquet=Parquet列式文件 | sqlite=SQLite数据库)', 
+                        choices=['csv', 'db', 'json', 'jsonl', 'parquet', 'sqlite'], default=config.SAVE_DATA_OPTION)
     parser.add_argument('--cookies', type=str,
                         help='Cookies used for cookie login type / Cookie登录方式使用的Cookie值', default=config.COOKIES)
 
@@ -45,10 +60,17 @@ async def parse_cmd():
 
     # override config
     config.PLATFORM = args.platform
+    config.PLATFORMS = args.platforms
     config.LOGIN_TYPE = args.lt
     config.CRAWLER_TYPE = args.type
+    config.SHARD_WORKERS = args.workers
+    config.SHARD_INDEX = args.shard_index
+    config.SHARD_COUNT = args.shard_count
+    config.DISTRIBUTED_ROLE = args.role
     config.START_PAGE = args.start
+    config.RESUME = args.resume
     config.KEYWORDS = args.keywords
+    config.KEYWORD_CONCURRENCY = args.keyword_concurrency
     config.ENABLE_GET_COMMENTS = args.get_comment
     config.ENABLE_GET_SUB_COMMENTS = args.get_sub_comment
     config.SAVE_DATA_OPTION = args.save_data_option
@@ -11,7 +11,9 @@
 
 # 基础配置
 PLATFORM = "tk"  # 平台，xhs | dy | ks | bili | wb | tieba | zhihu | tk
+PLATFORMS = ""  # 同一进程同时爬取多个平台，以英文逗号分隔，例如 "xhs,bili,wb"；为空时只爬取 PLATFORM
 KEYWORDS = "乐乐启蒙"  # 关键词搜索配置，以英文逗号分隔
+KEYWORD_CONCURRENCY = 1  # 同时搜索的关键词数量，各关键词共享并发和限速配置，1 表示逐个关键词搜索
 LOGIN_TYPE = "cookie"  # qrcode or phone or cookie
 COOKIES = "tt_csrf_token=XcbbQX7O-FiK5MXQOVJgFW7Eq_g1M_o5sNbs; tt_chain_token=ffXIcZzluaz5ecmOei4QZA==; passport_csrf_token=ca6669bcf43a6310ab3f09e0745f3297; passport_csrf_token_default=ca6669bcf43a6310ab3f09e0745f3297; s_v_web_id=verify_mdmrfn28_HfDOlSEX_708h_4CDh_8OwE_tkEJDeH40uHP; multi_sids=7531958306765521927%3A5bef2c168966af3c3b34eae57d368b26; cmpl_token=AgQQAPOHF-RO0ri4CosB_R0-8uaGjWMb_4UMYN5ksQ; passport_auth_status=0b11cca5321cacfd235360ddb9501fb6%2C; passport_auth_status_ss=0b11cca5321cacfd235360ddb9501fb6%2C; uid_tt=12174a4541360a8a21887b0ca7e11f7c8f485f3e7b0e2865e6ca1a377704dbd5; uid_tt_ss=12174a4541360a8a21887b0ca7e11f7c8f485f3e7b0e2865e6ca1a377704dbd5; sid_tt=5bef2c168966af3c3b34eae57d368b26; sessionid=5bef2c168966af3c3b34eae57d368b26; sessionid_ss=5bef2c168966af3c3b34eae57d368b26; store-idc=maliva; store-country-code=tw; store-country-code-src=uid; tt-target-idc=alisg; tt-target-idc-sign=YCzkGUtvoxt1hPy7FBtpqFWFQK1w4lILOgAxou0p3yYo4XmJ8OjPe_mlcgxgPLhhDCBDe6HI_gAyekf8WBktCZkK-1Iy6eSGVJfU1K110u8rW5yz6g9XcEX2lwGJskjUahSc6t997V4pN55NrNMIy0c6FouQY4aARB_YcUji2CV0BpMHMvpc1uwLe-FqYXo4RD7mFXjUmt9VTAhQzKJP9SDi0muz2kNa_kO2O9mEhmwQAXgD0bv-z78dqL4kehrtG4xg2wVrxlRyQb8b7j5wW0-vEt7K6fIR6TCpP6HN6SsCo8HJqvYwdJ8NmePsRQhY1-iENtmdSaQKqmJeCAFoJ_HtJmArSz2X8SxRk3PxYpvVcSSW4mVLIP-_nxhSqGuq5aWlFnWUyTAEWwWmJxAtlajoF-hHSYopTnIBDeVamrv92lmZeqVBbUgh-RUhDN03lARxSBVJ-pm3WyhysY-4rlqhHByHkq3NJJB0zhBFA3ILE0wqZSBWRTSfm5F8HOdL; ttwid=1%7CHnYXhYGPBXgrkDeCtfCOPVXMA8X1M0Kzz-XNld0W4Is%7C1753686123%7C134c9b12d19b8125faddbcfef4f35e82c53f2fefe08bb17429a1be2c874e44cc; store-country-sign=MEIEDACrwBkOKlP9S-HU0gQgsr_9d1v_FDrUFcumYL8wsKWvak7xp2ZGYkC1jl080cIEEJyKO9Jj1K2eGXAsjVQyqek; sid_guard=5bef2c168966af3c3b34eae57d368b26%7C1753686123%7C15551996%7CSat%2C+24-Jan-2026+07%3A01%3A59+GMT; sid_ucp_v1=1.0.0-KDdlNWY4ZGRhY2I4ZjlkNDU3OWNlNjRkNWU4YzQ1OWQyNThkNWZmNjIKGQiHiL_OyIW5w2gQ68CcxAYYsws4CEASSAQQAxoCbXkiIDViZWYyYzE2ODk2NmFmM2MzYjM0ZWFlNTdkMzY4YjI2; ssid_ucp_v1=1.0.0-KDdlNWY4ZGRhY2I4ZjlkNDU3OWNlNjRkNWU4YzQ1OWQyNThkNWZmNjIKGQiHiL_OyIW5w2gQ68CcxAYYsws4CEASSAQQAxoCbXkiIDViZWYyYzE2ODk2NmFmM2MzYjM0ZWFlNTdkMzY4YjI2; odin_tt=9bb2dd0d968b6c7d04b1b975f3ec6b47f7c9cdaff92c07774097788ecee32b680dfc03ada00588b40cb2d6872306a3620bf1fd90510bbd780d70b60ea1725b26ac913468871172e6b5df8ba7996d0b39; msToken=lV6hydyAZ7LrNV6FVkA1ewlBxILsLYPXWSViCi_aoKO7wgy0tqMbRuys9xM9wwb_u1fnQejM7MLPhg6Ntpf6r95yF4lQW0xKHxV4DnAvAFencXnngjQLE9hcZdgTfur3dz2CQww4DdEaDorIajGfBE0Q7A=="
 CRAWLER_TYPE = (
@@ -62,8 +64,63 @@ BROWSER_LAUNCH_TIMEOUT = 30
 # 设置为False可以保持浏览器运行，便于调试
 AUTO_CLOSE_BROWSER = False
 
-# 数据保存类型选项配置,支持四种类型：csv、db、json、sqlite, 最好保存到DB，有排重的功能。
-SAVE_DATA_OPTION = "db"  # csv or db or json or sqlite
+# 数据保存类型选项配置,支持六种类型：csv、db、json、jsonl、parquet、sqlite, 最好保存到DB，有排重的功能。
+# jsonl 每条记录追加一行；json 在 jsonl 的基础上，程序退出时把记录合并成一个 JSON 数组文件
+# parquet 按 schema/tables.sql 中的表结构写成列式文件，方便数据分析任务按列读取
+SAVE_DATA_OPTION = "db"  # csv or db or json or jsonl or parquet or sqlite
+
+# 文件类存储(csv/json/jsonl)的写缓冲配置，缓冲的记录条数或距离上次落盘的秒数达到阈值时批量写入磁盘
+FILE_STORE_FLUSH_SIZE = 100
+FILE_STORE_FLUSH_INTERVAL = 3
+
+# parquet 存储每个 row group 的记录条数和压缩算法
+PARQUET_ROW_GROUP_SIZE = 5000
+PARQUET_COMPRESSION = "zstd"
+
+# API 客户端的 httpx 连接池配置，每个客户端按代理复用长连接
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+HTTP_KEEPALIVE_EXPIRY = 30
+# 每个 API 客户端最多缓存的 httpx 客户端数量（一个代理一个），轮换代理后最久未使用的客户端会被关闭
+HTTP_CLIENT_CACHE_SIZE = 2
+# 是否启用 HTTP/2，需要安装 h2：pip install httpx[http2]
+ENABLE_HTTP2 = False
+
+# 统一限速：API 客户端的每个请求发出前从对应的令牌桶取令牌，rate 为每秒补充的令牌数，burst 为最多积攒的令牌数
+# key 为 host 或 host + 路径前缀（按最长匹配，匹配到路径前缀的请求只使用该前缀的令牌桶）
+# 开启后各平台评论翻页等处原有的随机 sleep 不再生效，请求节奏会发生变化（例如微博降到每秒 0.5 次），默认关闭
+ENABLE_RATE_LIMIT = False
+RATE_LIMITS = {
+    "edith.xiaohongshu.com": {"rate": 1.0, "burst": 3},
+    "www.douyin.com": {"rate": 2.0, "burst": 5},
+    "www.kuaishou.com": {"rate": 2.0, "burst": 5},
+    "api.bilibili.com": {"rate": 2.0, "burst": 5},
+    "m.weibo.cn": {"rate": 0.5, "burst": 2},
+    "tieba.baidu.com": {"rate": 2.0, "burst": 5},
+    "www.zhihu.com": {"rate": 1.0, "burst": 3},
+}
+# 没有在 RATE_LIMITS 中配置的 host（图片、视频 CDN 等）使用的限速，None 表示不限速
+RATE_LIMIT_DEFAULT = None
+
+# 写后队列（write-behind）：爬虫把数据放入有界队列后立即返回，由后台写入任务按存储类型批量写入，
+# 队列满时爬虫等待（背压），程序退出时写完队列中剩余的数据
+ENABLE_WRITE_BEHIND = True
+WRITE_BEHIND_QUEUE_SIZE = 1000
+WRITE_BEHIND_WORKERS = 1
+# 默认的批量大小和最大延迟（秒），攒够批量大小或最早的一条数据等待超过最大延迟时写入
+WRITE_BEHIND_BATCH_SIZE = 100
+WRITE_BEHIND_MAX_LATENCY = 1.0
+# 按存储类型（content / comment / creator 等）覆盖批量大小和最大延迟
+WRITE_BEHIND_TABLE_SETTINGS = {
+    "comment": {"batch_size": 500, "max_latency": 2.0},
+}
+
+# execjs 签名（抖音 a_bogus、知乎 x-zse-96）使用常驻的 Node 进程池，脚本只在进程启动时加载一次，
+# 关闭或找不到 node 时退回到 execjs，在线程中逐次调用
+ENABLE_JS_SIGN_POOL = True
+JS_SIGN_POOL_SIZE = 2
+# 单次签名调用的超时时间（秒），超时的 Node 进程会被结束并在下次调用时重新启动
+JS_SIGN_TIMEOUT = 10
 
 # 用户浏览器缓存的浏览器文件配置
 USER_DATA_DIR = "%s_user_data_dir"  # %s will be replaced by platform name
@@ -77,6 +134,59 @@ CRAWLER_MAX_NOTES_COUNT = 200
 # 并发爬虫数量控制
 MAX_CONCURRENCY_NUM = 1
 
+# 自适应并发（AIMD）：所有爬取任务共享一个并发窗口，从 MAX_CONCURRENCY_NUM 开始，
+# 请求持续成功时逐步加一，出现封禁、验证码等信号时按比例缩小，窗口变化会打印到日志
+ENABLE_ADAPTIVE_CONCURRENCY = False
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 8
+ADAPTIVE_CONCURRENCY_DECREASE_FACTOR = 0.5
+# 缩小窗口后的冷却时间（秒），期间的封禁信号不再重复缩小
+ADAPTIVE_CONCURRENCY_COOLDOWN = 10
+# 视为封禁 / 验证码信号的 HTTP 状态码
+ADAPTIVE_CONCURRENCY_BLOCK_STATUS = (429, 461, 471)
+
+# 搜索模式的流水线调度：搜索翻页、详情、评论作为独立的阶段并发执行，阶段之间通过有界队列连接
+# 队列长度，以及详情、评论阶段的工作任务数
+PIPELINE_QUEUE_SIZE = 100
+PIPELINE_DETAIL_WORKERS = MAX_CONCURRENCY_NUM
+PIPELINE_COMMENT_WORKERS = MAX_CONCURRENCY_NUM
+
+# 是否保存爬取断点（搜索页码、search_id、评论和创作者分页游标、已完成的帖子），定期写入 CHECKPOINT_DIR
+ENABLE_CHECKPOINT = True
+# 是否从上次中断的断点继续爬取，不开启时本次运行会覆盖旧的断点
+RESUME = False
+# 断点文件目录，文件名为 平台_爬取类型.json
+CHECKPOINT_DIR = "data/checkpoint"
+# 断点写入文件的最短间隔（秒），写入前会先把存储缓冲的数据落盘，程序退出时会再写入一次
+CHECKPOINT_SAVE_INTERVAL = 30
+
+# 本机多进程分片运行的子进程数量，大于 1 时按哈希把关键词、创作者和指定 id 分给各子进程，
+# 每个子进程使用独立的浏览器数据目录和 CDP 端口；1 表示单进程运行
+SHARD_WORKERS = 1
+# 当前子进程的分片序号和分片数量，由分片运行器通过命令行传入，不需要手动修改
+SHARD_INDEX = 0
+SHARD_COUNT = 1
+# 父进程汇总输出各分片进度的间隔（秒）
+SHARD_PROGRESS_INTERVAL = 30
+# 父进程退出时等待子进程结束的时间（秒），超时后强制结束
+SHARD_SHUTDOWN_TIMEOUT = 30
+
+# 分布式爬取，任务队列使用 db_config 中的 redis 配置
+# 角色：""(不开启) | coordinator(按当前配置生成任务入队) | worker(登录后从队列领取任务执行)
+DISTRIBUTED_ROLE = ""
+# 队列 key 前缀，实际队列名会加上平台，例如 mediacrawler:xhs
+DISTRIBUTED_QUEUE_NAME = "mediacrawler"
+# 任务租约时长（秒），worker 执行期间会自动续租，崩溃后租约到期任务重新入队
+DISTRIBUTED_LEASE_SEC = 300
+# 单个任务最多执行次数，超过后进入 dead 列表
+DISTRIBUTED_MAX_ATTEMPTS = 3
+# 每个 worker 进程同时执行的任务数
+DISTRIBUTED_WORKER_CONCURRENCY = MAX_CONCURRENCY_NUM
+# 队列为空时的轮询间隔（秒）
+DISTRIBUTED_POLL_INTERVAL = 1
+# 队列清空后持续空闲多久 worker 退出（秒）
+DISTRIBUTED_IDLE_EXIT_SEC = 60
+
 # 是否开启爬图片模式, 默认不开启爬图片
 ENABLE_GET_IMAGES = False
 
@@ -93,6 +203,11 @@ ENABLE_GET_SUB_COMMENTS = False
 # 词云相关
 # 是否开启生成评论词云图
 ENABLE_GET_WORDCLOUD = False
+# 词云增量统计时，词频文件和词云图的最短刷新间隔（秒），程序退出时会再生成一次
+WORDCLOUD_RENDER_INTERVAL = 60
+# 分词和词云绘制使用的进程数，以及提交到进程池中未完成任务数的上限
+WORDCLOUD_WORKERS = 2
+WORDCLOUD_MAX_PENDING_TASKS = 4
 # 自定义词语及其分组
 # 添加规则：xx:yy 其中xx为自定义添加的词组，yy为将xx该词组分到的组名。
 CUSTOM_WORDS = {
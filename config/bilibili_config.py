@@ -45,3 +45,7 @@ CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES = 100
 
 # 单个视频/帖子最大爬取动态数
 CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES = 50
+
+# WBI 签名的 img_key / sub_key 缓存时间（秒），过期后先继续使用旧的 key 并在后台刷新，
+# 接口返回签名校验失败（-352）时立即失效，下次请求重新获取
+BILI_WBI_KEY_TTL = 600
@@ -18,3 +18,8 @@ KS_CREATOR_ID_LIST = [
     "3x4sm73aye7jq7i",
     # ........................
 ]
+
+# 评论接口疑似被封禁时的冷却时间（秒），冷却期间所有评论任务等待，冷却结束后刷新页面和 cookie 再重试
+KS_BLOCK_COOLDOWN_SEC = 20
+# 单个视频的评论因封禁失败后最多重试的次数
+KS_COMMENT_MAX_RETRIES = 3
@@ -26,3 +26,8 @@ XHS_CREATOR_ID_LIST = [
     "63e36c9a000000002703502b",
     # ........................
 ]
+
+# 请求签名使用的页面数量，大于 1 时会额外打开签名页面，并发的详情、评论请求不再排队等待同一个页面
+XHS_SIGN_PAGE_POOL_SIZE = 1
+# 同一时刻发起的签名请求合并到一次 page.evaluate 中完成，每批最多签名的请求数
+XHS_SIGN_BATCH_SIZE = 10
@@ -14,7 +14,7 @@
 # @Time    : 2024/4/6 14:54
 # @Desc    : mediacrawler db 管理
 import asyncio
-from typing import Dict
+from typing import Dict, List, Optional, Tuple, Union
 from urllib.parse import urlparse
 
 import aiofiles
@@ -26,6 +26,34 @@ from async_sqlite_db import AsyncSqliteDB
 from tools import utils
 from var import db_conn_pool_var, media_crawler_db_var
 
+# 存储层 upsert 依赖的唯一索引：(表名, 索引名, 字段)，需要与 schema 目录下的建表脚本保持一致
+# 老版本建的库只有普通索引，启动时由 migrate_unique_indexes 补齐
+UNIQUE_INDEXES: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("bilibili_video", "idx_bilibili_vi_video_i_31c36e", ("video_id",)),
+    ("bilibili_video_comment", "idx_bilibili_vi_comment_41c34e", ("comment_id",)),
+    ("bilibili_up_info", "idx_bilibili_vi_user_123456", ("user_id",)),
+    ("bilibili_contact_info", "idx_bilibili_contact_info_up_fan", ("up_id", "fan_id")),
+    ("bilibili_up_dynamic", "idx_bilibili_up_dynamic_dynamic_id", ("dynamic_id",)),
+    ("douyin_aweme", "idx_douyin_awem_aweme_i_6f7bc6", ("aweme_id",)),
+    ("douyin_aweme_comment", "idx_douyin_awem_comment_fcd7e4", ("comment_id",)),
+    ("dy_creator", "idx_dy_creator_user_id", ("user_id",)),
+    ("kuaishou_video", "idx_kuaishou_vi_video_i_c5c6a6", ("video_id",)),
+    ("kuaishou_video_comment", "idx_kuaishou_vi_comment_ed48fa", ("comment_id",)),
+    ("weibo_note", "idx_weibo_note_note_id_f95b1a", ("note_id",)),
+    ("weibo_note_comment", "idx_weibo_note__comment_c7611c", ("comment_id",)),
+    ("weibo_creator", "idx_weibo_creator_user_id", ("user_id",)),
+    ("xhs_creator", "idx_xhs_creator_user_id", ("user_id",)),
+    ("xhs_note", "idx_xhs_note_note_id_209457", ("note_id",)),
+    ("xhs_note_comment", "idx_xhs_note_co_comment_8e8349", ("comment_id",)),
+    ("tieba_note", "idx_tieba_note_note_id", ("note_id",)),
+    ("tieba_comment", "idx_tieba_comment_comment_id", ("comment_id",)),
+    ("tieba_creator", "idx_tieba_creator_user_id", ("user_id",)),
+    ("zhihu_content", "idx_zhihu_content_content_id", ("content_id",)),
+    ("zhihu_comment", "idx_zhihu_comment_comment_id", ("comment_id",)),
+    ("tiktok_video", "idx_tiktok_video_id", ("video_id",)),
+    ("tiktok_video_comment", "idx_tiktok_comment_id", ("comment_id",)),
+]
+
 
 async def init_mediacrawler_db():
     """
@@ -60,6 +88,80 @@ async def init_sqlite_db():
     media_crawler_db_var.set(async_db_obj)
 
 
+async def _table_exists(async_db_obj: Union[AsyncMysqlDB, AsyncSqliteDB], db_type: str, table_name: str) -> bool:
+    """
+    查询表是否存在
+    Returns:
+
+    """
+    if db_type == "sqlite":
+        sql = "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?"
+    else:
+        sql = "SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    return await async_db_obj.get_first(sql, table_name) is not None
+
+
+async def _index_is_unique(async_db_obj: Union[AsyncMysqlDB, AsyncSqliteDB], db_type: str,
+                           table_name: str, index_name: str) -> Optional[bool]:
+    """
+    查询索引是否为唯一索引
+    Returns: 索引不存在时返回 None
+
+    """
+    if db_type == "sqlite":
+        for row in await async_db_obj.query(f"PRAGMA index_list({table_name})"):
+            if row["name"] == index_name:
+                return bool(row["unique"])
+        return None
+    row = await async_db_obj.get_first(
+        "SELECT NON_UNIQUE FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+        table_name, index_name,
+    )
+    return None if row is None else not row["NON_UNIQUE"]
+
+
+async def migrate_unique_indexes(async_db_obj: Union[AsyncMysqlDB, AsyncSqliteDB], db_type: str):
+    """
+    给老版本建的表补齐 UNIQUE_INDEXES 中的唯一索引，已经是唯一索引的直接跳过，可以重复执行；
+    表里有重复数据导致无法建唯一索引时直接报错退出，否则 upsert 会不断写入重复数据
+    Args:
+        async_db_obj: 数据库对象
+        db_type: 数据库类型，'sqlite' 或 'mysql'
+
+    Returns:
+
+    """
+    for table_name, index_name, fields in UNIQUE_INDEXES:
+        if not await _table_exists(async_db_obj, db_type, table_name):
+            continue
+        is_unique = await _index_is_unique(async_db_obj, db_type, table_name, index_name)
+        if is_unique:
+            continue
+        fields_str = ", ".join(fields)
+        if db_type == "sqlite":
+            sqls = [
+                f"DROP INDEX IF EXISTS {index_name}",
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table_name}({fields_str})",
+            ]
+        elif is_unique is None:
+            sqls = [f"ALTER TABLE `{table_name}` ADD UNIQUE KEY `{index_name}` ({fields_str})"]
+        else:
+            sqls = [f"ALTER TABLE `{table_name}` DROP INDEX `{index_name}`, ADD UNIQUE KEY `{index_name}` ({fields_str})"]
+        try:
+            for sql in sqls:
+                await async_db_obj.execute(sql)
+        except Exception as e:
+            # 多个分片进程同时启动时，索引可能已经被其他进程建好
+            if await _index_is_unique(async_db_obj, db_type, table_name, index_name):
+                continue
+            raise RuntimeError(
+                f"[migrate_unique_indexes] failed to add unique index {index_name} on {table_name}({fields_str}), "
+                f"please remove the duplicate rows first: {e}"
+            ) from e
+        utils.logger.info(f"[migrate_unique_indexes] added unique index {index_name} on {table_name}({fields_str})")
+
+
 async def init_db():
     """
     初始化db连接池
@@ -73,6 +175,8 @@ async def init_db():
     else:
         await init_mediacrawler_db()
         utils.logger.info("[init_db] end init mysql db connect object")
+    db_type = "sqlite" if config.SAVE_DATA_OPTION == "sqlite" else "mysql"
+    await migrate_unique_indexes(media_crawler_db_var.get(), db_type)
 
 
 async def close():
@@ -83,13 +187,17 @@ async def close():
     """
     utils.logger.info("[close] close mediacrawler db connection")
     if config.SAVE_DATA_OPTION == "sqlite":
-        # SQLite数据库连接会在AsyncSqliteDB对象销毁时自动关闭
-        utils.logger.info("[close] sqlite db connection will be closed automatically")
+        # SQLite长连接关闭，同时做一次WAL checkpoint
+        async_db_obj: AsyncSqliteDB = media_crawler_db_var.get(None)
+        if async_db_obj is not None:
+            await async_db_obj.close()
+            utils.logger.info("[close] sqlite db connection closed")
     else:
         # MySQL连接池关闭
-        db_pool: aiomysql.Pool = db_conn_pool_var.get()
+        db_pool: aiomysql.Pool = db_conn_pool_var.get(None)
         if db_pool is not None:
             db_pool.close()
+            await db_pool.wait_closed()
             utils.logger.info("[close] mysql db pool closed")
 
 
@@ -132,6 +240,7 @@ async def init_table_schema(db_type: str = None):
             schema_sql = await f.read()
             await async_db_obj.executescript(schema_sql)
             utils.logger.info("[init_table_schema] sqlite table schema init successful")
+            await async_db_obj.close()
     elif db_type == "mysql":
         utils.logger.info("[init_table_schema] begin init mysql table schema ...")
         await init_mediacrawler_db()
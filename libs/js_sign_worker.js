@@ -0,0 +1,49 @@
+/**
+ * 签名脚本常驻进程
+ * 启动时加载一次 argv[2] 指定的签名脚本，之后从 stdin 按行读取 JSON 请求 {"id", "method", "args"}，
+ * 调用脚本中的同名函数，并向 stdout 按行写回 {"id", "result"} 或 {"id", "error"}
+ */
+const fs = require('fs');
+const readline = require('readline');
+
+const scriptPath = process.argv[2];
+const source = fs.readFileSync(scriptPath, 'utf-8').replace(/^\uFEFF/, '');
+
+// stdout 是和 python 通信的管道，签名脚本里的日志输出统一改到 stderr
+const writeLine = (obj) => process.stdout.write(JSON.stringify(obj) + '\n');
+console.log = console.info = console.debug = console.warn = console.error;
+
+// 和 execjs 一样把脚本放在同一个函数作用域里执行，通过 eval 按名字取到脚本中定义的函数
+const scriptModule = {exports: {}};
+const callFunction = new Function(
+    'require', 'module', 'exports',
+    source + '\n;return function (__name, __args) { return eval(__name).apply(null, __args); };'
+)(require, scriptModule, scriptModule.exports);
+
+const methodNamePattern = /^[A-Za-z_$][\w$]*$/;
+
+const rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', (line) => {
+    if (!line.trim()) {
+        return;
+    }
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (e) {
+        writeLine({id: null, error: `invalid request: ${e}`});
+        return;
+    }
+    try {
+        if (!methodNamePattern.test(request.method)) {
+            throw new Error(`invalid method name: ${request.method}`);
+        }
+        const result = callFunction(request.method, request.args || []);
+        writeLine({id: request.id, result: result === undefined ? null : result});
+    } catch (e) {
+        writeLine({id: request.id, error: String(e && e.stack || e)});
+    }
+});
+rl.on('close', () => process.exit(0));
+
+writeLine({ready: true});
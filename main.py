@@ -10,13 +10,13 @@
 
 
 import asyncio
-import sys
-from typing import Optional
+import signal
+from typing import List
 
 import cmd_arg
 import config
 import db
-from base.base_crawler import AbstractCrawler
+from base.base_crawler import AbstractApiClient, AbstractCrawler, AbstractStore
 from media_platform.bilibili import BilibiliCrawler
 from media_platform.douyin import DouYinCrawler
 from media_platform.kuaishou import KuaishouCrawler
@@ -25,6 +25,22 @@ from media_platform.weibo import WeiboCrawler
 from media_platform.xhs import XiaoHongShuCrawler
 from media_platform.zhihu import ZhihuCrawler
 from media_platform.tiktok import TikTokCrawler
+from store import bilibili as bilibili_store
+from store import douyin as douyin_store
+from store import kuaishou as kuaishou_store
+from store import tieba as tieba_store
+from store import tiktok as tiktok_store
+from store import weibo as weibo_store
+from store import xhs as xhs_store
+from store import zhihu as zhihu_store
+from tools import utils
+from tools.async_file_writer import AsyncBufferedFileWriter
+from tools.checkpoint import CrawlCheckpoint
+from tools.distributed_queue import run_coordinator
+from tools.js_sign_pool import JsSignPool
+from tools.shard_runner import apply_shard, run_shards
+from tools.words import AsyncWordCloudGenerator
+from var import platform_var
 
 
 class CrawlerFactory:
@@ -39,6 +55,17 @@ class CrawlerFactory:
         "tk": TikTokCrawler,
     }
 
+    STORE_FACTORIES = {
+        "xhs": xhs_store.XhsStoreFactory,
+        "dy": douyin_store.DouyinStoreFactory,
+        "ks": kuaishou_store.KuaishouStoreFactory,
+        "bili": bilibili_store.BiliStoreFactory,
+        "wb": weibo_store.WeibostoreFactory,
+        "tieba": tieba_store.TieBaStoreFactory,
+        "zhihu": zhihu_store.ZhihuStoreFactory,
+        "tk": tiktok_store.TikTokStoreFactory,
+    }
+
     @staticmethod
     def create_crawler(platform: str) -> AbstractCrawler:
         crawler_class = CrawlerFactory.CRAWLERS.get(platform)
@@ -48,35 +75,183 @@ class CrawlerFactory:
             )
         return crawler_class()
 
+    @staticmethod
+    def create_store(platform: str) -> AbstractStore:
+        store_factory = CrawlerFactory.STORE_FACTORIES.get(platform)
+        if not store_factory:
+            raise ValueError(
+                "Invalid Media Platform Currently only supported xhs or dy or ks or bili ..."
+            )
+        return store_factory.create_store()
+
+    @staticmethod
+    def get_platforms() -> List[str]:
+        """
+        获取本次运行要爬取的平台，配置了 PLATFORMS 时同时爬取其中的多个平台，否则只爬取 PLATFORM
+        Returns:
+
+        """
+        if not config.PLATFORMS:
+            return [config.PLATFORM]
+        platforms = []
+        for platform in config.PLATFORMS.split(","):
+            platform = platform.strip()
+            if platform not in CrawlerFactory.CRAWLERS:
+                raise ValueError(f"Invalid Media Platform: {platform}")
+            if platform not in platforms:
+                platforms.append(platform)
+        return platforms
+
+    @staticmethod
+    def check_resume(platforms: List[str]):
+        """
+        --resume 只对支持断点的平台和爬取类型生效，其他情况给出提示
+        Args:
+            platforms: 本次运行的平台
+
+        Returns:
+
+        """
+        if not config.RESUME:
+            return
+        for platform in platforms:
+            if config.CRAWLER_TYPE not in CrawlerFactory.CRAWLERS[platform].checkpoint_crawler_types:
+                utils.logger.warning(
+                    f"[CrawlerFactory.check_resume] --resume has no effect for platform {platform} "
+                    f"with crawler type {config.CRAWLER_TYPE}, it will crawl from the beginning"
+                )
+
+    @staticmethod
+    def check_distributed(platforms: List[str]):
+        """
+        分布式模式下检查所有平台都支持分布式爬取，不支持时在启动前报错
+        Args:
+            platforms: 本次运行的平台
 
-crawler: Optional[AbstractCrawler] = None
+        Returns:
+
+        """
+        if not config.DISTRIBUTED_ROLE:
+            return
+        unsupported = [
+            platform for platform in platforms
+            if not CrawlerFactory.CRAWLERS[platform].supports_distributed
+        ]
+        if unsupported:
+            supported = [
+                platform for platform, crawler_class in CrawlerFactory.CRAWLERS.items()
+                if crawler_class.supports_distributed
+            ]
+            raise ValueError(
+                f"--role {config.DISTRIBUTED_ROLE} is not supported for platform {', '.join(unsupported)}, "
+                f"supported platforms: {', '.join(supported)}"
+            )
+
+
+async def run_crawler(platform: str):
+    """
+    运行单个平台的爬虫，每个平台在独立的任务中运行，平台相关的上下文变量互不影响；
+    数据库连接池、API 客户端和存储写入器在各平台之间共享，浏览器上下文由各平台的爬虫各自创建
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+    platform_var.set(platform)
+    crawler = CrawlerFactory.create_crawler(platform=platform)
+    if config.DISTRIBUTED_ROLE == "coordinator":
+        # 协调进程只负责把任务放入队列，由 worker 进程登录后领取执行
+        await run_coordinator(crawler)
+        return
+    # 存储对象在一次运行中是单例，开始爬取前打开，结束时落盘并关闭
+    await CrawlerFactory.create_store(platform=platform).open()
+    await crawler.start()
+
+
+async def run_crawlers(platforms: List[str]):
+    """
+    在同一个事件循环中同时运行多个平台的爬虫，某个平台失败不影响其他平台继续爬取
+    Args:
+        platforms: 平台名称列表
+
+    Returns:
+
+    """
+    results = await asyncio.gather(
+        *(run_crawler(platform) for platform in platforms), return_exceptions=True
+    )
+    errors = []
+    for platform, result in zip(platforms, results):
+        if isinstance(result, BaseException):
+            utils.logger.error(f"[main.run_crawlers] platform {platform} crawl failed: {result!r}")
+            errors.append(result)
+    if errors:
+        raise errors[0]
+
+
+def handle_interrupt():
+    """
+    Ctrl-C 时取消主任务而不是直接抛出 KeyboardInterrupt，这样 main 中 finally 的清理在主任务的上下文中执行
+    （数据库连接保存在上下文变量中）；再次 Ctrl-C 恢复默认行为，可以强制退出
+    """
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+
+    def cancel_main_task():
+        loop.remove_signal_handler(signal.SIGINT)
+        main_task.cancel()
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, cancel_main_task)
+    except NotImplementedError:
+        # Windows 的事件循环不支持 add_signal_handler
+        pass
 
 
 async def main():
-    # Init crawler
-    global crawler
+    handle_interrupt()
 
     # parse cmd
     await cmd_arg.parse_cmd()
+    CrawlerFactory.check_distributed(CrawlerFactory.get_platforms())
+    CrawlerFactory.check_resume(CrawlerFactory.get_platforms())
+
+    if config.SHARD_COUNT > 1:
+        # 分片子进程只爬取分给自己的关键词和 id
+        apply_shard(config.SHARD_INDEX, config.SHARD_COUNT)
+    elif config.SHARD_WORKERS > 1:
+        # 父进程只负责启动和管理分片子进程
+        await run_shards(CrawlerFactory.get_platforms())
+        return
 
     # init db
     if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
         await db.init_db()
 
-    crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
-    await crawler.start()
-
-
-def cleanup():
-    if crawler:
-        # asyncio.run(crawler.close())
-        pass
-    if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
-        asyncio.run(db.close())
+    try:
+        platforms = CrawlerFactory.get_platforms()
+        if len(platforms) == 1:
+            await run_crawler(platforms[0])
+        else:
+            await run_crawlers(platforms)
+    except asyncio.CancelledError:
+        utils.logger.info("[main] Crawler interrupted, flushing buffered data ...")
+    finally:
+        # 爬虫结束时 API 客户端的 httpx 连接池可能还没有关闭
+        await AbstractApiClient.close_all()
+        await JsSignPool.close_all()
+        await AbstractStore.close_all()
+        # 数据落盘之后再写入断点，断点中标记完成的数据都已经保存
+        await CrawlCheckpoint.close_all()
+        # db对象保存在当前task的上下文变量中，需要在同一个task里关闭
+        if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
+            await db.close()
+        # 兜底关闭没有经过存储对象关闭的文件写入器
+        await AsyncBufferedFileWriter.close_all()
+        if config.ENABLE_GET_WORDCLOUD:
+            await AsyncWordCloudGenerator.flush_all()
 
 
 if __name__ == "__main__":
-    try:
-        asyncio.get_event_loop().run_until_complete(main())
-    finally:
-        cleanup()
+    asyncio.get_event_loop().run_until_complete(main())
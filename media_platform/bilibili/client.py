@@ -16,20 +16,25 @@
 import asyncio
 import json
 import random
+import time
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext, Page
 
 import config
 from base.base_crawler import AbstractApiClient
-from tools import utils
+from tools import adaptive_concurrency, utils
 
 from .exception import DataFetchError
 from .field import CommentOrderType, SearchOrderType
 from .help import BilibiliSign
 
+# WBI 签名校验失败（风控校验失败）的错误码
+WBI_SIGN_ERROR_CODE = -352
+# 请求被拦截的错误码
+REQUEST_BLOCKED_CODE = -412
+
 
 class BilibiliClient(AbstractApiClient):
     def __init__(
@@ -47,18 +52,28 @@ class BilibiliClient(AbstractApiClient):
         self._host = "https://api.bilibili.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        # WBI 签名对象（含 img_key / sub_key 推导出的 salt）缓存及其过期时间
+        self._wbi_sign: Optional[BilibiliSign] = None
+        self._wbi_expire_at: float = 0
+        self._wbi_lock: Optional[asyncio.Lock] = None
+        self._wbi_refresh_task: Optional[asyncio.Task] = None
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+        client = self.get_http_client(self.proxies)
+        response = await client.request(
+            method, url, timeout=self.timeout,
+            **kwargs
+        )
         try:
             data: Dict = response.json()
         except json.JSONDecodeError:
             utils.logger.error(f"[BilibiliClient.request] Failed to decode JSON from response. status_code: {response.status_code}, response_text: {response.text}")
             raise DataFetchError(f"Failed to decode JSON, content: {response.text}")
+        if data.get("code") == WBI_SIGN_ERROR_CODE:
+            # 签名校验失败，可能是 wbi key 已经轮换，丢弃缓存让下次请求重新获取
+            self.invalidate_wbi_sign()
+        if data.get("code") in (WBI_SIGN_ERROR_CODE, REQUEST_BLOCKED_CODE):
+            adaptive_concurrency.record_block(f"bilibili code {data.get('code')}")
         if data.get("code") != 0:
             raise DataFetchError(data.get("message", "unkonw error"))
         else:
@@ -74,8 +89,54 @@ class BilibiliClient(AbstractApiClient):
         """
         if not req_data:
             return {}
+        wbi_sign = await self.get_wbi_sign()
+        return wbi_sign.sign(req_data)
+
+    async def get_wbi_sign(self) -> BilibiliSign:
+        """
+        获取缓存的 WBI 签名对象，避免每个请求都读取页面 localStorage 和重新计算 salt
+        没有缓存时同步获取；缓存过期时先返回旧的签名对象，在后台刷新
+        :return:
+        """
+        if self._wbi_sign is None:
+            if self._wbi_lock is None:
+                self._wbi_lock = asyncio.Lock()
+            async with self._wbi_lock:
+                if self._wbi_sign is None:
+                    await self.refresh_wbi_sign()
+        elif time.time() >= self._wbi_expire_at and (
+                self._wbi_refresh_task is None or self._wbi_refresh_task.done()):
+            self._wbi_refresh_task = asyncio.create_task(self._background_refresh_wbi_sign())
+        return self._wbi_sign
+
+    async def refresh_wbi_sign(self):
+        """
+        重新获取 img_key 和 sub_key 并更新缓存
+        :return:
+        """
         img_key, sub_key = await self.get_wbi_keys()
-        return BilibiliSign(img_key, sub_key).sign(req_data)
+        self._wbi_sign = BilibiliSign(img_key, sub_key)
+        self._wbi_expire_at = time.time() + config.BILI_WBI_KEY_TTL
+
+    async def _background_refresh_wbi_sign(self):
+        try:
+            await self.refresh_wbi_sign()
+        except Exception as e:
+            # 刷新失败时继续使用旧的 key，下一次请求会再次尝试刷新
+            utils.logger.warning(f"[BilibiliClient._background_refresh_wbi_sign] refresh wbi keys failed: {e}")
+
+    def invalidate_wbi_sign(self):
+        """
+        丢弃缓存的 WBI 签名对象
+        :return:
+        """
+        self._wbi_sign = None
+        self._wbi_expire_at = 0
+
+    async def close(self):
+        if self._wbi_refresh_task and not self._wbi_refresh_task.done():
+            self._wbi_refresh_task.cancel()
+        await super().close()
 
     async def get_wbi_keys(self) -> Tuple[str, str]:
         """
@@ -202,13 +263,13 @@ class BilibiliClient(AbstractApiClient):
         return await self.get(uri, params, enable_params_sign=True)
 
     async def get_video_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-            if not response.reason_phrase == "OK":
-                utils.logger.error(f"[BilibiliClient.get_video_media] request {url} err, res:{response.text}")
-                return None
-            else:
-                return response.content
+        client = self.get_http_client(self.proxies)
+        response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
+        if not response.reason_phrase == "OK":
+            utils.logger.error(f"[BilibiliClient.get_video_media] request {url} err, res:{response.text}")
+            return None
+        else:
+            return response.content
 
     async def get_video_comments(self,
                                  video_id: str,
@@ -18,7 +18,7 @@ import asyncio
 import os
 import random
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple, Union
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import pandas as pd
 
@@ -35,9 +35,11 @@ import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import bilibili as bilibili_store
-from tools import utils
+from tools import rate_limiter, utils
+from tools.adaptive_concurrency import get_concurrency_limiter
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.crawler_pipeline import CrawlerPipeline, run_keywords
+from var import crawler_type_var
 
 from .client import BilibiliClient
 from .exception import DataFetchError
@@ -180,68 +182,86 @@ class BilibiliCrawler(AbstractCrawler):
         utils.logger.info(
             "[BilibiliCrawler.search_by_keywords] Begin search bilibli keywords"
         )
+        # 详情和评论阶段各自使用按工作任务数创建的信号量，避免评论请求占满详情阶段需要的并发
+        detail_semaphore = get_concurrency_limiter(config.PIPELINE_DETAIL_WORKERS)
+        comment_semaphore = get_concurrency_limiter(config.PIPELINE_COMMENT_WORKERS)
+        # 搜索翻页、视频详情、评论作为流水线的三个阶段，前一页视频的评论还在抓取时下一页已经开始搜索和获取详情
+        pipeline = CrawlerPipeline("bilibili_search")
+        pipeline.add_stage(
+            "detail",
+            lambda aid: self.get_search_video_detail(aid, detail_semaphore),
+            workers=config.PIPELINE_DETAIL_WORKERS,
+        )
+        pipeline.add_stage(
+            "comment",
+            lambda video_id: self.get_comments(video_id, comment_semaphore),
+            workers=config.PIPELINE_COMMENT_WORKERS,
+        )
+        await pipeline.run_keywords(self.iter_search_video_aids)
+
+    async def iter_search_video_aids(self, keyword: str) -> AsyncIterator[int]:
+        """
+        按关键词翻页搜索，逐个产生视频 aid
+        :param keyword:
+        :return:
+        """
         bili_limit_count = 20  # bilibili limit page fixed value
         if config.CRAWLER_MAX_NOTES_COUNT < bili_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = bili_limit_count
         start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        utils.logger.info(
+            f"[BilibiliCrawler.search_by_keywords] Current search keyword: {keyword}"
+        )
+        page = 1
+        while (
+            page - start_page + 1
+        ) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(
+                    f"[BilibiliCrawler.search_by_keywords] Skip page: {page}"
+                )
+                page += 1
+                continue
+
             utils.logger.info(
-                f"[BilibiliCrawler.search_by_keywords] Current search keyword: {keyword}"
+                f"[BilibiliCrawler.search_by_keywords] search bilibili keyword: {keyword}, page: {page}"
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(
-                        f"[BilibiliCrawler.search_by_keywords] Skip page: {page}"
-                    )
-                    page += 1
-                    continue
+            videos_res = await self.bili_client.search_video_by_keyword(
+                keyword=keyword,
+                page=page,
+                page_size=bili_limit_count,
+                order=SearchOrderType.DEFAULT,
+                pubtime_begin_s=0,  # 作品发布日期起始时间戳
+                pubtime_end_s=0,  # 作品发布日期结束日期时间戳
+            )
+            video_list: List[Dict] = videos_res.get("result")
 
+            if not video_list:
                 utils.logger.info(
-                    f"[BilibiliCrawler.search_by_keywords] search bilibili keyword: {keyword}, page: {page}"
+                    f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword."
                 )
-                video_id_list: List[str] = []
-                videos_res = await self.bili_client.search_video_by_keyword(
-                    keyword=keyword,
-                    page=page,
-                    page_size=bili_limit_count,
-                    order=SearchOrderType.DEFAULT,
-                    pubtime_begin_s=0,  # 作品发布日期起始时间戳
-                    pubtime_end_s=0,  # 作品发布日期结束日期时间戳
-                )
-                video_list: List[Dict] = videos_res.get("result")
+                break
 
-                if not video_list:
-                    utils.logger.info(
-                        f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword."
-                    )
-                    break
+            for video_item in video_list:
+                yield video_item.get("aid")
+            page += 1
 
-                semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                task_list = []
-                try:
-                    task_list = [
-                        self.get_video_info_task(
-                            aid=video_item.get("aid"), bvid="", semaphore=semaphore
-                        )
-                        for video_item in video_list
-                    ]
-                except Exception as e:
-                    utils.logger.warning(
-                        f"[BilibiliCrawler.search_by_keywords] error in the task list. The video for this page will not be included. {e}"
-                    )
-                video_items = await asyncio.gather(*task_list)
-                for video_item in video_items:
-                    if video_item:
-                        video_id_list.append(video_item.get("View").get("aid"))
-                        await bilibili_store.update_bilibili_video(video_item)
-                        await bilibili_store.update_up_info(video_item)
-                        await self.get_bilibili_video(video_item, semaphore)
-                page += 1
-                await self.batch_get_video_comments(video_id_list)
+    async def get_search_video_detail(self, aid: int, semaphore: asyncio.Semaphore) -> List[str]:
+        """
+        流水线的详情阶段：获取并保存视频详情，返回需要抓取评论的视频 id
+        :param aid:
+        :param semaphore:
+        :return:
+        """
+        video_item = await self.get_video_info_task(aid=aid, bvid="", semaphore=semaphore)
+        if not video_item:
+            return []
+        await bilibili_store.update_bilibili_video(video_item)
+        await bilibili_store.update_up_info(video_item)
+        await self.get_bilibili_video(video_item, semaphore)
+        if not config.ENABLE_GET_COMMENTS:
+            return []
+        return [video_item.get("View").get("aid")]
 
     async def search_by_keywords_in_time_range(self, daily_limit: bool):
         """
@@ -254,8 +274,7 @@ class BilibiliCrawler(AbstractCrawler):
         bili_limit_count = 20
         start_page = config.START_PAGE
 
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        async def search_keyword(keyword: str):
             utils.logger.info(
                 f"[BilibiliCrawler.search_by_keywords_in_time_range] Current search keyword: {keyword}"
             )
@@ -333,7 +352,7 @@ class BilibiliCrawler(AbstractCrawler):
                             )
                             break
 
-                        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+                        semaphore = get_concurrency_limiter()
                         task_list = [
                             self.get_video_info_task(
                                 aid=video_item.get("aid"), bvid="", semaphore=semaphore
@@ -374,6 +393,8 @@ class BilibiliCrawler(AbstractCrawler):
                         )
                         break
 
+        await run_keywords(search_keyword)
+
     async def batch_get_video_comments(self, video_id_list: List[str]):
         """
         batch get video comments
@@ -389,7 +410,7 @@ class BilibiliCrawler(AbstractCrawler):
         utils.logger.info(
             f"[BilibiliCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(
@@ -410,10 +431,10 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.info(
                     f"[BilibiliCrawler.get_comments] begin get video_id: {video_id} comments ..."
                 )
-                await asyncio.sleep(random.uniform(0.5, 1.5))
+                await asyncio.sleep(rate_limiter.crawl_interval(random.uniform(0.5, 1.5)))
                 await self.bili_client.get_video_all_comments(
                     video_id=video_id,
-                    crawl_interval=random.random(),
+                    crawl_interval=rate_limiter.crawl_interval(random.random()),
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
                     callback=bilibili_store.batch_update_bilibili_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
@@ -443,7 +464,7 @@ class BilibiliCrawler(AbstractCrawler):
             await self.get_specified_videos(video_bvids_list)
             if int(result["page"]["count"]) <= pn * ps:
                 break
-            await asyncio.sleep(random.random())
+            await asyncio.sleep(rate_limiter.crawl_interval(random.random()))
             pn += 1
 
     async def get_specified_videos(self, bvids_list: List[str]):
@@ -451,7 +472,7 @@ class BilibiliCrawler(AbstractCrawler):
         get specified videos info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list = [
             self.get_video_info_task(aid=0, bvid=video_id, semaphore=semaphore)
             for video_id in bvids_list
@@ -569,7 +590,7 @@ class BilibiliCrawler(AbstractCrawler):
             # feat issue #14
             # we will save login state to avoid login every time
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", config.USER_DATA_DIR % "bili"
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -625,6 +646,9 @@ class BilibiliCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端复用的 httpx 连接池
+        if getattr(self, "bili_client", None):
+            await self.bili_client.close()
         try:
             # 如果使用CDP模式，需要特殊处理
             if self.cdp_manager:
@@ -694,7 +718,7 @@ class BilibiliCrawler(AbstractCrawler):
             f"[BilibiliCrawler.get_creator_details] creator ids:{creator_id_list}"
         )
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list: List[Task] = []
         try:
             for creator_id in creator_id_list:
@@ -745,7 +769,7 @@ class BilibiliCrawler(AbstractCrawler):
                 )
                 await self.bili_client.get_creator_all_fans(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=rate_limiter.crawl_interval(random.random()),
                     callback=bilibili_store.batch_update_bilibili_creator_fans,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -774,7 +798,7 @@ class BilibiliCrawler(AbstractCrawler):
                 )
                 await self.bili_client.get_creator_all_followings(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=rate_limiter.crawl_interval(random.random()),
                     callback=bilibili_store.batch_update_bilibili_creator_followings,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -803,7 +827,7 @@ class BilibiliCrawler(AbstractCrawler):
                 )
                 await self.bili_client.get_creator_all_dynamics(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
+                    crawl_interval=rate_limiter.crawl_interval(random.random()),
                     callback=bilibili_store.batch_update_bilibili_creator_dynamics,
                     max_count=config.CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES,
                 )
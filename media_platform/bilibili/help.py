@@ -31,12 +31,17 @@ class BilibiliSign:
             61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
             36, 20, 34, 44, 52
         ]
+        # salt 只和 img_key / sub_key 有关，在构造时算好，签名时直接使用
+        self.salt = self._mixin_salt()
 
     def get_salt(self) -> str:
         """
         获取加盐的 key
         :return:
         """
+        return self.salt
+
+    def _mixin_salt(self) -> str:
         salt = ""
         mixin_key = self.img_key + self.sub_key
         for mt in self.map_table:
@@ -60,8 +65,7 @@ class BilibiliSign:
             in req_data.items()
         }
         query = urllib.parse.urlencode(req_data)
-        salt = self.get_salt()
-        wbi_sign = md5((query + salt).encode()).hexdigest()  # 计算 w_rid
+        wbi_sign = md5((query + self.salt).encode()).hexdigest()  # 计算 w_rid
         req_data['w_rid'] = wbi_sign
         return req_data
 
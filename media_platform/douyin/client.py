@@ -15,11 +15,10 @@ import json
 import urllib.parse
 from typing import Any, Callable, Dict, Optional
 
-import requests
 from playwright.async_api import BrowserContext
 
 from base.base_crawler import AbstractApiClient
-from tools import utils
+from tools import adaptive_concurrency, utils
 from var import request_keyword_var
 
 from .exception import *
@@ -92,14 +91,15 @@ class DOUYINClient(AbstractApiClient):
         params["a_bogus"] = a_bogus
 
     async def request(self, method, url, **kwargs):
-        response = None
-        if method == "GET":
-            response = requests.request(method, url, **kwargs)
-        elif method == "POST":
-            response = requests.request(method, url, **kwargs)
+        # 原先使用阻塞的 requests，会卡住事件循环导致详情、评论等任务无法并发，这里改为复用连接池的 httpx 异步客户端
+        # requests 默认跟随重定向，httpx 默认不跟随，这里显式打开以保持原有行为
+        kwargs.setdefault("follow_redirects", True)
+        client = self.get_http_client(self.proxies)
+        response = await client.request(method, url, timeout=self.timeout, **kwargs)
         try:
             if response.text == "" or response.text == "blocked":
                 utils.logger.error(f"request params incrr, response.text: {response.text}")
+                adaptive_concurrency.record_block("douyin account blocked")
                 raise Exception("account blocked")
             return response.json()
         except Exception as e:
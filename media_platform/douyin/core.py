@@ -13,7 +13,7 @@ import asyncio
 import os
 import random
 from asyncio import Task
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -27,9 +27,11 @@ import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import douyin as douyin_store
-from tools import utils
+from tools import rate_limiter, utils
+from tools.adaptive_concurrency import get_concurrency_limiter
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.crawler_pipeline import CrawlerPipeline
+from var import crawler_type_var
 
 from .client import DOUYINClient
 from .exception import DataFetchError
@@ -111,69 +113,87 @@ class DouYinCrawler(AbstractCrawler):
 
     async def search(self) -> None:
         utils.logger.info("[DouYinCrawler.search] Begin search douyin keywords")
+        semaphore = get_concurrency_limiter(config.PIPELINE_COMMENT_WORKERS)
+        # 搜索翻页、保存视频、评论作为流水线的三个阶段，评论不再等到关键词的所有搜索页都翻完才开始
+        pipeline = CrawlerPipeline("douyin_search")
+        pipeline.add_stage(
+            "aweme", self.save_search_aweme, workers=config.PIPELINE_DETAIL_WORKERS
+        )
+        pipeline.add_stage(
+            "comment",
+            lambda aweme_id: self.get_comments(aweme_id, semaphore),
+            workers=config.PIPELINE_COMMENT_WORKERS,
+        )
+        await pipeline.run_keywords(self.iter_search_awemes)
+
+    async def iter_search_awemes(self, keyword: str) -> AsyncIterator[Dict]:
+        """
+        按关键词翻页搜索，逐个产生视频信息
+        """
         dy_limit_count = 10  # douyin limit page fixed value
         if config.CRAWLER_MAX_NOTES_COUNT < dy_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = dy_limit_count
         start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(f"[DouYinCrawler.search] Current keyword: {keyword}")
-            aweme_list: List[str] = []
-            page = 0
-            dy_search_id = ""
-            while (
-                page - start_page + 1
-            ) * dy_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[DouYinCrawler.search] Skip {page}")
-                    page += 1
-                    continue
-                try:
+        utils.logger.info(f"[DouYinCrawler.search] Current keyword: {keyword}")
+        page = 0
+        dy_search_id = ""
+        while (
+            page - start_page + 1
+        ) * dy_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[DouYinCrawler.search] Skip {page}")
+                page += 1
+                continue
+            try:
+                utils.logger.info(
+                    f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page}"
+                )
+                posts_res = await self.dy_client.search_info_by_keyword(
+                    keyword=keyword,
+                    offset=page * dy_limit_count - dy_limit_count,
+                    publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
+                    search_id=dy_search_id,
+                )
+                if posts_res.get("data") is None or posts_res.get("data") == []:
                     utils.logger.info(
-                        f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page}"
-                    )
-                    posts_res = await self.dy_client.search_info_by_keyword(
-                        keyword=keyword,
-                        offset=page * dy_limit_count - dy_limit_count,
-                        publish_time=PublishTimeType(config.PUBLISH_TIME_TYPE),
-                        search_id=dy_search_id,
-                    )
-                    if posts_res.get("data") is None or posts_res.get("data") == []:
-                        utils.logger.info(
-                            f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page} is empty,{posts_res.get('data')}`"
-                        )
-                        break
-                except DataFetchError:
-                    utils.logger.error(
-                        f"[DouYinCrawler.search] search douyin keyword: {keyword} failed"
+                        f"[DouYinCrawler.search] search douyin keyword: {keyword}, page: {page} is empty,{posts_res.get('data')}`"
                     )
                     break
+            except DataFetchError:
+                utils.logger.error(
+                    f"[DouYinCrawler.search] search douyin keyword: {keyword} failed"
+                )
+                break
 
-                page += 1
-                if "data" not in posts_res:
-                    utils.logger.error(
-                        f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。"
+            page += 1
+            if "data" not in posts_res:
+                utils.logger.error(
+                    f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。"
+                )
+                break
+            dy_search_id = posts_res.get("extra", {}).get("logid", "")
+            for post_item in posts_res.get("data"):
+                try:
+                    aweme_info: Dict = (
+                        post_item.get("aweme_info")
+                        or post_item.get("aweme_mix_info", {}).get("mix_items")[0]
                     )
-                    break
-                dy_search_id = posts_res.get("extra", {}).get("logid", "")
-                for post_item in posts_res.get("data"):
-                    try:
-                        aweme_info: Dict = (
-                            post_item.get("aweme_info")
-                            or post_item.get("aweme_mix_info", {}).get("mix_items")[0]
-                        )
-                    except TypeError:
-                        continue
-                    aweme_list.append(aweme_info.get("aweme_id", ""))
-                    await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
-            utils.logger.info(
-                f"[DouYinCrawler.search] keyword:{keyword}, aweme_list:{aweme_list}"
-            )
-            await self.batch_get_note_comments(aweme_list)
+                except TypeError:
+                    continue
+                yield aweme_info
+
+    async def save_search_aweme(self, aweme_info: Dict) -> List[str]:
+        """
+        流水线的视频阶段：保存搜索到的视频，返回需要抓取评论的视频 id
+        """
+        await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
+        if not config.ENABLE_GET_COMMENTS:
+            return []
+        return [aweme_info.get("aweme_id", "")]
 
     async def get_specified_awemes(self):
         """Get the information and comments of the specified post"""
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list = [
             self.get_aweme_detail(aweme_id=aweme_id, semaphore=semaphore)
             for aweme_id in config.DY_SPECIFIED_ID_LIST
@@ -213,7 +233,7 @@ class DouYinCrawler(AbstractCrawler):
             return
 
         task_list: List[Task] = []
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         for aweme_id in aweme_list:
             task = asyncio.create_task(
                 self.get_comments(aweme_id, semaphore), name=aweme_id
@@ -228,7 +248,7 @@ class DouYinCrawler(AbstractCrawler):
                 # 将关键词列表传递给 get_aweme_all_comments 方法
                 await self.dy_client.get_aweme_all_comments(
                     aweme_id=aweme_id,
-                    crawl_interval=random.random(),
+                    crawl_interval=rate_limiter.crawl_interval(random.random()),
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
                     callback=douyin_store.batch_update_dy_aweme_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
@@ -265,7 +285,7 @@ class DouYinCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list = [
             self.get_aweme_detail(post_item.get("aweme_id"), semaphore)
             for post_item in video_list
@@ -306,7 +326,7 @@ class DouYinCrawler(AbstractCrawler):
         """Launch browser and create browser context"""
         if config.SAVE_LOGIN_STATE:
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", config.USER_DATA_DIR % "dy"
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -362,6 +382,9 @@ class DouYinCrawler(AbstractCrawler):
 
     async def close(self) -> None:
         """Close browser context"""
+        # 关闭 API 客户端复用的 httpx 连接池
+        if getattr(self, "dy_client", None):
+            await self.dy_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
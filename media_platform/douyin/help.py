@@ -20,7 +20,10 @@ import random
 import execjs
 from playwright.async_api import Page
 
-douyin_sign_obj = execjs.compile(open('libs/douyin.js', encoding='utf-8-sig').read())
+from tools import js_sign_pool
+
+DOUYIN_SIGN_JS = "libs/douyin.js"
+douyin_sign_obj = execjs.compile(open(DOUYIN_SIGN_JS, encoding='utf-8-sig').read())
 
 def get_web_id():
     """
@@ -48,7 +51,21 @@ async def get_a_bogus(url: str, params: str, post_data: dict, user_agent: str, p
     """
     获取 a_bogus 参数, 目前不支持post请求类型的签名
     """
-    return get_a_bogus_from_js(url, params, user_agent)
+    return await js_sign_pool.sign(DOUYIN_SIGN_JS, get_sign_js_name(url), params, user_agent)
+
+
+def get_sign_js_name(url: str) -> str:
+    """
+    评论接口和其他接口使用不同的签名函数
+    Args:
+        url:
+
+    Returns:
+
+    """
+    if "/reply" in url:
+        return "sign_reply"
+    return "sign_datail"
 
 def get_a_bogus_from_js(url: str, params: str, user_agent: str):
     """
@@ -61,10 +78,7 @@ def get_a_bogus_from_js(url: str, params: str, user_agent: str):
     Returns:
 
     """
-    sign_js_name = "sign_datail"
-    if "/reply" in url:
-        sign_js_name = "sign_reply"
-    return douyin_sign_obj.call(sign_js_name, params, user_agent)
+    return douyin_sign_obj.call(get_sign_js_name(url), params, user_agent)
 
 
 
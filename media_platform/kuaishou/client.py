@@ -15,7 +15,6 @@ import json
 from typing import Any, Callable, Dict, List, Optional
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext, Page
 
 import config
@@ -45,8 +44,8 @@ class KuaiShouClient(AbstractApiClient):
         self.graphql = KuaiShouGraphQL()
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        client = self.get_http_client(self.proxies)
+        response = await client.request(method, url, timeout=self.timeout, **kwargs)
         data: Dict = response.json()
         if data.get("errors"):
             raise DataFetchError(data.get("errors", "unkonw error"))
@@ -183,6 +182,8 @@ class KuaiShouClient(AbstractApiClient):
         crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
+        pcursor: str = "",
+        cursor_callback: Optional[Callable] = None,
     ):
         """
         get video all comments include sub comments
@@ -190,11 +191,12 @@ class KuaiShouClient(AbstractApiClient):
         :param crawl_interval:
         :param callback:
         :param max_count:
+        :param pcursor: 起始游标，失败重试时从上次处理完的那一页之后继续
+        :param cursor_callback: 一页评论（含二级评论）处理完后回调下一页的游标和这一页的评论
         :return:
         """
 
         result = []
-        pcursor = ""
 
         while pcursor != "no_more" and len(result) < max_count:
             comments_res = await self.get_video_comments(photo_id, pcursor)
@@ -211,6 +213,8 @@ class KuaiShouClient(AbstractApiClient):
                 comments, photo_id, crawl_interval, callback
             )
             result.extend(sub_comments)
+            if cursor_callback:
+                await cursor_callback(pcursor, comments)
         return result
 
     async def get_comments_all_sub_comments(
@@ -12,7 +12,6 @@
 import asyncio
 import os
 import random
-import time
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple
 
@@ -28,9 +27,11 @@ import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import kuaishou as kuaishou_store
-from tools import utils
+from tools import adaptive_concurrency, rate_limiter, utils
+from tools.adaptive_concurrency import get_concurrency_limiter
 from tools.cdp_browser import CDPBrowserManager
-from var import comment_tasks_var, crawler_type_var, source_keyword_var
+from tools.crawler_pipeline import run_keywords
+from var import crawler_type_var
 
 from .client import KuaiShouClient
 from .exception import DataFetchError
@@ -47,6 +48,10 @@ class KuaishouCrawler(AbstractCrawler):
         self.index_url = "https://www.kuaishou.com"
         self.user_agent = utils.get_user_agent()
         self.cdp_manager = None
+        # 评论接口被封禁后的共享冷却状态：事件未设置表示正在冷却恢复，所有评论任务等待；
+        # 每完成一次恢复版本号加一，恢复前就已经发出的请求失败时不再重复冷却
+        self._cooldown_done: Optional[asyncio.Event] = None
+        self._recovery_version = 0
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
@@ -117,9 +122,9 @@ class KuaishouCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < ks_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = ks_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
+
+        async def search_keyword(keyword: str):
             search_session_id = ""
-            source_keyword_var.set(keyword)
             utils.logger.info(
                 f"[KuaishouCrawler.search] Current search keyword: {keyword}"
             )
@@ -161,9 +166,11 @@ class KuaishouCrawler(AbstractCrawler):
                 page += 1
                 await self.batch_get_video_comments(video_id_list)
 
+        await run_keywords(search_keyword)
+
     async def get_specified_videos(self):
         """Get the information and comments of the specified post"""
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list = [
             self.get_video_info_task(video_id=video_id, semaphore=semaphore)
             for video_id in config.KS_SPECIFIED_ID_LIST
@@ -211,7 +218,7 @@ class KuaishouCrawler(AbstractCrawler):
         utils.logger.info(
             f"[KuaishouCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(
@@ -219,7 +226,6 @@ class KuaishouCrawler(AbstractCrawler):
             )
             task_list.append(task)
 
-        comment_tasks_var.set(task_list)
         await asyncio.gather(*task_list)
 
     async def get_comments(self, video_id: str, semaphore: asyncio.Semaphore):
@@ -229,35 +235,87 @@ class KuaishouCrawler(AbstractCrawler):
         :param semaphore:
         :return:
         """
-        async with semaphore:
-            try:
-                utils.logger.info(
-                    f"[KuaishouCrawler.get_comments] begin get video_id: {video_id} comments ..."
-                )
-                await self.ks_client.get_video_all_comments(
-                    photo_id=video_id,
-                    crawl_interval=random.random(),
-                    callback=kuaishou_store.batch_update_ks_video_comments,
-                    max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
-                )
-            except DataFetchError as ex:
-                utils.logger.error(
-                    f"[KuaishouCrawler.get_comments] get video_id: {video_id} comment error: {ex}"
-                )
-            except Exception as e:
-                utils.logger.error(
-                    f"[KuaishouCrawler.get_comments] may be been blocked, err:{e}"
-                )
-                # use time.sleeep block main coroutine instead of asyncio.sleep and cacel running comment task
-                # maybe kuaishou block our request, we will take a nap and update the cookie again
-                current_running_tasks = comment_tasks_var.get()
-                for task in current_running_tasks:
-                    task.cancel()
-                time.sleep(20)
-                await self.context_page.goto(f"{self.index_url}?isHome=1")
-                await self.ks_client.update_cookies(
-                    browser_context=self.browser_context
-                )
+        # 已经保存的评论页的游标和数量，重试时从这里继续，避免重复写入封禁前已经保存的评论
+        state = {"pcursor": "", "count": 0}
+
+        async def save_cursor(pcursor: str, comments: List[Dict]):
+            state["pcursor"] = pcursor
+            state["count"] += len(comments)
+
+        for attempt in range(config.KS_COMMENT_MAX_RETRIES + 1):
+            await self.wait_cooldown()
+            version = self._recovery_version
+            async with semaphore:
+                try:
+                    utils.logger.info(
+                        f"[KuaishouCrawler.get_comments] begin get video_id: {video_id} comments ..."
+                    )
+                    await self.ks_client.get_video_all_comments(
+                        photo_id=video_id,
+                        crawl_interval=rate_limiter.crawl_interval(random.random()),
+                        callback=kuaishou_store.batch_update_ks_video_comments,
+                        max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES - state["count"],
+                        pcursor=state["pcursor"],
+                        cursor_callback=save_cursor,
+                    )
+                    return
+                except DataFetchError as ex:
+                    utils.logger.error(
+                        f"[KuaishouCrawler.get_comments] get video_id: {video_id} comment error: {ex}"
+                    )
+                    return
+                except Exception as e:
+                    utils.logger.error(
+                        f"[KuaishouCrawler.get_comments] may be been blocked, err:{e}"
+                    )
+                    adaptive_concurrency.record_block("kuaishou comments")
+            if attempt == config.KS_COMMENT_MAX_RETRIES:
+                break
+            # maybe kuaishou block our request, all comment tasks take a nap together and update the cookie again,
+            # then this video is fetched again instead of being dropped
+            await self.cooldown_and_recover(version)
+        utils.logger.error(
+            f"[KuaishouCrawler.get_comments] give up video_id: {video_id} comments after {config.KS_COMMENT_MAX_RETRIES} retries"
+        )
+
+    async def wait_cooldown(self):
+        """
+        正在冷却恢复时等待恢复完成，不阻塞事件循环
+        :return:
+        """
+        if self._cooldown_done is not None:
+            await self._cooldown_done.wait()
+
+    async def cooldown_and_recover(self, version: int):
+        """
+        评论接口被封禁后冷却并刷新 cookie，多个任务同时失败时只有一个任务执行恢复，其余任务等待
+        :param version: 失败的请求发出时的恢复版本号，之后已经恢复过则直接重试
+        :return:
+        """
+        if self._cooldown_done is None:
+            self._cooldown_done = asyncio.Event()
+            self._cooldown_done.set()
+        if not self._cooldown_done.is_set() or version != self._recovery_version:
+            await self._cooldown_done.wait()
+            return
+
+        self._cooldown_done.clear()
+        try:
+            utils.logger.info(
+                f"[KuaishouCrawler.cooldown_and_recover] cool down {config.KS_BLOCK_COOLDOWN_SEC}s and refresh cookies ..."
+            )
+            await asyncio.sleep(config.KS_BLOCK_COOLDOWN_SEC)
+            await self.context_page.goto(f"{self.index_url}?isHome=1")
+            await self.ks_client.update_cookies(
+                browser_context=self.browser_context
+            )
+        except Exception as e:
+            utils.logger.error(
+                f"[KuaishouCrawler.cooldown_and_recover] refresh cookies failed: {e}"
+            )
+        finally:
+            self._recovery_version += 1
+            self._cooldown_done.set()
 
     async def create_ks_client(self, httpx_proxy: Optional[str]) -> KuaiShouClient:
         """Create ks client"""
@@ -294,7 +352,7 @@ class KuaishouCrawler(AbstractCrawler):
         )
         if config.SAVE_LOGIN_STATE:
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", config.USER_DATA_DIR % "ks"
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -361,7 +419,7 @@ class KuaishouCrawler(AbstractCrawler):
             # Get all video information of the creator
             all_video_list = await self.ks_client.get_all_videos_by_creator(
                 user_id=user_id,
-                crawl_interval=random.random(),
+                crawl_interval=rate_limiter.crawl_interval(random.random()),
                 callback=self.fetch_creator_video_detail,
             )
 
@@ -374,7 +432,7 @@ class KuaishouCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list = [
             self.get_video_info_task(post_item.get("photo", {}).get("id"), semaphore)
             for post_item in video_list
@@ -387,6 +445,9 @@ class KuaishouCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端复用的 httpx 连接池
+        if getattr(self, "ks_client", None):
+            await self.ks_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
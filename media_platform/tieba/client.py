@@ -14,7 +14,6 @@ import json
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext
 from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
 
@@ -22,7 +21,7 @@ import config
 from base.base_crawler import AbstractApiClient
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import ProxyIpPool
-from tools import utils
+from tools import adaptive_concurrency, utils
 
 from .field import SearchNoteType, SearchSortType
 from .help import TieBaExtractor
@@ -60,11 +59,11 @@ class BaiduTieBaClient(AbstractApiClient):
 
         """
         actual_proxies = proxies if proxies else self.default_ip_proxy
-        async with httpx.AsyncClient(proxies=actual_proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                headers=self.headers, **kwargs
-            )
+        client = self.get_http_client(actual_proxies)
+        response = await client.request(
+            method, url, timeout=self.timeout,
+            headers=self.headers, **kwargs
+        )
 
         if response.status_code != 200:
             utils.logger.error(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
@@ -73,6 +72,7 @@ class BaiduTieBaClient(AbstractApiClient):
 
         if response.text == "" or response.text == "blocked":
             utils.logger.error(f"request params incrr, response.text: {response.text}")
+            adaptive_concurrency.record_block("tieba account blocked")
             raise Exception("account blocked")
 
         if return_ori_content:
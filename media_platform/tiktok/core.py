@@ -18,7 +18,9 @@ from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import tiktok as tiktok_store
 from tools import utils
+from tools.adaptive_concurrency import get_concurrency_limiter
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawler_pipeline import get_keywords
 from var import crawler_type_var, source_keyword_var
 
 from .client import TikTokClient
@@ -183,7 +185,7 @@ class TikTokCrawler(AbstractCrawler):
     # ... (core.py中其他函数保持不变) ...
     async def search(self) -> None:
         utils.logger.info("[TikTokCrawler.search] Begin search TikTok keywords")
-        for keyword in config.KEYWORDS.split(","):
+        for keyword in get_keywords():
             source_keyword_var.set(keyword)
             utils.logger.info(f"[TikTokCrawler.search] Current keyword: {keyword}")
 
@@ -225,7 +227,7 @@ class TikTokCrawler(AbstractCrawler):
     async def batch_get_video_comments(self, video_ids: List[str]):
         if not config.ENABLE_GET_COMMENTS:
             return
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         tasks = [self.get_comments(video_id, semaphore) for video_id in video_ids if video_id]
         if tasks:
             await asyncio.gather(*tasks)
@@ -291,6 +293,9 @@ class TikTokCrawler(AbstractCrawler):
             return await self.launch_browser(playwright.chromium, playwright_proxy, user_agent, headless)
 
     async def close(self):
+        # 关闭 API 客户端复用的 httpx 连接池
+        if getattr(self, "tk_client", None):
+            await self.tk_client.close()
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
         elif self.browser_context and not self.browser_context.is_closed():
@@ -19,7 +19,7 @@ import asyncio
 import os
 import random
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -33,9 +33,12 @@ import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import weibo as weibo_store
-from tools import utils
+from tools import rate_limiter, utils
+from tools.adaptive_concurrency import get_concurrency_limiter
+from tools.checkpoint import get_checkpoint
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.crawler_pipeline import CrawlerPipeline
+from var import crawler_type_var
 
 from .client import WeiboClient
 from .exception import DataFetchError
@@ -45,6 +48,7 @@ from .login import WeiboLogin
 
 
 class WeiboCrawler(AbstractCrawler):
+    checkpoint_crawler_types = ("creator",)
     context_page: Page
     wb_client: WeiboClient
     browser_context: BrowserContext
@@ -152,44 +156,78 @@ class WeiboCrawler(AbstractCrawler):
             )
             return
 
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[WeiboCrawler.search] Current search keyword: {keyword}"
+        semaphore = get_concurrency_limiter(config.PIPELINE_COMMENT_WORKERS)
+        # 搜索翻页、保存微博和图片、评论作为流水线的三个阶段，前一页微博的评论还在抓取时下一页已经开始搜索
+        pipeline = CrawlerPipeline("weibo_search")
+        pipeline.add_stage(
+            "note", self.save_search_note, workers=config.PIPELINE_DETAIL_WORKERS
+        )
+        pipeline.add_stage(
+            "comment",
+            lambda note_id: self.get_note_comments(note_id, semaphore),
+            workers=config.PIPELINE_COMMENT_WORKERS,
+        )
+        await pipeline.run_keywords(
+            lambda keyword: self.iter_search_notes(
+                keyword, search_type, start_page, weibo_limit_count
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * weibo_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[WeiboCrawler.search] Skip page: {page}")
-                    page += 1
-                    continue
-                utils.logger.info(
-                    f"[WeiboCrawler.search] search weibo keyword: {keyword}, page: {page}"
-                )
-                search_res = await self.wb_client.get_note_by_keyword(
-                    keyword=keyword, page=page, search_type=search_type
-                )
-                note_id_list: List[str] = []
-                note_list = filter_search_result_card(search_res.get("cards"))
-                for note_item in note_list:
-                    if note_item:
-                        mblog: Dict = note_item.get("mblog")
-                        if mblog:
-                            note_id_list.append(mblog.get("id"))
-                            await weibo_store.update_weibo_note(note_item)
-                            await self.get_note_images(mblog)
+        )
 
+    async def iter_search_notes(
+        self,
+        keyword: str,
+        search_type: SearchType,
+        start_page: int,
+        weibo_limit_count: int,
+    ) -> AsyncIterator[Dict]:
+        """
+        按关键词翻页搜索，逐条产生微博
+        :param keyword:
+        :return:
+        """
+        utils.logger.info(
+            f"[WeiboCrawler.search] Current search keyword: {keyword}"
+        )
+        page = 1
+        while (
+            page - start_page + 1
+        ) * weibo_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[WeiboCrawler.search] Skip page: {page}")
                 page += 1
-                await self.batch_get_notes_comments(note_id_list)
+                continue
+            utils.logger.info(
+                f"[WeiboCrawler.search] search weibo keyword: {keyword}, page: {page}"
+            )
+            search_res = await self.wb_client.get_note_by_keyword(
+                keyword=keyword, page=page, search_type=search_type
+            )
+            note_list = filter_search_result_card(search_res.get("cards"))
+            for note_item in note_list:
+                if note_item and note_item.get("mblog"):
+                    yield note_item
+
+            page += 1
+
+    async def save_search_note(self, note_item: Dict) -> List[str]:
+        """
+        流水线的微博阶段：保存搜索到的微博和图片，返回需要抓取评论的微博 id
+        :param note_item:
+        :return:
+        """
+        mblog: Dict = note_item.get("mblog")
+        await weibo_store.update_weibo_note(note_item)
+        await self.get_note_images(mblog)
+        if not config.ENABLE_GET_COMMENTS:
+            return []
+        return [mblog.get("id")]
 
     async def get_specified_notes(self):
         """
         get specified notes info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list = [
             self.get_note_info_task(note_id=note_id, semaphore=semaphore)
             for note_id in config.WEIBO_SPECIFIED_ID_LIST
@@ -239,7 +277,7 @@ class WeiboCrawler(AbstractCrawler):
         utils.logger.info(
             f"[WeiboCrawler.batch_get_notes_comments] note ids:{note_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list: List[Task] = []
         for note_id in note_id_list:
             task = asyncio.create_task(
@@ -262,9 +300,9 @@ class WeiboCrawler(AbstractCrawler):
                 )
                 await self.wb_client.get_note_all_comments(
                     note_id=note_id,
-                    crawl_interval=random.randint(
+                    crawl_interval=rate_limiter.crawl_interval(random.randint(
                         1, 3
-                    ),  # 微博对API的限流比较严重，所以延时提高一些
+                    )),  # 微博对API的限流比较严重，所以延时提高一些
                     callback=weibo_store.batch_update_weibo_note_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
@@ -312,7 +350,22 @@ class WeiboCrawler(AbstractCrawler):
         utils.logger.info(
             "[WeiboCrawler.get_creators_and_notes] Begin get weibo creators"
         )
+        checkpoint = get_checkpoint()
         for user_id in config.WEIBO_CREATOR_ID_LIST:
+            checkpoint_key = f"creator:{user_id}"
+            if checkpoint.is_done(checkpoint_key):
+                utils.logger.info(
+                    f"[WeiboCrawler.get_creators_and_notes] Creator {user_id} already finished in checkpoint, skip"
+                )
+                continue
+            state = checkpoint.get(checkpoint_key)
+            # note ids crawled before the interruption, their comments are fetched after all notes
+            note_ids: List[str] = state.get("note_ids", [])
+            if state.get("notes_finished"):
+                await self.batch_get_notes_comments(note_ids)
+                checkpoint.mark_done(checkpoint_key)
+                continue
+
             createor_info_res: Dict = await self.wb_client.get_creator_info_by_id(
                 creator_id=user_id
             )
@@ -325,20 +378,30 @@ class WeiboCrawler(AbstractCrawler):
                     raise DataFetchError("Get creator info error")
                 await weibo_store.save_creator(user_id, user_info=createor_info)
 
+                async def save_cursor(since_id: str, notes: List[Dict]):
+                    note_ids.extend(
+                        note_item.get("mblog", {}).get("id")
+                        for note_item in notes
+                        if note_item.get("mblog", {}).get("id")
+                    )
+                    state.update(since_id=since_id, pages=state.get("pages", 0) + 1, note_ids=note_ids)
+                    checkpoint.set(checkpoint_key, dict(state))
+
                 # Get all note information of the creator
-                all_notes_list = await self.wb_client.get_all_notes_by_creator_id(
+                await self.wb_client.get_all_notes_by_creator_id(
                     creator_id=user_id,
                     container_id=createor_info_res.get("lfid_container_id"),
                     crawl_interval=0,
                     callback=weibo_store.batch_update_weibo_notes,
+                    since_id=state.get("since_id", ""),
+                    crawled_pages=state.get("pages", 0),
+                    cursor_callback=save_cursor,
                 )
+                state.update(notes_finished=True, note_ids=note_ids)
+                checkpoint.set(checkpoint_key, dict(state))
 
-                note_ids = [
-                    note_item.get("mblog", {}).get("id")
-                    for note_item in all_notes_list
-                    if note_item.get("mblog", {}).get("id")
-                ]
                 await self.batch_get_notes_comments(note_ids)
+                checkpoint.mark_done(checkpoint_key)
 
             else:
                 utils.logger.error(
@@ -380,7 +443,7 @@ class WeiboCrawler(AbstractCrawler):
         )
         if config.SAVE_LOGIN_STATE:
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", config.USER_DATA_DIR % "wb"
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -433,6 +496,9 @@ class WeiboCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端复用的 httpx 连接池
+        if getattr(self, "wb_client", None):
+            await self.wb_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
@@ -12,16 +12,15 @@
 import asyncio
 import json
 import re
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext, Page
 from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_result
 
 import config
 from base.base_crawler import AbstractApiClient
-from tools import utils
+from tools import adaptive_concurrency, utils
 from html import unescape
 
 from .exception import DataFetchError, IPBlockError
@@ -50,6 +49,12 @@ class XiaoHongShuClient(AbstractApiClient):
         self.NOTE_ABNORMAL_CODE = -510001
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        # 签名页面池，默认只有 playwright_page，可以通过 open_sign_pages 增加
+        self._sign_pages: List[Page] = [playwright_page]
+        self._idle_sign_pages: Optional[asyncio.Queue] = None
+        # 等待合并签名的请求 (url, data, future)
+        self._pending_signs: List[Tuple[str, Any, asyncio.Future]] = []
+        self._sign_tasks = set()
 
     async def _pre_headers(self, url: str, data=None) -> Dict:
         """
@@ -61,13 +66,10 @@ class XiaoHongShuClient(AbstractApiClient):
         Returns:
 
         """
-        encrypt_params = await self.playwright_page.evaluate(
-            "([url, data]) => window._webmsxyw(url,data)", [url, data]
-        )
-        local_storage = await self.playwright_page.evaluate("() => window.localStorage")
+        encrypt_params = await self._get_encrypt_params(url, data)
         signs = sign(
             a1=self.cookie_dict.get("a1", ""),
-            b1=local_storage.get("b1", ""),
+            b1=encrypt_params.get("b1", ""),
             x_s=encrypt_params.get("X-s", ""),
             x_t=str(encrypt_params.get("X-t", "")),
         )
@@ -78,8 +80,97 @@ class XiaoHongShuClient(AbstractApiClient):
             "x-S-Common": signs["x-s-common"],
             "X-B3-Traceid": signs["x-b3-traceid"],
         }
-        self.headers.update(headers)
-        return self.headers
+        # 每个请求使用自己的请求头副本，避免并发请求之间互相覆盖签名
+        return {**self.headers, **headers}
+
+    async def batch_sign(self, items: List[Tuple[str, Any]]) -> List[Dict]:
+        """
+        在一次 page.evaluate 中对多个请求签名，同时读取 localStorage 中的 b1，不再单独导出整个 localStorage
+        Args:
+            items: [(url, data), ...]
+
+        Returns:
+            和 items 一一对应的 {"X-s", "X-t", "b1"}
+        """
+        if self._idle_sign_pages is None:
+            self._idle_sign_pages = asyncio.Queue()
+            for page in self._sign_pages:
+                self._idle_sign_pages.put_nowait(page)
+        page = await self._idle_sign_pages.get()
+        try:
+            result = await page.evaluate(
+                """(items) => {
+                    const b1 = window.localStorage.getItem("b1") || "";
+                    return items.map(([url, data]) => ({...window._webmsxyw(url, data), b1}));
+                }""",
+                [list(item) for item in items],
+            )
+        finally:
+            self._idle_sign_pages.put_nowait(page)
+        return result
+
+    async def _get_encrypt_params(self, url: str, data=None) -> Dict:
+        """
+        把同一时刻发起的签名请求合并，交给 batch_sign 批量处理
+        Args:
+            url:
+            data:
+
+        Returns:
+
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending_signs.append((url, data, future))
+        if len(self._pending_signs) == 1:
+            asyncio.get_running_loop().call_soon(self._dispatch_pending_signs)
+        return await future
+
+    def _dispatch_pending_signs(self):
+        pending, self._pending_signs = self._pending_signs, []
+        batch_size = max(1, config.XHS_SIGN_BATCH_SIZE)
+        for i in range(0, len(pending), batch_size):
+            task = asyncio.create_task(self._sign_batch(pending[i:i + batch_size]))
+            self._sign_tasks.add(task)
+            task.add_done_callback(self._sign_tasks.discard)
+
+    async def _sign_batch(self, batch: List[Tuple[str, Any, asyncio.Future]]):
+        try:
+            results = await self.batch_sign([(url, data) for url, data, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def open_sign_pages(self, browser_context: BrowserContext, count: int):
+        """
+        额外打开签名页面，加载首页后签名函数可用
+        Args:
+            browser_context: 浏览器上下文对象
+            count: 打开的页面数量
+
+        Returns:
+
+        """
+        for _ in range(count):
+            page = await browser_context.new_page()
+            await page.goto(self._domain)
+            self._sign_pages.append(page)
+            if self._idle_sign_pages is not None:
+                self._idle_sign_pages.put_nowait(page)
+
+    async def close(self):
+        for page in self._sign_pages[1:]:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self._sign_pages = self._sign_pages[:1]
+        self._idle_sign_pages = None
+        await super().close()
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
@@ -95,8 +186,8 @@ class XiaoHongShuClient(AbstractApiClient):
         """
         # return response.text
         return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        client = self.get_http_client(self.proxies)
+        response = await client.request(method, url, timeout=self.timeout, **kwargs)
 
         if response.status_code == 471 or response.status_code == 461:
             # someday someone maybe will bypass captcha
@@ -112,6 +203,7 @@ class XiaoHongShuClient(AbstractApiClient):
         if data["success"]:
             return data.get("data", data.get("success", {}))
         elif data["code"] == self.IP_ERROR_CODE:
+            adaptive_concurrency.record_block("xhs ip blocked")
             raise IPBlockError(self.IP_ERROR_STR)
         else:
             raise DataFetchError(data.get("msg", None))
@@ -155,15 +247,15 @@ class XiaoHongShuClient(AbstractApiClient):
         )
 
     async def get_note_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", url, timeout=self.timeout)
-            if not response.reason_phrase == "OK":
-                utils.logger.error(
-                    f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
-                )
-                return None
-            else:
-                return response.content
+        client = self.get_http_client(self.proxies)
+        response = await client.request("GET", url, timeout=self.timeout)
+        if not response.reason_phrase == "OK":
+            utils.logger.error(
+                f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
+            )
+            return None
+        else:
+            return response.content
 
     async def pong(self) -> bool:
         """
@@ -326,6 +418,8 @@ class XiaoHongShuClient(AbstractApiClient):
         crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
+        cursor: str = "",
+        cursor_callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
         获取指定笔记下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
@@ -335,12 +429,14 @@ class XiaoHongShuClient(AbstractApiClient):
             crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
             max_count: 一次笔记爬取的最大评论数量
+            cursor: 起始游标，从断点恢复时传入
+            cursor_callback: 一页评论（含二级评论）处理完后回调下一页的游标和这一页的评论，用于保存断点
         Returns:
 
         """
         result = []
         comments_has_more = True
-        comments_cursor = ""
+        comments_cursor = cursor
         while comments_has_more and len(result) < max_count:
             comments_res = await self.get_note_comments(
                 note_id=note_id, xsec_token=xsec_token, cursor=comments_cursor
@@ -366,6 +462,8 @@ class XiaoHongShuClient(AbstractApiClient):
                 callback=callback,
             )
             result.extend(sub_comments)
+            if cursor_callback:
+                await cursor_callback(comments_cursor, comments)
         return result
 
     async def get_comments_all_sub_comments(
@@ -483,6 +581,9 @@ class XiaoHongShuClient(AbstractApiClient):
         user_id: str,
         crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
+        cursor: str = "",
+        cursor_callback: Optional[Callable] = None,
+        max_count: Optional[int] = None,
     ) -> List[Dict]:
         """
         获取指定用户下的所有发过的帖子，该方法会一直查找一个用户下的所有帖子信息
@@ -490,14 +591,19 @@ class XiaoHongShuClient(AbstractApiClient):
             user_id: 用户ID
             crawl_interval: 爬取一次的延迟单位（秒）
             callback: 一次分页爬取结束后的更新回调函数
+            cursor: 起始游标，从断点恢复时传入
+            cursor_callback: 一页帖子处理完后回调下一页的游标和这一页的帖子，用于保存断点
+            max_count: 最多获取的帖子数量，默认 CRAWLER_MAX_NOTES_COUNT
 
         Returns:
 
         """
+        if max_count is None:
+            max_count = config.CRAWLER_MAX_NOTES_COUNT
         result = []
         notes_has_more = True
-        notes_cursor = ""
-        while notes_has_more and len(result) < config.CRAWLER_MAX_NOTES_COUNT:
+        notes_cursor = cursor
+        while notes_has_more and len(result) < max_count:
             notes_res = await self.get_notes_by_creator(user_id, notes_cursor)
             if not notes_res:
                 utils.logger.error(
@@ -518,7 +624,7 @@ class XiaoHongShuClient(AbstractApiClient):
                 f"[XiaoHongShuClient.get_all_notes_by_creator] got user_id:{user_id} notes len : {len(notes)}"
             )
 
-            remaining = config.CRAWLER_MAX_NOTES_COUNT - len(result)
+            remaining = max_count - len(result)
             if remaining <= 0:
                 break
 
@@ -527,6 +633,8 @@ class XiaoHongShuClient(AbstractApiClient):
                 await callback(notes_to_add)
 
             result.extend(notes_to_add)
+            if cursor_callback:
+                await cursor_callback(notes_cursor, notes_to_add)
             await asyncio.sleep(crawl_interval)
 
         utils.logger.info(
@@ -14,7 +14,7 @@ import os
 import random
 import time
 from asyncio import Task
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 from playwright.async_api import (
     BrowserContext,
@@ -31,8 +31,12 @@ from config import CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
 from model.m_xiaohongshu import NoteUrlInfo
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import xhs as xhs_store
-from tools import utils
+from tools import rate_limiter, utils
+from tools.adaptive_concurrency import get_concurrency_limiter
+from tools.checkpoint import get_checkpoint
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawler_pipeline import CrawlerPipeline, get_keywords
+from tools.distributed_queue import RedisWorkQueue, WorkTask, new_task, run_worker
 from var import crawler_type_var, source_keyword_var
 
 from .client import XiaoHongShuClient
@@ -43,6 +47,8 @@ from .login import XiaoHongShuLogin
 
 
 class XiaoHongShuCrawler(AbstractCrawler):
+    supports_distributed = True
+    checkpoint_crawler_types = ("search", "detail", "creator")
     context_page: Page
     xhs_client: XiaoHongShuClient
     browser_context: BrowserContext
@@ -105,8 +111,16 @@ class XiaoHongShuCrawler(AbstractCrawler):
                     browser_context=self.browser_context
                 )
 
+            if config.XHS_SIGN_PAGE_POOL_SIZE > 1:
+                await self.xhs_client.open_sign_pages(
+                    self.browser_context, config.XHS_SIGN_PAGE_POOL_SIZE - 1
+                )
+
             crawler_type_var.set(config.CRAWLER_TYPE)
-            if config.CRAWLER_TYPE == "search":
+            if config.DISTRIBUTED_ROLE == "worker":
+                # Claim search pages, note details, comments and creators from the distributed queue
+                await run_worker(self)
+            elif config.CRAWLER_TYPE == "search":
                 # Search for notes and retrieve their comment information.
                 await self.search()
             elif config.CRAWLER_TYPE == "detail":
@@ -125,75 +139,133 @@ class XiaoHongShuCrawler(AbstractCrawler):
         utils.logger.info(
             "[XiaoHongShuCrawler.search] Begin search xiaohongshu keywords"
         )
+        # each stage gets its own limiter sized to its workers, so comment requests do not
+        # hold the permits the detail stage needs (the adaptive limiter stays shared per platform)
+        detail_semaphore = get_concurrency_limiter(config.PIPELINE_DETAIL_WORKERS)
+        comment_semaphore = get_concurrency_limiter(config.PIPELINE_COMMENT_WORKERS)
+        # search pages, note details and comments run as pipeline stages, so the next page is
+        # searched and its details fetched while the comments of previous notes are still running
+        pipeline = CrawlerPipeline("xhs_search")
+        pipeline.add_stage(
+            "detail",
+            lambda post_item: self.get_search_note_detail(post_item, detail_semaphore),
+            workers=config.PIPELINE_DETAIL_WORKERS,
+        )
+        pipeline.add_stage(
+            "comment",
+            lambda note: self.get_search_note_comments(note, comment_semaphore),
+            workers=config.PIPELINE_COMMENT_WORKERS,
+        )
+        await pipeline.run_keywords(self.iter_search_notes)
+
+    async def iter_search_notes(self, keyword: str) -> AsyncIterator[Dict]:
+        """Page through the search results of one keyword and yield note items."""
         xhs_limit_count = 20  # xhs limit page fixed value
         if config.CRAWLER_MAX_NOTES_COUNT < xhs_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = xhs_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
+        checkpoint = get_checkpoint()
+        checkpoint_key = f"search:{keyword}"
+        if checkpoint.is_done(checkpoint_key):
             utils.logger.info(
-                f"[XiaoHongShuCrawler.search] Current search keyword: {keyword}"
+                f"[XiaoHongShuCrawler.search] Keyword {keyword} already finished in checkpoint, skip"
             )
-            page = 1
-            search_id = get_search_id()
-            while (
-                    page - start_page + 1
-            ) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
+            return
+        utils.logger.info(
+            f"[XiaoHongShuCrawler.search] Current search keyword: {keyword}"
+        )
+        # resume from the first page whose notes were not all finished, with the same search_id
+        page = checkpoint.start_pages(checkpoint_key, default_page=1).page
+        search_id = checkpoint.get(checkpoint_key).get("search_id") or get_search_id()
+        while (
+                page - start_page + 1
+        ) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+            if page < start_page:
+                utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
+                page += 1
+                continue
 
-                try:
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}"
-                    )
-                    note_ids: List[str] = []
-                    xsec_tokens: List[str] = []
-                    notes_res = await self.xhs_client.get_note_by_keyword(
-                        keyword=keyword,
-                        search_id=search_id,
-                        page=page,
-                        sort=(
-                            SearchSortType(config.SORT_TYPE)
-                            if config.SORT_TYPE != ""
-                            else SearchSortType.GENERAL
-                        ),
-                    )
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}"
-                    )
-                    if not notes_res or not notes_res.get("has_more", False):
-                        utils.logger.info("No more content!")
-                        break
-                    semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                    task_list = [
-                        self.get_note_detail_async_task(
-                            note_id=post_item.get("id"),
-                            xsec_source=post_item.get("xsec_source"),
-                            xsec_token=post_item.get("xsec_token"),
-                            semaphore=semaphore,
-                        )
-                        for post_item in notes_res.get("items", {})
-                        if post_item.get("model_type") not in ("rec_query", "hot_query")
-                    ]
-                    note_details = await asyncio.gather(*task_list)
-                    for note_detail in note_details:
-                        if note_detail:
-                            await xhs_store.update_xhs_note(note_detail)
-                            await self.get_notice_media(note_detail)
-                            note_ids.append(note_detail.get("note_id"))
-                            xsec_tokens.append(note_detail.get("xsec_token"))
-                    page += 1
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] Note details: {note_details}"
-                    )
-                    await self.batch_get_note_comments(note_ids, xsec_tokens)
-                except DataFetchError:
-                    utils.logger.error(
-                        "[XiaoHongShuCrawler.search] Get note detail error"
-                    )
+            try:
+                utils.logger.info(
+                    f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}"
+                )
+                notes_res = await self.xhs_client.get_note_by_keyword(
+                    keyword=keyword,
+                    search_id=search_id,
+                    page=page,
+                    sort=(
+                        SearchSortType(config.SORT_TYPE)
+                        if config.SORT_TYPE != ""
+                        else SearchSortType.GENERAL
+                    ),
+                )
+                utils.logger.info(
+                    f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}"
+                )
+                if not notes_res or not notes_res.get("has_more", False):
+                    utils.logger.info("No more content!")
                     break
+            except DataFetchError:
+                utils.logger.error(
+                    "[XiaoHongShuCrawler.search] Get note detail error"
+                )
+                # the keyword is not marked finished, so a resumed run searches this page again
+                return
+            post_items = [
+                post_item for post_item in notes_res.get("items", {})
+                if post_item.get("model_type") not in ("rec_query", "hot_query")
+                and not checkpoint.is_done(f"note:{post_item.get('id')}")
+            ]
+            checkpoint.feed_page(
+                checkpoint_key, page, [post_item.get("id") for post_item in post_items], search_id=search_id
+            )
+            for post_item in post_items:
+                yield post_item
+            page += 1
+        checkpoint.finish_pages(checkpoint_key)
+
+    async def get_search_note_detail(
+            self, post_item: Dict, semaphore: asyncio.Semaphore
+    ) -> List[Tuple[str, str]]:
+        """Pipeline detail stage: fetch and store one searched note, return it for the comment stage."""
+        note_id = post_item.get("id")
+        # the note leaves the checkpoint frontier here unless it is handed to the comment stage,
+        # also when the detail is empty (deleted or blocked notes) or the stage raises
+        release = True
+        try:
+            note_detail = await self.get_note_detail_async_task(
+                note_id=note_id,
+                xsec_source=post_item.get("xsec_source"),
+                xsec_token=post_item.get("xsec_token"),
+                semaphore=semaphore,
+            )
+            if not note_detail:
+                return []
+            await xhs_store.update_xhs_note(note_detail)
+            await self.get_notice_media(note_detail)
+            if not config.ENABLE_GET_COMMENTS:
+                get_checkpoint().mark_done(f"note:{note_id}")
+                return []
+            release = False
+            return [(note_id, note_detail.get("xsec_token"))]
+        finally:
+            if release:
+                self.release_search_note(note_id)
+
+    async def get_search_note_comments(
+            self, note: Tuple[str, str], semaphore: asyncio.Semaphore
+    ):
+        """Pipeline comment stage: fetch the comments of one searched note."""
+        try:
+            await self.get_comments(note_id=note[0], xsec_token=note[1], semaphore=semaphore)
+            get_checkpoint().mark_done(f"note:{note[0]}")
+        finally:
+            self.release_search_note(note[0])
+
+    @staticmethod
+    def release_search_note(note_id: str):
+        """Release a searched note from the checkpoint frontier so it can move past its page."""
+        get_checkpoint().finish_item(f"search:{source_keyword_var.get()}", note_id)
 
     async def get_creators_and_notes(self) -> None:
         """Get creator's notes and retrieve their comment information."""
@@ -201,24 +273,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
             "[XiaoHongShuCrawler.get_creators_and_notes] Begin get xiaohongshu creators"
         )
         for user_id in config.XHS_CREATOR_ID_LIST:
-            # get creator detail info from web html content
-            createor_info: Dict = await self.xhs_client.get_creator_info(
-                user_id=user_id
-            )
-            if createor_info:
-                await xhs_store.save_creator(user_id, creator=createor_info)
-
-            # When proxy is not enabled, increase the crawling interval
-            if config.ENABLE_IP_PROXY:
-                crawl_interval = random.random()
-            else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
-            # Get all note information of the creator
-            all_notes_list = await self.xhs_client.get_all_notes_by_creator(
-                user_id=user_id,
-                crawl_interval=crawl_interval,
-                callback=self.fetch_creator_notes_detail,
-            )
+            all_notes_list = await self.get_creator_notes(user_id)
 
             note_ids = []
             xsec_tokens = []
@@ -227,11 +282,56 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 xsec_tokens.append(note_item.get("xsec_token"))
             await self.batch_get_note_comments(note_ids, xsec_tokens)
 
+    async def get_creator_notes(self, user_id: str) -> List[Dict]:
+        """Save the creator info and the detail of all the creator's notes, return the note list."""
+        checkpoint = get_checkpoint()
+        checkpoint_key = f"creator:{user_id}"
+        state = checkpoint.get(checkpoint_key)
+        # notes crawled before the interruption, only note_id and xsec_token are kept for the comments
+        notes: List[Dict] = state.get("notes", [])
+        if checkpoint.is_done(checkpoint_key):
+            utils.logger.info(
+                f"[XiaoHongShuCrawler.get_creator_notes] Creator {user_id} already finished in checkpoint, skip"
+            )
+            return notes
+
+        # get creator detail info from web html content
+        createor_info: Dict = await self.xhs_client.get_creator_info(
+            user_id=user_id
+        )
+        if createor_info:
+            await xhs_store.save_creator(user_id, creator=createor_info)
+
+        # When proxy is not enabled, increase the crawling interval
+        if config.ENABLE_IP_PROXY:
+            crawl_interval = rate_limiter.crawl_interval(random.random())
+        else:
+            crawl_interval = rate_limiter.crawl_interval(random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC))
+
+        async def save_cursor(cursor: str, page_notes: List[Dict]):
+            notes.extend(
+                {"note_id": note_item.get("note_id"), "xsec_token": note_item.get("xsec_token")}
+                for note_item in page_notes
+            )
+            checkpoint.set(checkpoint_key, {"cursor": cursor, "notes": notes})
+
+        # Get all note information of the creator
+        await self.xhs_client.get_all_notes_by_creator(
+            user_id=user_id,
+            crawl_interval=crawl_interval,
+            callback=self.fetch_creator_notes_detail,
+            cursor=state.get("cursor", ""),
+            cursor_callback=save_cursor,
+            max_count=config.CRAWLER_MAX_NOTES_COUNT - len(notes),
+        )
+        checkpoint.mark_done(checkpoint_key)
+        return notes
+
     async def fetch_creator_notes_detail(self, note_list: List[Dict]):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list = [
             self.get_note_detail_async_task(
                 note_id=post_item.get("note_id"),
@@ -264,7 +364,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 note_id=note_url_info.note_id,
                 xsec_source=note_url_info.xsec_source,
                 xsec_token=note_url_info.xsec_token,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
+                semaphore=get_concurrency_limiter(),
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -345,7 +445,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         utils.logger.info(
             f"[XiaoHongShuCrawler.batch_get_note_comments] Begin batch get note comments, note list: {note_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter()
         task_list: List[Task] = []
         for index, note_id in enumerate(note_list):
             task = asyncio.create_task(
@@ -361,22 +461,128 @@ class XiaoHongShuCrawler(AbstractCrawler):
             self, note_id: str, xsec_token: str, semaphore: asyncio.Semaphore
     ):
         """Get note comments with keyword filtering and quantity limitation"""
+        checkpoint = get_checkpoint()
+        checkpoint_key = f"comments:{note_id}"
+        if checkpoint.is_done(checkpoint_key):
+            utils.logger.info(
+                f"[XiaoHongShuCrawler.get_comments] Comments of note {note_id} already finished in checkpoint, skip"
+            )
+            return
         async with semaphore:
             utils.logger.info(
                 f"[XiaoHongShuCrawler.get_comments] Begin get note id comments {note_id}"
             )
             # When proxy is not enabled, increase the crawling interval
             if config.ENABLE_IP_PROXY:
-                crawl_interval = random.random()
+                crawl_interval = rate_limiter.crawl_interval(random.random())
             else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
+                crawl_interval = rate_limiter.crawl_interval(random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC))
+            state = checkpoint.get(checkpoint_key)
+
+            async def save_cursor(cursor: str, comments: List[Dict]):
+                state["cursor"] = cursor
+                state["count"] = state.get("count", 0) + len(comments)
+                checkpoint.set(checkpoint_key, dict(state))
+
             await self.xhs_client.get_note_all_comments(
                 note_id=note_id,
                 xsec_token=xsec_token,
                 crawl_interval=crawl_interval,
                 callback=xhs_store.batch_update_xhs_note_comments,
-                max_count=CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                max_count=CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES - state.get("count", 0),
+                cursor=state.get("cursor", ""),
+                cursor_callback=save_cursor,
+            )
+            checkpoint.mark_done(checkpoint_key)
+
+    def build_distributed_tasks(self) -> List[WorkTask]:
+        """Turn the configured keywords, note urls or creators into distributed tasks."""
+        tasks: List[WorkTask] = []
+        if config.CRAWLER_TYPE == "search":
+            xhs_limit_count = 20  # xhs limit page fixed value
+            max_notes_count = max(config.CRAWLER_MAX_NOTES_COUNT, xhs_limit_count)
+            for keyword in get_keywords():
+                search_id = get_search_id()
+                page = config.START_PAGE
+                while (page - config.START_PAGE + 1) * xhs_limit_count <= max_notes_count:
+                    tasks.append(new_task(
+                        "search_page",
+                        f"{keyword}:{page}",
+                        {"keyword": keyword, "page": page, "search_id": search_id},
+                        source_keyword=keyword,
+                    ))
+                    page += 1
+        elif config.CRAWLER_TYPE == "detail":
+            for full_note_url in config.XHS_SPECIFIED_NOTE_URL_LIST:
+                note_url_info: NoteUrlInfo = parse_note_info_from_note_url(full_note_url)
+                tasks.append(new_task("note_detail", note_url_info.note_id, note_url_info.model_dump()))
+        elif config.CRAWLER_TYPE == "creator":
+            for user_id in config.XHS_CREATOR_ID_LIST:
+                tasks.append(new_task("creator", user_id, {"user_id": user_id}))
+        return tasks
+
+    async def handle_task(self, task: WorkTask, queue: RedisWorkQueue):
+        """Run one distributed task, the notes and comments found are enqueued as new tasks."""
+        semaphore = get_concurrency_limiter()
+        if task.kind == "search_page":
+            notes_res = await self.xhs_client.get_note_by_keyword(
+                keyword=task.payload["keyword"],
+                search_id=task.payload["search_id"],
+                page=task.payload["page"],
+                sort=(
+                    SearchSortType(config.SORT_TYPE)
+                    if config.SORT_TYPE != ""
+                    else SearchSortType.GENERAL
+                ),
             )
+            await queue.enqueue(
+                new_task(
+                    "note_detail",
+                    post_item.get("id"),
+                    {
+                        "note_id": post_item.get("id"),
+                        "xsec_source": post_item.get("xsec_source"),
+                        "xsec_token": post_item.get("xsec_token"),
+                    },
+                    source_keyword=task.source_keyword,
+                )
+                for post_item in (notes_res or {}).get("items", [])
+                if post_item.get("model_type") not in ("rec_query", "hot_query")
+            )
+        elif task.kind == "note_detail":
+            note_detail = await self.get_note_detail_async_task(
+                note_id=task.payload["note_id"],
+                xsec_source=task.payload["xsec_source"],
+                xsec_token=task.payload["xsec_token"],
+                semaphore=semaphore,
+            )
+            if not note_detail:
+                raise DataFetchError(f"get note detail failed, note_id: {task.payload['note_id']}")
+            await xhs_store.update_xhs_note(note_detail)
+            await self.get_notice_media(note_detail)
+            if config.ENABLE_GET_COMMENTS:
+                await queue.enqueue([self._new_comments_task(note_detail, task.source_keyword)])
+        elif task.kind == "comments":
+            await self.get_comments(
+                note_id=task.payload["note_id"],
+                xsec_token=task.payload["xsec_token"],
+                semaphore=semaphore,
+            )
+        elif task.kind == "creator":
+            all_notes_list = await self.get_creator_notes(task.payload["user_id"])
+            if config.ENABLE_GET_COMMENTS:
+                await queue.enqueue(self._new_comments_task(note_item) for note_item in all_notes_list)
+        else:
+            raise ValueError(f"unknown task kind: {task.kind}")
+
+    @staticmethod
+    def _new_comments_task(note: Dict, source_keyword: str = "") -> WorkTask:
+        return new_task(
+            "comments",
+            note.get("note_id"),
+            {"note_id": note.get("note_id"), "xsec_token": note.get("xsec_token")},
+            source_keyword=source_keyword,
+        )
 
     async def create_xhs_client(self, httpx_proxy: Optional[str]) -> XiaoHongShuClient:
         """Create xhs client"""
@@ -426,7 +632,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
             # feat issue #14
             # we will save login state to avoid login every time
             user_data_dir = os.path.join(
-                os.getcwd(), "browser_data", config.USER_DATA_DIR % config.PLATFORM
+                os.getcwd(), "browser_data", config.USER_DATA_DIR % "xhs"
             )  # type: ignore
             browser_context = await chromium.launch_persistent_context(
                 user_data_dir=user_data_dir,
@@ -481,6 +687,9 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭 API 客户端复用的 httpx 连接池
+        if getattr(self, "xhs_client", None):
+            await self.xhs_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
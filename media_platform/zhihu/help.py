@@ -19,10 +19,11 @@ from parsel import Selector
 
 from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
-from tools import utils
+from tools import js_sign_pool, utils
 from tools.crawler_util import extract_text_from_html
 
 ZHIHU_SGIN_JS = None
+ZHIHU_SIGN_JS_PATH = "libs/zhihu.js"
 
 
 def sign(url: str, cookies: str) -> Dict:
@@ -37,12 +38,25 @@ def sign(url: str, cookies: str) -> Dict:
     """
     global ZHIHU_SGIN_JS
     if not ZHIHU_SGIN_JS:
-        with open("libs/zhihu.js", mode="r", encoding="utf-8-sig") as f:
+        with open(ZHIHU_SIGN_JS_PATH, mode="r", encoding="utf-8-sig") as f:
             ZHIHU_SGIN_JS = execjs.compile(f.read())
 
     return ZHIHU_SGIN_JS.call("get_sign", url, cookies)
 
 
+async def async_sign(url: str, cookies: str) -> Dict:
+    """
+    zhihu sign algorithm, 通过常驻的 Node 进程池计算，不阻塞事件循环
+    Args:
+        url: request url with query string
+        cookies: request cookies with d_c0 key
+
+    Returns:
+
+    """
+    return await js_sign_pool.sign(ZHIHU_SIGN_JS_PATH, "get_sign", url, cookies)
+
+
 class ZhihuExtractor:
     def __init__(self):
         pass
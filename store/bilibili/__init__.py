@@ -28,6 +28,8 @@ class BiliStoreFactory:
         "csv": BiliCsvStoreImplement,
         "db": BiliDbStoreImplement,
         "json": BiliJsonStoreImplement,
+        "jsonl": BiliJsonStoreImplement,
+        "parquet": BiliParquetStoreImplement,
         "sqlite": BiliSqliteStoreImplement,
     }
 
@@ -36,9 +38,9 @@ class BiliStoreFactory:
         store_class = BiliStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
         if not store_class:
             raise ValueError(
-                "[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ..."
+                "[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or parquet or sqlite ..."
             )
-        return store_class()
+        return store_class.get_instance()
 
 
 async def update_bilibili_video(video_item: Dict):
@@ -13,18 +13,15 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 19:34
 # @Desc    : B站存储实现类
-import asyncio
-import csv
-import json
 import os
 import pathlib
-from typing import Dict
-
-import aiofiles
+from typing import Dict, List
 
 import config
 from base.base_crawler import AbstractStore
 from tools import utils, words
+from tools.async_file_writer import AsyncCsvWriter, AsyncJsonlWriter
+from tools.async_parquet_writer import AsyncParquetWriter
 from var import crawler_type_var
 
 
@@ -54,7 +51,7 @@ class BiliCsvStoreImplement(AbstractStore):
         Returns: eg: data/bilibili/search_comments_20240114.csv ...
 
         """
-        return f"{self.csv_store_path}/{self.file_count}_{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.csv"
+        return f"{self.csv_store_path}/{self.file_count}_{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}.csv"
 
     async def save_data_to_csv(self, save_item: Dict, store_type: str):
         """
@@ -66,13 +63,8 @@ class BiliCsvStoreImplement(AbstractStore):
         Returns: no returns
 
         """
-        pathlib.Path(self.csv_store_path).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(store_type=store_type)
-        async with aiofiles.open(save_file_name, mode='a+', encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
-            if await f.tell() == 0:
-                await writer.writerow(save_item.keys())
-            await writer.writerow(save_item.values())
+        await AsyncCsvWriter.get_writer(save_file_name).write_row(save_item)
 
     async def store_content(self, content_item: Dict):
         """
@@ -131,6 +123,22 @@ class BiliCsvStoreImplement(AbstractStore):
 
         await self.save_data_to_csv(save_item=dynamic_item, store_type="dynamics")
 
+    async def flush(self):
+        """
+        flush buffered csv records of this store to disk
+        Returns:
+
+        """
+        await AsyncCsvWriter.flush_all(self.csv_store_path)
+
+    async def close(self):
+        """
+        flush and close the csv files of this store
+        Returns:
+
+        """
+        await AsyncCsvWriter.close_all(self.csv_store_path)
+
 
 class BiliDbStoreImplement(AbstractStore):
     async def store_content(self, content_item: Dict):
@@ -143,16 +151,9 @@ class BiliDbStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_content,
-                                         query_content_by_content_id,
-                                         update_content_by_content_id)
-        video_id = content_item.get("video_id")
-        video_detail: Dict = await query_content_by_content_id(content_id=video_id)
-        if not video_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_content(content_item)
-        else:
-            await update_content_by_content_id(video_id, content_item=content_item)
+        from .bilibili_store_sql import upsert_contents
+        content_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_contents([content_item])
 
     async def store_comment(self, comment_item: Dict):
         """
@@ -164,16 +165,9 @@ class BiliDbStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_comment,
-                                         query_comment_by_comment_id,
-                                         update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
+        from .bilibili_store_sql import upsert_comments
+        comment_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_comments([comment_item])
 
     async def store_creator(self, creator: Dict):
         """
@@ -185,16 +179,9 @@ class BiliDbStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_creator,
-                                         query_creator_by_creator_id,
-                                         update_creator_by_creator_id)
-        creator_id = creator.get("user_id")
-        creator_detail: Dict = await query_creator_by_creator_id(creator_id=creator_id)
-        if not creator_detail:
-            creator["add_ts"] = utils.get_current_timestamp()
-            await add_new_creator(creator)
-        else:
-            await update_creator_by_creator_id(creator_id,creator_item=creator)
+        from .bilibili_store_sql import upsert_creators
+        creator["add_ts"] = utils.get_current_timestamp()
+        await upsert_creators([creator])
 
     async def store_contact(self, contact_item: Dict):
         """
@@ -206,19 +193,9 @@ class BiliDbStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_contact,
-                                         query_contact_by_up_and_fan,
-                                         update_contact_by_id, )
-
-        up_id = contact_item.get("up_id")
-        fan_id = contact_item.get("fan_id")
-        contact_detail: Dict = await query_contact_by_up_and_fan(up_id=up_id, fan_id=fan_id)
-        if not contact_detail:
-            contact_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_contact(contact_item)
-        else:
-            key_id = contact_detail.get("id")
-            await update_contact_by_id(id=key_id, contact_item=contact_item)
+        from .bilibili_store_sql import upsert_contacts
+        contact_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_contacts([contact_item])
 
     async def store_dynamic(self, dynamic_item):
         """
@@ -230,23 +207,34 @@ class BiliDbStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_dynamic,
-                                         query_dynamic_by_dynamic_id,
-                                         update_dynamic_by_dynamic_id)
+        from .bilibili_store_sql import upsert_dynamics
+        dynamic_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_dynamics([dynamic_item])
 
-        dynamic_id = dynamic_item.get("dynamic_id")
-        dynamic_detail = await query_dynamic_by_dynamic_id(dynamic_id=dynamic_id)
-        if not dynamic_detail:
-            dynamic_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_dynamic(dynamic_item)
-        else:
-            await update_dynamic_by_dynamic_id(dynamic_id, dynamic_item=dynamic_item)
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        """
+        Bilibili DB batch storage implementation, one upsert statement per batch
+        Args:
+            store_type: content | comment | creator | contact | dynamic
+            items:
+
+        Returns:
+
+        """
+        from .bilibili_store_sql import upsert_comments, upsert_contacts, upsert_contents, upsert_creators, upsert_dynamics
+        upsert_func = {"content": upsert_contents, "comment": upsert_comments, "creator": upsert_creators, "contact": upsert_contacts, "dynamic": upsert_dynamics}.get(store_type)
+        if upsert_func is None:
+            await super().store_batch(store_type, items)
+            return
+        add_ts = utils.get_current_timestamp()
+        for item in items:
+            item["add_ts"] = add_ts
+        await upsert_func(items)
 
 
 class BiliJsonStoreImplement(AbstractStore):
     json_store_path: str = "data/bilibili/json"
     words_store_path: str = "data/bilibili/words"
-    lock = asyncio.Lock()
     file_count:int=calculate_number_of_files(json_store_path)
     WordCloud = words.AsyncWordCloudGenerator()
 
@@ -262,8 +250,8 @@ class BiliJsonStoreImplement(AbstractStore):
         """
 
         return (
-            f"{self.json_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.json",
-            f"{self.words_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}"
+            f"{self.json_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}.json",
+            f"{self.words_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}"
         )
 
     async def save_data_to_json(self, save_item: Dict, store_type: str):
@@ -276,25 +264,21 @@ class BiliJsonStoreImplement(AbstractStore):
         Returns:
 
         """
-        pathlib.Path(self.json_store_path).mkdir(parents=True, exist_ok=True)
-        pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
-        save_file_name,words_file_name_prefix = self.make_save_file_name(store_type=store_type)
-        save_data = []
-
-        async with self.lock:
-            if os.path.exists(save_file_name):
-                async with aiofiles.open(save_file_name, 'r', encoding='utf-8') as file:
-                    save_data = json.loads(await file.read())
-
-            save_data.append(save_item)
-            async with aiofiles.open(save_file_name, 'w', encoding='utf-8') as file:
-                await file.write(json.dumps(save_data, ensure_ascii=False))
+        save_file_name, words_file_name_prefix = self.make_save_file_name(store_type=store_type)
+        # 每条记录追加一行，json 模式先写到 .part 中间文件，程序退出时再合并成 JSON 数组
+        if config.SAVE_DATA_OPTION == "json":
+            writer = AsyncJsonlWriter.get_writer(f"{save_file_name}.part", json_array_file=save_file_name)
+        else:
+            writer = AsyncJsonlWriter.get_writer(f"{os.path.splitext(save_file_name)[0]}.jsonl")
+        await writer.write_item(save_item)
 
-            if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
-                try:
-                    await self.WordCloud.generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
-                except:
-                    pass
+        if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
+            pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
+            # 只对新记录分词，累计词频，词云图按间隔和程序退出时生成
+            try:
+                await self.WordCloud.add_items([save_item], words_file_name_prefix)
+            except:
+                pass
 
     async def store_content(self, content_item: Dict):
         """
@@ -353,6 +337,22 @@ class BiliJsonStoreImplement(AbstractStore):
 
         await self.save_data_to_json(save_item=dynamic_item, store_type="dynamics")
 
+    async def flush(self):
+        """
+        flush buffered json records of this store to disk
+        Returns:
+
+        """
+        await AsyncJsonlWriter.flush_all(self.json_store_path)
+
+    async def close(self):
+        """
+        flush and close the json files of this store
+        Returns:
+
+        """
+        await AsyncJsonlWriter.close_all(self.json_store_path)
+
 
 class BiliSqliteStoreImplement(AbstractStore):
     async def store_content(self, content_item: Dict):
@@ -365,16 +365,9 @@ class BiliSqliteStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_content,
-                                         query_content_by_content_id,
-                                         update_content_by_content_id)
-        video_id = content_item.get("video_id")
-        video_detail: Dict = await query_content_by_content_id(content_id=video_id)
-        if not video_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_content(content_item)
-        else:
-            await update_content_by_content_id(video_id, content_item=content_item)
+        from .bilibili_store_sql import upsert_contents
+        content_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_contents([content_item])
 
     async def store_comment(self, comment_item: Dict):
         """
@@ -386,16 +379,9 @@ class BiliSqliteStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_comment,
-                                         query_comment_by_comment_id,
-                                         update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
+        from .bilibili_store_sql import upsert_comments
+        comment_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_comments([comment_item])
 
     async def store_creator(self, creator: Dict):
         """
@@ -407,16 +393,9 @@ class BiliSqliteStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_creator,
-                                         query_creator_by_creator_id,
-                                         update_creator_by_creator_id)
-        creator_id = creator.get("user_id")
-        creator_detail: Dict = await query_creator_by_creator_id(creator_id=creator_id)
-        if not creator_detail:
-            creator["add_ts"] = utils.get_current_timestamp()
-            await add_new_creator(creator)
-        else:
-            await update_creator_by_creator_id(creator_id, creator_item=creator)
+        from .bilibili_store_sql import upsert_creators
+        creator["add_ts"] = utils.get_current_timestamp()
+        await upsert_creators([creator])
 
     async def store_contact(self, contact_item: Dict):
         """
@@ -428,19 +407,9 @@ class BiliSqliteStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_contact,
-                                         query_contact_by_up_and_fan,
-                                         update_contact_by_id, )
-
-        up_id = contact_item.get("up_id")
-        fan_id = contact_item.get("fan_id")
-        contact_detail: Dict = await query_contact_by_up_and_fan(up_id=up_id, fan_id=fan_id)
-        if not contact_detail:
-            contact_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_contact(contact_item)
-        else:
-            key_id = contact_detail.get("id")
-            await update_contact_by_id(id=key_id, contact_item=contact_item)
+        from .bilibili_store_sql import upsert_contacts
+        contact_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_contacts([contact_item])
 
     async def store_dynamic(self, dynamic_item):
         """
@@ -452,14 +421,127 @@ class BiliSqliteStoreImplement(AbstractStore):
 
         """
 
-        from .bilibili_store_sql import (add_new_dynamic,
-                                         query_dynamic_by_dynamic_id,
-                                         update_dynamic_by_dynamic_id)
+        from .bilibili_store_sql import upsert_dynamics
+        dynamic_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_dynamics([dynamic_item])
 
-        dynamic_id = dynamic_item.get("dynamic_id")
-        dynamic_detail = await query_dynamic_by_dynamic_id(dynamic_id=dynamic_id)
-        if not dynamic_detail:
-            dynamic_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_dynamic(dynamic_item)
-        else:
-            await update_dynamic_by_dynamic_id(dynamic_id, dynamic_item=dynamic_item)
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        """
+        Bilibili SQLite batch storage implementation, one upsert statement per batch
+        Args:
+            store_type: content | comment | creator | contact | dynamic
+            items:
+
+        Returns:
+
+        """
+        from .bilibili_store_sql import upsert_comments, upsert_contacts, upsert_contents, upsert_creators, upsert_dynamics
+        upsert_func = {"content": upsert_contents, "comment": upsert_comments, "creator": upsert_creators, "contact": upsert_contacts, "dynamic": upsert_dynamics}.get(store_type)
+        if upsert_func is None:
+            await super().store_batch(store_type, items)
+            return
+        add_ts = utils.get_current_timestamp()
+        for item in items:
+            item["add_ts"] = add_ts
+        await upsert_func(items)
+
+
+class BiliParquetStoreImplement(AbstractStore):
+    parquet_store_path: str = "data/bilibili/parquet"
+    file_count: int = calculate_number_of_files(parquet_store_path)
+
+    def make_save_file_name(self, table_name: str) -> str:
+        """
+        make save file name by table name
+        Args:
+            table_name: table name in schema/tables.sql
+
+        Returns: eg: data/bilibili/parquet/1_search_bilibili_video_20240114.parquet ...
+
+        """
+        return f"{self.parquet_store_path}/{self.file_count}_{crawler_type_var.get()}_{table_name}_{utils.get_current_date()}{utils.get_shard_suffix()}.parquet"
+
+    async def save_data_to_parquet(self, save_item: Dict, table_name: str):
+        """
+        Buffer the item and write it to the parquet file of the table in row groups.
+        Args:
+            save_item: save content dict info
+            table_name: table name in schema/tables.sql, decides the columns of the parquet file
+
+        Returns:
+
+        """
+        save_item["add_ts"] = utils.get_current_timestamp()
+        save_file_name = self.make_save_file_name(table_name=table_name)
+        await AsyncParquetWriter.get_writer(save_file_name, table_name=table_name).write_item(save_item)
+
+    async def store_content(self, content_item: Dict):
+        """
+        Bilibili content Parquet storage implementation
+        Args:
+            content_item: content dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(content_item, "bilibili_video")
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        Bilibili comment Parquet storage implementation
+        Args:
+            comment_item: comment dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(comment_item, "bilibili_video_comment")
+
+    async def store_creator(self, creator: Dict):
+        """
+        Bilibili creator Parquet storage implementation
+        Args:
+            creator: creator dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(creator, "bilibili_up_info")
+
+    async def store_contact(self, contact_item: Dict):
+        """
+        Bilibili contact Parquet storage implementation
+        Args:
+            contact_item: contact dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(contact_item, "bilibili_contact_info")
+
+    async def store_dynamic(self, dynamic_item: Dict):
+        """
+        Bilibili dynamic Parquet storage implementation
+        Args:
+            dynamic_item: dynamic dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(dynamic_item, "bilibili_up_dynamic")
+
+    async def flush(self):
+        """
+        flush buffered parquet records of this store to disk
+        Returns:
+
+        """
+        await AsyncParquetWriter.flush_all(self.parquet_store_path)
+
+    async def close(self):
+        """
+        flush and close the parquet files of this store
+        Returns:
+
+        """
+        await AsyncParquetWriter.close_all(self.parquet_store_path)
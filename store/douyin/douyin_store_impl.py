@@ -13,18 +13,15 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 18:46
 # @Desc    : 抖音存储实现类
-import asyncio
-import csv
-import json
 import os
 import pathlib
-from typing import Dict
-
-import aiofiles
+from typing import Dict, List
 
 import config
 from base.base_crawler import AbstractStore
 from tools import utils, words
+from tools.async_file_writer import AsyncCsvWriter, AsyncJsonlWriter
+from tools.async_parquet_writer import AsyncParquetWriter
 from var import crawler_type_var
 
 
@@ -56,7 +53,7 @@ class DouyinCsvStoreImplement(AbstractStore):
         Returns: eg: data/douyin/search_comments_20240114.csv ...
 
         """
-        return f"{self.csv_store_path}/{self.file_count}_{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.csv"
+        return f"{self.csv_store_path}/{self.file_count}_{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}.csv"
 
     async def save_data_to_csv(self, save_item: Dict, store_type: str):
         """
@@ -68,13 +65,8 @@ class DouyinCsvStoreImplement(AbstractStore):
         Returns: no returns
 
         """
-        pathlib.Path(self.csv_store_path).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(store_type=store_type)
-        async with aiofiles.open(save_file_name, mode='a+', encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
-            if await f.tell() == 0:
-                await writer.writerow(save_item.keys())
-            await writer.writerow(save_item.values())
+        await AsyncCsvWriter.get_writer(save_file_name).write_row(save_item)
 
     async def store_content(self, content_item: Dict):
         """
@@ -109,6 +101,22 @@ class DouyinCsvStoreImplement(AbstractStore):
         """
         await self.save_data_to_csv(save_item=creator, store_type="creator")
 
+    async def flush(self):
+        """
+        flush buffered csv records of this store to disk
+        Returns:
+
+        """
+        await AsyncCsvWriter.flush_all(self.csv_store_path)
+
+    async def close(self):
+        """
+        flush and close the csv files of this store
+        Returns:
+
+        """
+        await AsyncCsvWriter.close_all(self.csv_store_path)
+
 
 class DouyinDbStoreImplement(AbstractStore):
     async def store_content(self, content_item: Dict):
@@ -121,17 +129,15 @@ class DouyinDbStoreImplement(AbstractStore):
 
         """
 
-        from .douyin_store_sql import (add_new_content,
-                                       query_content_by_content_id,
-                                       update_content_by_content_id)
+        from .douyin_store_sql import (update_content_by_content_id,
+                                       upsert_contents)
         aweme_id = content_item.get("aweme_id")
-        aweme_detail: Dict = await query_content_by_content_id(content_id=aweme_id)
-        if not aweme_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            if content_item.get("title"):
-                await add_new_content(content_item)
-        else:
+        if not content_item.get("title"):
+            # 没有标题的视频不新增记录，只更新已存在的记录
             await update_content_by_content_id(aweme_id, content_item=content_item)
+            return
+        content_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_contents([content_item])
 
     async def store_comment(self, comment_item: Dict):
         """
@@ -142,16 +148,9 @@ class DouyinDbStoreImplement(AbstractStore):
         Returns:
 
         """
-        from .douyin_store_sql import (add_new_comment,
-                                       query_comment_by_comment_id,
-                                       update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
+        from .douyin_store_sql import upsert_comments
+        comment_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_comments([comment_item])
 
     async def store_creator(self, creator: Dict):
         """
@@ -162,22 +161,34 @@ class DouyinDbStoreImplement(AbstractStore):
         Returns:
 
         """
-        from .douyin_store_sql import (add_new_creator,
-                                       query_creator_by_user_id,
-                                       update_creator_by_user_id)
-        user_id = creator.get("user_id")
-        user_detail: Dict = await query_creator_by_user_id(user_id)
-        if not user_detail:
-            creator["add_ts"] = utils.get_current_timestamp()
-            await add_new_creator(creator)
-        else:
-            await update_creator_by_user_id(user_id, creator)
+        from .douyin_store_sql import upsert_creators
+        creator["add_ts"] = utils.get_current_timestamp()
+        await upsert_creators([creator])
+
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        """
+        Douyin DB batch storage implementation, one upsert statement per batch
+        Args:
+            store_type: comment | creator, content is stored one by one because of the title check
+            items:
+
+        Returns:
+
+        """
+        from .douyin_store_sql import upsert_comments, upsert_creators
+        upsert_func = {"comment": upsert_comments, "creator": upsert_creators}.get(store_type)
+        if upsert_func is None:
+            await super().store_batch(store_type, items)
+            return
+        add_ts = utils.get_current_timestamp()
+        for item in items:
+            item["add_ts"] = add_ts
+        await upsert_func(items)
 
 class DouyinJsonStoreImplement(AbstractStore):
     json_store_path: str = "data/douyin/json"
     words_store_path: str = "data/douyin/words"
 
-    lock = asyncio.Lock()
     file_count: int = calculate_number_of_files(json_store_path)
     WordCloud = words.AsyncWordCloudGenerator()
 
@@ -192,8 +203,8 @@ class DouyinJsonStoreImplement(AbstractStore):
         """
 
         return (
-            f"{self.json_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.json",
-            f"{self.words_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}"
+            f"{self.json_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}.json",
+            f"{self.words_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}"
         )
     async def save_data_to_json(self, save_item: Dict, store_type: str):
         """
@@ -205,25 +216,21 @@ class DouyinJsonStoreImplement(AbstractStore):
         Returns:
 
         """
-        pathlib.Path(self.json_store_path).mkdir(parents=True, exist_ok=True)
-        pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
-        save_file_name,words_file_name_prefix = self.make_save_file_name(store_type=store_type)
-        save_data = []
-
-        async with self.lock:
-            if os.path.exists(save_file_name):
-                async with aiofiles.open(save_file_name, 'r', encoding='utf-8') as file:
-                    save_data = json.loads(await file.read())
-
-            save_data.append(save_item)
-            async with aiofiles.open(save_file_name, 'w', encoding='utf-8') as file:
-                await file.write(json.dumps(save_data, ensure_ascii=False))
+        save_file_name, words_file_name_prefix = self.make_save_file_name(store_type=store_type)
+        # 每条记录追加一行，json 模式先写到 .part 中间文件，程序退出时再合并成 JSON 数组
+        if config.SAVE_DATA_OPTION == "json":
+            writer = AsyncJsonlWriter.get_writer(f"{save_file_name}.part", json_array_file=save_file_name)
+        else:
+            writer = AsyncJsonlWriter.get_writer(f"{os.path.splitext(save_file_name)[0]}.jsonl")
+        await writer.write_item(save_item)
 
-            if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
-                try:
-                    await self.WordCloud.generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
-                except:
-                    pass
+        if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
+            pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
+            # 只对新记录分词，累计词频，词云图按间隔和程序退出时生成
+            try:
+                await self.WordCloud.add_items([save_item], words_file_name_prefix)
+            except:
+                pass
 
     async def store_content(self, content_item: Dict):
         """
@@ -259,6 +266,22 @@ class DouyinJsonStoreImplement(AbstractStore):
         """
         await self.save_data_to_json(save_item=creator, store_type="creator")
 
+    async def flush(self):
+        """
+        flush buffered json records of this store to disk
+        Returns:
+
+        """
+        await AsyncJsonlWriter.flush_all(self.json_store_path)
+
+    async def close(self):
+        """
+        flush and close the json files of this store
+        Returns:
+
+        """
+        await AsyncJsonlWriter.close_all(self.json_store_path)
+
 
 class DouyinSqliteStoreImplement(AbstractStore):
     async def store_content(self, content_item: Dict):
@@ -271,17 +294,15 @@ class DouyinSqliteStoreImplement(AbstractStore):
 
         """
 
-        from .douyin_store_sql import (add_new_content,
-                                       query_content_by_content_id,
-                                       update_content_by_content_id)
+        from .douyin_store_sql import (update_content_by_content_id,
+                                       upsert_contents)
         aweme_id = content_item.get("aweme_id")
-        aweme_detail: Dict = await query_content_by_content_id(content_id=aweme_id)
-        if not aweme_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            if content_item.get("title"):
-                await add_new_content(content_item)
-        else:
+        if not content_item.get("title"):
+            # 没有标题的视频不新增记录，只更新已存在的记录
             await update_content_by_content_id(aweme_id, content_item=content_item)
+            return
+        content_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_contents([content_item])
 
     async def store_comment(self, comment_item: Dict):
         """
@@ -292,16 +313,9 @@ class DouyinSqliteStoreImplement(AbstractStore):
         Returns:
 
         """
-        from .douyin_store_sql import (add_new_comment,
-                                       query_comment_by_comment_id,
-                                       update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
+        from .douyin_store_sql import upsert_comments
+        comment_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_comments([comment_item])
 
     async def store_creator(self, creator: Dict):
         """
@@ -312,13 +326,105 @@ class DouyinSqliteStoreImplement(AbstractStore):
         Returns:
 
         """
-        from .douyin_store_sql import (add_new_creator,
-                                       query_creator_by_user_id,
-                                       update_creator_by_user_id)
-        user_id = creator.get("user_id")
-        user_detail: Dict = await query_creator_by_user_id(user_id)
-        if not user_detail:
-            creator["add_ts"] = utils.get_current_timestamp()
-            await add_new_creator(creator)
-        else:
-            await update_creator_by_user_id(user_id, creator)
\ No newline at end of file
+        from .douyin_store_sql import upsert_creators
+        creator["add_ts"] = utils.get_current_timestamp()
+        await upsert_creators([creator])
+
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        """
+        Douyin SQLite batch storage implementation, one upsert statement per batch
+        Args:
+            store_type: comment | creator, content is stored one by one because of the title check
+            items:
+
+        Returns:
+
+        """
+        from .douyin_store_sql import upsert_comments, upsert_creators
+        upsert_func = {"comment": upsert_comments, "creator": upsert_creators}.get(store_type)
+        if upsert_func is None:
+            await super().store_batch(store_type, items)
+            return
+        add_ts = utils.get_current_timestamp()
+        for item in items:
+            item["add_ts"] = add_ts
+        await upsert_func(items)
+
+
+class DouyinParquetStoreImplement(AbstractStore):
+    parquet_store_path: str = "data/douyin/parquet"
+    file_count: int = calculate_number_of_files(parquet_store_path)
+
+    def make_save_file_name(self, table_name: str) -> str:
+        """
+        make save file name by table name
+        Args:
+            table_name: table name in schema/tables.sql
+
+        Returns: eg: data/douyin/parquet/1_search_douyin_aweme_20240114.parquet ...
+
+        """
+        return f"{self.parquet_store_path}/{self.file_count}_{crawler_type_var.get()}_{table_name}_{utils.get_current_date()}{utils.get_shard_suffix()}.parquet"
+
+    async def save_data_to_parquet(self, save_item: Dict, table_name: str):
+        """
+        Buffer the item and write it to the parquet file of the table in row groups.
+        Args:
+            save_item: save content dict info
+            table_name: table name in schema/tables.sql, decides the columns of the parquet file
+
+        Returns:
+
+        """
+        save_item["add_ts"] = utils.get_current_timestamp()
+        save_file_name = self.make_save_file_name(table_name=table_name)
+        await AsyncParquetWriter.get_writer(save_file_name, table_name=table_name).write_item(save_item)
+
+    async def store_content(self, content_item: Dict):
+        """
+        Douyin content Parquet storage implementation
+        Args:
+            content_item: content dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(content_item, "douyin_aweme")
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        Douyin comment Parquet storage implementation
+        Args:
+            comment_item: comment dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(comment_item, "douyin_aweme_comment")
+
+    async def store_creator(self, creator: Dict):
+        """
+        Douyin creator Parquet storage implementation
+        Args:
+            creator: creator dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(creator, "dy_creator")
+
+    async def flush(self):
+        """
+        flush buffered parquet records of this store to disk
+        Returns:
+
+        """
+        await AsyncParquetWriter.flush_all(self.parquet_store_path)
+
+    async def close(self):
+        """
+        flush and close the parquet files of this store
+        Returns:
+
+        """
+        await AsyncParquetWriter.close_all(self.parquet_store_path)
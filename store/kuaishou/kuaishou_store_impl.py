@@ -13,18 +13,15 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 20:03
 # @Desc    : 快手存储实现类
-import asyncio
-import csv
-import json
 import os
 import pathlib
-from typing import Dict
-
-import aiofiles
+from typing import Dict, List
 
 import config
 from base.base_crawler import AbstractStore
 from tools import utils, words
+from tools.async_file_writer import AsyncCsvWriter, AsyncJsonlWriter
+from tools.async_parquet_writer import AsyncParquetWriter
 from var import crawler_type_var
 
 
@@ -59,7 +56,7 @@ class KuaishouCsvStoreImplement(AbstractStore):
         Returns: eg: data/douyin/search_comments_20240114.csv ...
 
         """
-        return f"{self.csv_store_path}/{self.file_count}_{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.csv"
+        return f"{self.csv_store_path}/{self.file_count}_{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}.csv"
 
     async def save_data_to_csv(self, save_item: Dict, store_type: str):
         """
@@ -71,13 +68,8 @@ class KuaishouCsvStoreImplement(AbstractStore):
         Returns: no returns
 
         """
-        pathlib.Path(self.csv_store_path).mkdir(parents=True, exist_ok=True)
         save_file_name = self.make_save_file_name(store_type=store_type)
-        async with aiofiles.open(save_file_name, mode='a+', encoding="utf-8-sig", newline="") as f:
-            writer = csv.writer(f)
-            if await f.tell() == 0:
-                await writer.writerow(save_item.keys())
-            await writer.writerow(save_item.values())
+        await AsyncCsvWriter.get_writer(save_file_name).write_row(save_item)
 
     async def store_content(self, content_item: Dict):
         """
@@ -101,6 +93,22 @@ class KuaishouCsvStoreImplement(AbstractStore):
         """
         await self.save_data_to_csv(save_item=comment_item, store_type="comments")
 
+    async def flush(self):
+        """
+        flush buffered csv records of this store to disk
+        Returns:
+
+        """
+        await AsyncCsvWriter.flush_all(self.csv_store_path)
+
+    async def close(self):
+        """
+        flush and close the csv files of this store
+        Returns:
+
+        """
+        await AsyncCsvWriter.close_all(self.csv_store_path)
+
 
 class KuaishouDbStoreImplement(AbstractStore):
     async def store_creator(self, creator: Dict):
@@ -116,16 +124,9 @@ class KuaishouDbStoreImplement(AbstractStore):
 
         """
 
-        from .kuaishou_store_sql import (add_new_content,
-                                         query_content_by_content_id,
-                                         update_content_by_content_id)
-        video_id = content_item.get("video_id")
-        video_detail: Dict = await query_content_by_content_id(content_id=video_id)
-        if not video_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_content(content_item)
-        else:
-            await update_content_by_content_id(video_id, content_item=content_item)
+        from .kuaishou_store_sql import upsert_contents
+        content_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_contents([content_item])
 
     async def store_comment(self, comment_item: Dict):
         """
@@ -136,22 +137,34 @@ class KuaishouDbStoreImplement(AbstractStore):
         Returns:
 
         """
-        from .kuaishou_store_sql import (add_new_comment,
-                                         query_comment_by_comment_id,
-                                         update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
+        from .kuaishou_store_sql import upsert_comments
+        comment_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_comments([comment_item])
+
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        """
+        Kuaishou DB batch storage implementation, one upsert statement per batch
+        Args:
+            store_type: content | comment
+            items:
+
+        Returns:
+
+        """
+        from .kuaishou_store_sql import upsert_comments, upsert_contents
+        upsert_func = {"content": upsert_contents, "comment": upsert_comments}.get(store_type)
+        if upsert_func is None:
+            await super().store_batch(store_type, items)
+            return
+        add_ts = utils.get_current_timestamp()
+        for item in items:
+            item["add_ts"] = add_ts
+        await upsert_func(items)
 
 
 class KuaishouJsonStoreImplement(AbstractStore):
     json_store_path: str = "data/kuaishou/json"
     words_store_path: str = "data/kuaishou/words"
-    lock = asyncio.Lock()
     file_count:int=calculate_number_of_files(json_store_path)
     WordCloud = words.AsyncWordCloudGenerator()
 
@@ -168,8 +181,8 @@ class KuaishouJsonStoreImplement(AbstractStore):
         """
 
         return (
-            f"{self.json_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}.json",
-            f"{self.words_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}"
+            f"{self.json_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}.json",
+            f"{self.words_store_path}/{crawler_type_var.get()}_{store_type}_{utils.get_current_date()}{utils.get_shard_suffix()}"
         )
 
     async def save_data_to_json(self, save_item: Dict, store_type: str):
@@ -182,25 +195,21 @@ class KuaishouJsonStoreImplement(AbstractStore):
         Returns:
 
         """
-        pathlib.Path(self.json_store_path).mkdir(parents=True, exist_ok=True)
-        pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
-        save_file_name,words_file_name_prefix = self.make_save_file_name(store_type=store_type)
-        save_data = []
-
-        async with self.lock:
-            if os.path.exists(save_file_name):
-                async with aiofiles.open(save_file_name, 'r', encoding='utf-8') as file:
-                    save_data = json.loads(await file.read())
-
-            save_data.append(save_item)
-            async with aiofiles.open(save_file_name, 'w', encoding='utf-8') as file:
-                await file.write(json.dumps(save_data, ensure_ascii=False))
+        save_file_name, words_file_name_prefix = self.make_save_file_name(store_type=store_type)
+        # 每条记录追加一行，json 模式先写到 .part 中间文件，程序退出时再合并成 JSON 数组
+        if config.SAVE_DATA_OPTION == "json":
+            writer = AsyncJsonlWriter.get_writer(f"{save_file_name}.part", json_array_file=save_file_name)
+        else:
+            writer = AsyncJsonlWriter.get_writer(f"{os.path.splitext(save_file_name)[0]}.jsonl")
+        await writer.write_item(save_item)
 
-            if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
-                try:
-                    await self.WordCloud.generate_word_frequency_and_cloud(save_data, words_file_name_prefix)
-                except:
-                    pass
+        if config.ENABLE_GET_COMMENTS and config.ENABLE_GET_WORDCLOUD:
+            pathlib.Path(self.words_store_path).mkdir(parents=True, exist_ok=True)
+            # 只对新记录分词，累计词频，词云图按间隔和程序退出时生成
+            try:
+                await self.WordCloud.add_items([save_item], words_file_name_prefix)
+            except:
+                pass
 
     async def store_content(self, content_item: Dict):
         """
@@ -235,6 +244,22 @@ class KuaishouJsonStoreImplement(AbstractStore):
         """
         await self.save_data_to_json(creator, "creator")
 
+    async def flush(self):
+        """
+        flush buffered json records of this store to disk
+        Returns:
+
+        """
+        await AsyncJsonlWriter.flush_all(self.json_store_path)
+
+    async def close(self):
+        """
+        flush and close the json files of this store
+        Returns:
+
+        """
+        await AsyncJsonlWriter.close_all(self.json_store_path)
+
 
 class KuaishouSqliteStoreImplement(AbstractStore):
     async def store_content(self, content_item: Dict):
@@ -247,16 +272,9 @@ class KuaishouSqliteStoreImplement(AbstractStore):
 
         """
 
-        from .kuaishou_store_sql import (add_new_content,
-                                         query_content_by_content_id,
-                                         update_content_by_content_id)
-        video_id = content_item.get("video_id")
-        video_detail: Dict = await query_content_by_content_id(content_id=video_id)
-        if not video_detail:
-            content_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_content(content_item)
-        else:
-            await update_content_by_content_id(video_id, content_item=content_item)
+        from .kuaishou_store_sql import upsert_contents
+        content_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_contents([content_item])
 
     async def store_comment(self, comment_item: Dict):
         """
@@ -267,16 +285,9 @@ class KuaishouSqliteStoreImplement(AbstractStore):
         Returns:
 
         """
-        from .kuaishou_store_sql import (add_new_comment,
-                                         query_comment_by_comment_id,
-                                         update_comment_by_comment_id)
-        comment_id = comment_item.get("comment_id")
-        comment_detail: Dict = await query_comment_by_comment_id(comment_id=comment_id)
-        if not comment_detail:
-            comment_item["add_ts"] = utils.get_current_timestamp()
-            await add_new_comment(comment_item)
-        else:
-            await update_comment_by_comment_id(comment_id, comment_item=comment_item)
+        from .kuaishou_store_sql import upsert_comments
+        comment_item["add_ts"] = utils.get_current_timestamp()
+        await upsert_comments([comment_item])
 
     async def store_creator(self, creator: Dict):
         """
@@ -287,4 +298,103 @@ class KuaishouSqliteStoreImplement(AbstractStore):
         Returns:
 
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        """
+        Kuaishou SQLite batch storage implementation, one upsert statement per batch
+        Args:
+            store_type: content | comment
+            items:
+
+        Returns:
+
+        """
+        from .kuaishou_store_sql import upsert_comments, upsert_contents
+        upsert_func = {"content": upsert_contents, "comment": upsert_comments}.get(store_type)
+        if upsert_func is None:
+            await super().store_batch(store_type, items)
+            return
+        add_ts = utils.get_current_timestamp()
+        for item in items:
+            item["add_ts"] = add_ts
+        await upsert_func(items)
+
+
+class KuaishouParquetStoreImplement(AbstractStore):
+    parquet_store_path: str = "data/kuaishou/parquet"
+    file_count: int = calculate_number_of_files(parquet_store_path)
+
+    def make_save_file_name(self, table_name: str) -> str:
+        """
+        make save file name by table name
+        Args:
+            table_name: table name in schema/tables.sql
+
+        Returns: eg: data/kuaishou/parquet/1_search_kuaishou_video_20240114.parquet ...
+
+        """
+        return f"{self.parquet_store_path}/{self.file_count}_{crawler_type_var.get()}_{table_name}_{utils.get_current_date()}{utils.get_shard_suffix()}.parquet"
+
+    async def save_data_to_parquet(self, save_item: Dict, table_name: str):
+        """
+        Buffer the item and write it to the parquet file of the table in row groups.
+        Args:
+            save_item: save content dict info
+            table_name: table name in schema/tables.sql, decides the columns of the parquet file
+
+        Returns:
+
+        """
+        save_item["add_ts"] = utils.get_current_timestamp()
+        save_file_name = self.make_save_file_name(table_name=table_name)
+        await AsyncParquetWriter.get_writer(save_file_name, table_name=table_name).write_item(save_item)
+
+    async def store_content(self, content_item: Dict):
+        """
+        Kuaishou content Parquet storage implementation
+        Args:
+            content_item: content dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(content_item, "kuaishou_video")
+
+    async def store_comment(self, comment_item: Dict):
+        """
+        Kuaishou comment Parquet storage implementation
+        Args:
+            comment_item: comment dict
+
+        Returns:
+
+        """
+        await self.save_data_to_parquet(comment_item, "kuaishou_video_comment")
+
+    async def store_creator(self, creator: Dict):
+        """
+        Kuaishou creator Parquet storage implementation
+        Args:
+            creator: creator dict
+
+        Returns:
+
+        """
+        pass
+
+    async def flush(self):
+        """
+        flush buffered parquet records of this store to disk
+        Returns:
+
+        """
+        await AsyncParquetWriter.flush_all(self.parquet_store_path)
+
+    async def close(self):
+        """
+        flush and close the parquet files of this store
+        Returns:
+
+        """
+        await AsyncParquetWriter.close_all(self.parquet_store_path)
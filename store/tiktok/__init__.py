@@ -8,6 +8,7 @@ from .tiktok_store_impl import (
     TikTokCsvStoreImplement,
     TikTokDbStoreImplement,
     TikTokJsonStoreImplement,
+    TikTokParquetStoreImplement,
     TikTokSqliteStoreImplement
 )
 
@@ -17,6 +18,8 @@ class TikTokStoreFactory:
         "csv": TikTokCsvStoreImplement,
         "db": TikTokDbStoreImplement,
         "json": TikTokJsonStoreImplement,
+        "jsonl": TikTokJsonStoreImplement,
+        "parquet": TikTokParquetStoreImplement,
         "sqlite": TikTokSqliteStoreImplement,
     }
 
@@ -27,7 +30,7 @@ class TikTokStoreFactory:
             raise ValueError(
                 "[TikTokStoreFactory.create_store] Invalid save option..."
             )
-        return store_class()
+        return store_class.get_instance()
 
 
 async def update_tiktok_video(video_item: Dict):
@@ -15,52 +15,16 @@ from async_sqlite_db import AsyncSqliteDB
 from var import media_crawler_db_var
 
 
-async def query_content_by_content_id(content_id: str) -> Dict:
+async def upsert_contents(content_items: List[Dict]) -> int:
     async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    sql: str = f"select * from tiktok_video where video_id = '{content_id}'"
-    rows: List[Dict] = await async_db_conn.query(sql)
-    return rows[0] if len(rows) > 0 else {}
+    return await async_db_conn.upsert_many("tiktok_video", content_items, "video_id")
 
 
-async def add_new_content(content_item: Dict) -> int:
+async def upsert_comments(comment_items: List[Dict]) -> int:
     async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    return await async_db_conn.item_to_table("tiktok_video", content_item)
+    return await async_db_conn.upsert_many("tiktok_video_comment", comment_items, "comment_id")
 
 
-async def update_content_by_content_id(content_id: str, content_item: Dict) -> int:
+async def upsert_creators(creator_items: List[Dict]) -> int:
     async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    return await async_db_conn.update_table("tiktok_video", content_item, "video_id", content_id)
-
-
-async def query_comment_by_comment_id(comment_id: str) -> Dict:
-    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    sql: str = f"select * from tiktok_video_comment where comment_id = '{comment_id}'"
-    rows: List[Dict] = await async_db_conn.query(sql)
-    return rows[0] if len(rows) > 0 else {}
-
-
-async def add_new_comment(comment_item: Dict) -> int:
-    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    return await async_db_conn.item_to_table("tiktok_video_comment", comment_item)
-
-
-async def update_comment_by_comment_id(comment_id: str, comment_item: Dict) -> int:
-    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    return await async_db_conn.update_table("tiktok_video_comment", comment_item, "comment_id", comment_id)
-
-
-async def query_creator_by_user_id(user_id: str) -> Dict:
-    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    sql: str = f"select * from tiktok_creator where user_id = '{user_id}'"
-    rows: List[Dict] = await async_db_conn.query(sql)
-    return rows[0] if len(rows) > 0 else {}
-
-
-async def add_new_creator(creator_item: Dict) -> int:
-    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    return await async_db_conn.item_to_table("tiktok_creator", creator_item)
-
-
-async def update_creator_by_user_id(user_id: str, creator_item: Dict) -> int:
-    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
-    return await async_db_conn.update_table("tiktok_creator", creator_item, "user_id", user_id)
\ No newline at end of file
+    return await async_db_conn.upsert_many("tiktok_creator", creator_items, "user_id")
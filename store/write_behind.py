@@ -0,0 +1,175 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 写后队列（write-behind）：爬虫把数据放入有界队列后立即返回，由后台写入任务按存储类型批量写入存储
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+import config
+from base.base_crawler import AbstractStore
+from tools import utils
+
+
+class WriteBehindStore(AbstractStore):
+    """
+    包装一个存储实现，store_* 调用只把数据放入队列，队列满时等待（背压），
+    后台写入任务按存储类型攒批，达到批量大小或最大延迟后调用被包装存储的 store_batch
+    """
+
+    def __init__(self, store: AbstractStore):
+        self.store = store
+        self.queue: Optional[asyncio.Queue] = None
+        self.writer_tasks: List[asyncio.Task] = []
+
+    def __getattr__(self, name: str):
+        # 平台特有的存储方法（如 B站的 store_contact、store_dynamic）同样走队列
+        if name.startswith("store_") and hasattr(self.store, name):
+            async def store_method(item: Dict):
+                await self.put(name[len("store_"):], item)
+
+            return store_method
+        return getattr(self.store, name)
+
+    @staticmethod
+    def get_table_setting(store_type: str) -> Tuple[int, float]:
+        """
+        获取存储类型对应的批量大小和最大延迟
+        Args:
+            store_type:
+
+        Returns: (batch_size, max_latency)
+
+        """
+        setting = config.WRITE_BEHIND_TABLE_SETTINGS.get(store_type, {})
+        return (
+            setting.get("batch_size", config.WRITE_BEHIND_BATCH_SIZE),
+            setting.get("max_latency", config.WRITE_BEHIND_MAX_LATENCY),
+        )
+
+    def start_writers(self):
+        # 写入任务在第一次写入时创建，这样会复制爬虫设置好的上下文变量（crawler_type_var、数据库连接等）
+        self.queue = asyncio.Queue(maxsize=config.WRITE_BEHIND_QUEUE_SIZE)
+        self.writer_tasks = [asyncio.create_task(self.writer()) for _ in range(config.WRITE_BEHIND_WORKERS)]
+
+    async def put(self, store_type: str, item: Dict):
+        """
+        把一条数据放入写入队列，队列满时等待写入任务消费
+        Args:
+            store_type: 存储类型，如 content、comment、creator
+            item:
+
+        Returns:
+
+        """
+        if self.queue is None:
+            self.start_writers()
+        await self.queue.put((store_type, item))
+
+    async def write_batch(self, store_type: str, items: List[Dict]):
+        """
+        批量写入一批数据，整批失败时逐条重试，避免一条异常数据导致整批丢失
+        Args:
+            store_type:
+            items:
+
+        Returns:
+
+        """
+        try:
+            await self.store.store_batch(store_type, items)
+        except Exception as e:
+            utils.logger.error(
+                f"[WriteBehindStore.write_batch] store {len(items)} {store_type} items to "
+                f"{self.store.__class__.__name__} error: {e}")
+            if len(items) > 1:
+                for item in items:
+                    try:
+                        await self.store.store_batch(store_type, [item])
+                    except Exception as e:
+                        utils.logger.error(f"[WriteBehindStore.write_batch] store {store_type} item error: {e}")
+        finally:
+            for _ in items:
+                self.queue.task_done()
+
+    async def writer(self):
+        """
+        写入任务：从队列中取数据，按存储类型攒批写入，收到 None 时写完剩余数据后退出
+        """
+        batches: Dict[str, List[Dict]] = {}
+        deadlines: Dict[str, float] = {}
+        while True:
+            timeout = max(0.0, min(deadlines.values()) - time.monotonic()) if deadlines else None
+            try:
+                entry = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                entry = ()
+
+            if entry is None:
+                self.queue.task_done()
+                for store_type in list(batches):
+                    deadlines.pop(store_type)
+                    await self.write_batch(store_type, batches.pop(store_type))
+                return
+
+            if entry:
+                store_type, item = entry
+                batch_size, max_latency = self.get_table_setting(store_type)
+                if store_type not in batches:
+                    batches[store_type] = []
+                    deadlines[store_type] = time.monotonic() + max_latency
+                batches[store_type].append(item)
+                if len(batches[store_type]) >= batch_size:
+                    deadlines.pop(store_type)
+                    await self.write_batch(store_type, batches.pop(store_type))
+
+            now = time.monotonic()
+            for store_type in [key for key, deadline in deadlines.items() if deadline <= now]:
+                deadlines.pop(store_type)
+                await self.write_batch(store_type, batches.pop(store_type))
+
+    async def store_content(self, content_item: Dict):
+        await self.put("content", content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        await self.put("comment", comment_item)
+
+    async def store_creator(self, creator: Dict):
+        await self.put("creator", creator)
+
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        for item in items:
+            await self.put(store_type, item)
+
+    async def open(self):
+        await self.store.open()
+
+    async def flush(self):
+        """
+        等待队列中的数据全部写入后，再让被包装的存储落盘
+        """
+        if self.queue is not None:
+            await self.queue.join()
+        await self.store.flush()
+
+    async def close(self):
+        """
+        通知写入任务写完剩余数据并退出，然后关闭被包装的存储
+        """
+        if self.queue is not None:
+            for _ in self.writer_tasks:
+                await self.queue.put(None)
+            await asyncio.gather(*self.writer_tasks, return_exceptions=True)
+            self.queue = None
+            self.writer_tasks = []
+        await self.store.close()
@@ -0,0 +1,97 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from tools.adaptive_concurrency import AdaptiveConcurrencyLimiter, get_concurrency_limiter, record_block
+from var import platform_var
+
+
+class TestAdaptiveConcurrencyLimiter(IsolatedAsyncioTestCase):
+
+    async def test_additive_increase_and_multiplicative_decrease(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=2, min_limit=1, max_limit=8, cooldown=60)
+        for _ in range(2 + 3 + 4):
+            limiter.record_success()
+        self.assertEqual(limiter.limit, 5)
+
+        limiter.record_block("captcha")
+        self.assertEqual(limiter.limit, 2)
+        # 冷却时间内的信号不再重复缩小
+        limiter.record_block("captcha")
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.blocks, 2)
+
+    async def test_limits_in_flight_tasks(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=3, min_limit=1, max_limit=3)
+        peak = 0
+
+        async def job():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[job() for _ in range(20)])
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.snapshot()["in_flight"], 0)
+
+    async def test_cancel_waiting_task(self):
+        limiter = AdaptiveConcurrencyLimiter(initial=1, min_limit=1, max_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        self.assertEqual(limiter.snapshot(), {"limit": 1, "in_flight": 0, "waiting": 0, "successes": 0, "blocks": 0})
+
+    async def test_limiters_isolated_per_platform(self):
+        origin = config.ENABLE_ADAPTIVE_CONCURRENCY, config.MAX_CONCURRENCY_NUM
+        config.ENABLE_ADAPTIVE_CONCURRENCY, config.MAX_CONCURRENCY_NUM = True, 4
+        AdaptiveConcurrencyLimiter._instances.clear()
+
+        async def crawl(platform, blocked):
+            platform_var.set(platform)
+            limiter = get_concurrency_limiter()
+            if blocked:
+                record_block("captcha")
+            return limiter
+
+        try:
+            xhs_limiter, bili_limiter = await asyncio.gather(crawl("xhs", True), crawl("bili", False))
+        finally:
+            config.ENABLE_ADAPTIVE_CONCURRENCY, config.MAX_CONCURRENCY_NUM = origin
+            AdaptiveConcurrencyLimiter._instances.clear()
+        self.assertIsNot(xhs_limiter, bili_limiter)
+        self.assertEqual(xhs_limiter.limit, 2)
+        self.assertEqual(bili_limiter.limit, 4)
+
+    async def test_semaphore_sized_per_stage(self):
+        origin = config.ENABLE_ADAPTIVE_CONCURRENCY
+        config.ENABLE_ADAPTIVE_CONCURRENCY = False
+        try:
+            semaphore = get_concurrency_limiter(3)
+        finally:
+            config.ENABLE_ADAPTIVE_CONCURRENCY = origin
+        for _ in range(3):
+            await semaphore.acquire()
+        self.assertTrue(semaphore.locked())
+
+
+if __name__ == "__main__":
+    unittest.main()
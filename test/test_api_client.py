@@ -0,0 +1,54 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from base.base_crawler import AbstractApiClient
+
+
+class DummyApiClient(AbstractApiClient):
+
+    async def request(self, method, url, **kwargs):
+        pass
+
+    async def update_cookies(self, browser_context):
+        pass
+
+
+class TestAbstractApiClient(IsolatedAsyncioTestCase):
+
+    async def test_rotated_proxy_clients_closed(self):
+        api_client = DummyApiClient()
+        first = api_client.get_http_client({"http://": "http://127.0.0.1:1"})
+        self.assertIs(api_client.get_http_client({"http://": "http://127.0.0.1:1"}), first)
+        # 轮换代理超过缓存数量后，最久未使用的客户端被关闭
+        second = api_client.get_http_client({"http://": "http://127.0.0.1:2"})
+        third = api_client.get_http_client({"http://": "http://127.0.0.1:3"})
+        await asyncio.gather(*api_client._closing_clients)
+        self.assertEqual([first.is_closed, second.is_closed, third.is_closed], [True, False, False])
+        await api_client.close()
+        self.assertEqual([second.is_closed, third.is_closed], [True, True])
+
+    async def test_recently_used_client_kept(self):
+        api_client = DummyApiClient()
+        first = api_client.get_http_client(None)
+        api_client.get_http_client({"http://": "http://127.0.0.1:2"})
+        self.assertIs(api_client.get_http_client(None), first)
+        api_client.get_http_client({"http://": "http://127.0.0.1:3"})
+        self.assertIs(api_client.get_http_client(None), first)
+        await api_client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import csv
+import json
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+
+from tools.async_file_writer import AsyncBufferedFileWriter, AsyncCsvWriter, AsyncJsonlWriter
+
+
+class TestAsyncFileWriter(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    async def asyncTearDown(self):
+        await AsyncBufferedFileWriter.close_all()
+        self.tmp_dir.cleanup()
+
+    async def test_csv_header_written_once(self):
+        file_path = os.path.join(self.tmp_dir.name, "csv", "contents.csv")
+        # 两次打开同一个文件（模拟两次运行），表头只写一次
+        for _ in range(2):
+            writer = AsyncCsvWriter.get_writer(file_path, flush_size=3)
+            for i in range(5):
+                await writer.write_row({"note_id": str(i), "title": "标题,带逗号"})
+            await AsyncBufferedFileWriter.close_all()
+
+        with open(file_path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["note_id", "title"])
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(rows[6], ["0", "标题,带逗号"])
+        self.assertEqual(rows[-1], ["4", "标题,带逗号"])
+
+    async def test_jsonl_export_json_array(self):
+        json_file = os.path.join(self.tmp_dir.name, "contents.json")
+        writer = AsyncJsonlWriter.get_writer(f"{json_file}.part", json_array_file=json_file)
+        self.assertIs(writer, AsyncJsonlWriter.get_writer(f"{json_file}.part"))
+        for i in range(150):
+            await writer.write_item({"note_id": str(i)})
+        await AsyncBufferedFileWriter.close_all()
+
+        with open(json_file, encoding="utf-8") as f:
+            save_data = json.load(f)
+        self.assertEqual(len(save_data), 150)
+        self.assertFalse(os.path.exists(f"{json_file}.part"))
+
+    async def test_periodic_flush_without_new_writes(self):
+        file_path = os.path.join(self.tmp_dir.name, "contents.jsonl")
+        writer = AsyncJsonlWriter.get_writer(file_path, flush_size=100, flush_interval=0.1)
+        await writer.write_item({"note_id": "1"})
+        # 没有后续写入，定时任务也会在 flush_interval 后落盘
+        await asyncio.sleep(0.3)
+        with open(file_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), '{"note_id": "1"}\n')
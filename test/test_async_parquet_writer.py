@@ -0,0 +1,70 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from tools import utils
+from tools.async_file_writer import AsyncBufferedFileWriter
+from tools.async_parquet_writer import AsyncParquetWriter, get_table_schema, parse_table_columns
+
+
+class TestAsyncParquetWriter(IsolatedAsyncioTestCase):
+
+    def test_parse_table_columns(self):
+        sql = """
+        -- 注释中的 CREATE TABLE `ignored` (`x` int) 不会被解析
+        CREATE TABLE demo
+        (
+            id      BIGINT AUTO_INCREMENT PRIMARY KEY,
+            `desc`  TEXT COMMENT '描述',
+            user_id VARCHAR(64) NOT NULL,
+            UNIQUE KEY `idx_demo_user_id` (`user_id`)
+        );
+        alter table demo add column `source_keyword` varchar(255) default '' comment '搜索来源关键字';
+        """
+        self.assertEqual(parse_table_columns(sql), {
+            "demo": [("id", "bigint"), ("desc", "text"), ("user_id", "varchar"), ("source_keyword", "varchar")]
+        })
+        schema = get_table_schema("xhs_note_comment")
+        self.assertNotIn("id", schema.names)
+        self.assertEqual(schema.field("create_time").type, pa.int64())
+        self.assertEqual(schema.field("parent_comment_id").type, pa.string())
+
+    async def test_write_row_groups(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "parquet", "comments.parquet")
+            writer = AsyncParquetWriter.get_writer(file_path, table_name="xhs_note_comment", row_group_size=100)
+            for i in range(250):
+                await writer.write_item({"comment_id": str(i), "create_time": str(i), "content": "内容", "extra": 1})
+            await AsyncBufferedFileWriter.close_all()
+
+            parquet_file = pq.ParquetFile(file_path)
+            self.assertEqual(parquet_file.metadata.num_rows, 250)
+            self.assertEqual(parquet_file.metadata.num_row_groups, 3)
+            table = pq.read_table(file_path, columns=["comment_id", "create_time"])
+            self.assertEqual(table.column("create_time").to_pylist()[-1], 249)
+
+    async def test_unparseable_int_logs_column(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "comments.parquet")
+            writer = AsyncParquetWriter.get_writer(file_path, table_name="xhs_note_comment")
+            await writer.write_item({"comment_id": "1", "create_time": "昨天"})
+            with self.assertLogs(utils.logger, level="WARNING") as logs:
+                await AsyncBufferedFileWriter.close_all()
+            self.assertIn("xhs_note_comment.create_time", logs.output[0])
+            self.assertEqual(pq.read_table(file_path).column("create_time").to_pylist(), [None])
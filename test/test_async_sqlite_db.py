@@ -0,0 +1,61 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+
+from async_sqlite_db import AsyncSqliteDB
+
+
+class TestAsyncSqliteDB(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = AsyncSqliteDB(os.path.join(self.tmp_dir.name, "test.db"))
+        await self.db.executescript(
+            "CREATE TABLE comment ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, comment_id TEXT NOT NULL, content TEXT, "
+            "add_ts INTEGER NOT NULL, last_modify_ts INTEGER NOT NULL);"
+            "CREATE UNIQUE INDEX uk_comment_comment_id ON comment(comment_id);"
+        )
+
+    async def test_wal_mode(self):
+        row = await self.db.get_first("PRAGMA journal_mode")
+        self.assertEqual(row["journal_mode"], "wal")
+
+    async def test_items_to_table(self):
+        items = [{"comment_id": str(i), "content": f"c{i}", "add_ts": 1, "last_modify_ts": 1} for i in range(1200)]
+        # 字段集合不同的记录也可以一起写入
+        items.append({"comment_id": "extra", "add_ts": 1, "last_modify_ts": 1})
+        effect_rows = await self.db.items_to_table("comment", items)
+        self.assertEqual(effect_rows, 1201)
+        row = await self.db.get_first("select count(*) as total from comment")
+        self.assertEqual(row["total"], 1201)
+
+    async def test_upsert_many_keeps_add_ts(self):
+        await self.db.upsert_many("comment", [
+            {"comment_id": "1", "content": "old", "add_ts": 1, "last_modify_ts": 1},
+        ], key="comment_id")
+        await self.db.upsert_many("comment", [
+            {"comment_id": "1", "content": "new", "add_ts": 2, "last_modify_ts": 2},
+            {"comment_id": "2", "content": "new", "add_ts": 2, "last_modify_ts": 2},
+        ], key="comment_id")
+        rows = await self.db.query("select comment_id, content, add_ts, last_modify_ts from comment order by comment_id")
+        self.assertEqual(rows, [
+            {"comment_id": "1", "content": "new", "add_ts": 1, "last_modify_ts": 2},
+            {"comment_id": "2", "content": "new", "add_ts": 2, "last_modify_ts": 2},
+        ])
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.tmp_dir.cleanup()
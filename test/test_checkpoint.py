@@ -0,0 +1,83 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from tools.checkpoint import CrawlCheckpoint
+
+
+class TestCrawlCheckpoint(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "xhs_search.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def test_page_frontier_waits_for_unfinished_items(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        self.assertEqual(checkpoint.start_pages("search:python", default_page=1).page, 1)
+        checkpoint.feed_page("search:python", 1, ["a", "b"], search_id="sid")
+        checkpoint.feed_page("search:python", 2, ["c"], search_id="sid")
+        checkpoint.finish_item("search:python", "c")
+        # 第 1 页还有未完成的帖子，恢复时从第 1 页开始
+        self.assertEqual(checkpoint.get("search:python"), {"search_id": "sid", "page": 1})
+        checkpoint.finish_item("search:python", "a")
+        checkpoint.finish_item("search:python", "b")
+        self.assertEqual(checkpoint.get("search:python")["page"], 3)
+        checkpoint.finish_pages("search:python")
+        self.assertTrue(checkpoint.is_done("search:python"))
+
+    async def test_failed_item_releases_page_without_done(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        checkpoint.start_pages("search:python", default_page=1)
+        checkpoint.feed_page("search:python", 1, ["a"], search_id="sid")
+        # 详情为空或者抓取失败的帖子也要释放，否则页码永远停在第 1 页
+        checkpoint.finish_item("search:python", "a")
+        self.assertEqual(checkpoint.get("search:python")["page"], 2)
+        self.assertFalse(checkpoint.is_done("note:a"))
+
+    async def test_resume_from_saved_checkpoint(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        checkpoint.start_pages("search:python", default_page=1)
+        checkpoint.feed_page("search:python", 3, ["a"], search_id="sid")
+        checkpoint.set("comments:a", {"cursor": "c2", "count": 20})
+        checkpoint.mark_done("note:b")
+        checkpoint.save()
+
+        resumed = CrawlCheckpoint(self.path, resume=True)
+        self.assertEqual(resumed.start_pages("search:python", default_page=1).page, 3)
+        self.assertEqual(resumed.get("comments:a"), {"cursor": "c2", "count": 20})
+        self.assertTrue(resumed.is_done("note:b"))
+        self.assertFalse(CrawlCheckpoint(self.path).is_done("note:b"))
+
+    async def test_periodic_save_runs_in_background(self):
+        origin = config.CHECKPOINT_SAVE_INTERVAL
+        config.CHECKPOINT_SAVE_INTERVAL = 0
+        try:
+            checkpoint = CrawlCheckpoint(self.path)
+            checkpoint.mark_done("note:a")
+            await checkpoint._saving
+        finally:
+            config.CHECKPOINT_SAVE_INTERVAL = origin
+        self.assertTrue(CrawlCheckpoint(self.path, resume=True).is_done("note:a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
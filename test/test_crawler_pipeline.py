@@ -0,0 +1,78 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from tools.crawler_pipeline import CrawlerPipeline, run_keywords
+from var import source_keyword_var
+
+
+class TestCrawlerPipeline(IsolatedAsyncioTestCase):
+
+    async def test_stages_overlap_and_keep_context(self):
+        events = []
+
+        async def search_pages():
+            for keyword in ["python", "golang"]:
+                source_keyword_var.set(keyword)
+                for page in range(2):
+                    events.append(("page", keyword, page))
+                    yield keyword, page
+
+        async def detail(item):
+            self.assertEqual(source_keyword_var.get(), item[0])
+            if item == ("golang", 1):
+                raise ValueError("detail error")
+            return [item]
+
+        async def comment(item):
+            await asyncio.sleep(0.05)
+            events.append(("comment",) + item)
+
+        pipeline = CrawlerPipeline("test")
+        pipeline.add_stage("detail", detail, workers=2).add_stage("comment", comment, workers=1)
+        await pipeline.run(search_pages())
+
+        self.assertEqual([stage.processed for stage in pipeline.stages], [3, 3])
+        comments = [event for event in events if event[0] == "comment"]
+        self.assertEqual(comments, [("comment", "python", 0), ("comment", "python", 1), ("comment", "golang", 0)])
+        # 所有搜索页在第一条评论抓完之前就已经翻完
+        self.assertEqual(events.index(("page", "golang", 1)), 3)
+
+    async def test_run_keywords_concurrently(self):
+        running = []
+        peak = []
+
+        async def search(keyword):
+            self.assertEqual(source_keyword_var.get(), keyword)
+            running.append(keyword)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            self.assertEqual(source_keyword_var.get(), keyword)
+            running.remove(keyword)
+
+        origin = config.KEYWORD_CONCURRENCY
+        config.KEYWORD_CONCURRENCY = 2
+        try:
+            await run_keywords(search, ["a", "b", "c"])
+        finally:
+            config.KEYWORD_CONCURRENCY = origin
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(len(peak), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
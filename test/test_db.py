@@ -0,0 +1,51 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+
+import db
+from async_sqlite_db import AsyncSqliteDB
+
+
+class TestMigrateUniqueIndexes(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = AsyncSqliteDB(os.path.join(self.tmp_dir.name, "test.db"))
+        # 老版本的建表脚本：note_id 上只有普通索引，user_id 上没有索引
+        await self.db.executescript(
+            "CREATE TABLE xhs_note (id INTEGER PRIMARY KEY AUTOINCREMENT, note_id TEXT NOT NULL);"
+            "CREATE INDEX idx_xhs_note_note_id_209457 ON xhs_note(note_id);"
+            "CREATE TABLE xhs_creator (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL);"
+        )
+
+    async def test_migrate_old_indexes(self):
+        await db.migrate_unique_indexes(self.db, "sqlite")
+        # 重复执行不会报错
+        await db.migrate_unique_indexes(self.db, "sqlite")
+        self.assertTrue(await db._index_is_unique(self.db, "sqlite", "xhs_note", "idx_xhs_note_note_id_209457"))
+        self.assertTrue(await db._index_is_unique(self.db, "sqlite", "xhs_creator", "idx_xhs_creator_user_id"))
+        await self.db.upsert_many("xhs_note", [{"note_id": "a"}], key="note_id")
+        await self.db.upsert_many("xhs_note", [{"note_id": "a"}], key="note_id")
+        row = await self.db.get_first("select count(*) as total from xhs_note")
+        self.assertEqual(row["total"], 1)
+
+    async def test_migrate_fails_on_duplicate_rows(self):
+        await self.db.execute("INSERT INTO xhs_note (note_id) VALUES ('a'), ('a')")
+        with self.assertRaises(RuntimeError):
+            await db.migrate_unique_indexes(self.db, "sqlite")
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.tmp_dir.cleanup()
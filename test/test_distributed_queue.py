@@ -0,0 +1,201 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import unittest
+from collections import defaultdict, deque
+from unittest import IsolatedAsyncioTestCase
+
+from tools.distributed_queue import DistributedWorker, RedisWorkQueue, new_task
+from var import source_keyword_var
+
+
+class LocalRedis:
+    """
+    本地内存实现的 redis 替身，只实现任务队列用到的命令
+    """
+
+    def __init__(self):
+        self.sets = defaultdict(set)
+        self.hashes = defaultdict(dict)
+        self.lists = defaultdict(deque)
+        self.zsets = defaultdict(dict)
+
+    async def sadd(self, key, member):
+        if member in self.sets[key]:
+            return 0
+        self.sets[key].add(member)
+        return 1
+
+    async def srem(self, key, member):
+        if member not in self.sets[key]:
+            return 0
+        self.sets[key].remove(member)
+        return 1
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        # 只模拟 RedisWorkQueue.CLAIM_SCRIPT：取出任务 id 并写入租约
+        pending, processing, leases, expire_at, lease_id = keys_and_args
+        task_id = await self.rpoplpush(pending, processing)
+        if task_id is not None:
+            self.zsets[leases][f"{task_id}|{lease_id}"] = expire_at
+        return task_id
+
+    async def hset(self, key, field, value):
+        self.hashes[key][field] = value
+
+    async def hget(self, key, field):
+        return self.hashes[key].get(field)
+
+    async def hdel(self, key, field):
+        return int(self.hashes[key].pop(field, None) is not None)
+
+    async def hgetall(self, key):
+        return dict(self.hashes[key])
+
+    async def hincrby(self, key, field, amount):
+        self.hashes[key][field] = int(self.hashes[key].get(field, 0)) + amount
+
+    async def lpush(self, key, value):
+        self.lists[key].appendleft(value)
+
+    async def rpoplpush(self, src, dst):
+        if not self.lists[src]:
+            return None
+        value = self.lists[src].pop()
+        self.lists[dst].appendleft(value)
+        return value
+
+    async def lrem(self, key, count, value):
+        removed = list(self.lists[key]).count(value)
+        self.lists[key] = deque(item for item in self.lists[key] if item != value)
+        return removed
+
+    async def llen(self, key):
+        return len(self.lists[key])
+
+    async def zadd(self, key, mapping, xx=False):
+        for member, score in mapping.items():
+            if not xx or member in self.zsets[key]:
+                self.zsets[key][member] = score
+
+    async def zrem(self, key, member):
+        return int(self.zsets[key].pop(member, None) is not None)
+
+    async def zscore(self, key, member):
+        return self.zsets[key].get(member)
+
+    async def zrangebyscore(self, key, min_score, max_score):
+        return [member for member, score in self.zsets[key].items() if min_score <= score <= max_score]
+
+
+class TestRedisWorkQueue(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.queue = RedisWorkQueue(LocalRedis(), "test:xhs", lease_seconds=60, max_attempts=2)
+
+    async def test_enqueue_claim_and_ack(self):
+        added = await self.queue.enqueue([
+            new_task("note_detail", "1", {"note_id": "1"}),
+            new_task("note_detail", "2", {"note_id": "2"}),
+            new_task("note_detail", "1", {"note_id": "1"}),
+        ])
+        self.assertEqual(added, 2)
+
+        task = await self.queue.claim()
+        self.assertEqual(task.payload, {"note_id": "1"})
+        self.assertFalse(await self.queue.is_drained())
+        await self.queue.ack(task)
+        self.assertEqual((await self.queue.claim()).task_id, "note_detail:2")
+        self.assertIsNone(await self.queue.claim())
+
+    async def test_failed_task_retried_then_dead(self):
+        await self.queue.enqueue([new_task("comments", "1", {})])
+        task = await self.queue.claim()
+        await self.queue.fail(task, "timeout")
+        task = await self.queue.claim()
+        self.assertEqual((task.attempts, task.last_error), (1, "timeout"))
+        await self.queue.fail(task, "timeout")
+        self.assertIsNone(await self.queue.claim())
+        self.assertTrue(await self.queue.is_drained())
+        stats = await self.queue.stats()
+        self.assertEqual((stats["dead"], stats["retried"], stats["failed"]), (1, 1, 1))
+
+    async def test_expired_lease_requeued(self):
+        await self.queue.enqueue([new_task("creator", "1", {})])
+        task = await self.queue.claim()
+        self.queue.lease_seconds = 0
+        self.assertTrue(await self.queue.extend_lease(task))
+        # 租约到期后被重新领取，原 worker 迟到的失败上报不会重复入队
+        again = await self.queue.claim()
+        self.assertEqual((again.task_id, again.attempts), (task.task_id, 1))
+        self.queue.lease_seconds = 60
+        await self.queue.extend_lease(again)
+        await self.queue.fail(task, "late")
+        self.assertEqual((await self.queue.stats())["pending"], 0)
+        # 迟到的确认也不会删除重新领取的 worker 正在处理的任务
+        await self.queue.ack(task)
+        self.assertEqual((await self.queue.stats())["processing"], 1)
+        self.assertIsNotNone(await self.queue._load(again.task_id))
+        await self.queue.ack(again)
+        self.assertTrue(await self.queue.is_drained())
+
+    async def test_enqueue_again_after_ack(self):
+        await self.queue.enqueue([new_task("note_detail", "1", {})])
+        await self.queue.ack(await self.queue.claim())
+        # 下一次运行协调进程时，已经完成的任务可以重新入队
+        self.assertEqual(await self.queue.enqueue([new_task("note_detail", "1", {})]), 1)
+        self.assertEqual((await self.queue.claim()).task_id, "note_detail:1")
+
+
+class TestDistributedWorker(IsolatedAsyncioTestCase):
+
+    async def test_workers_share_queue_and_follow_derived_tasks(self):
+        queue = RedisWorkQueue(LocalRedis(), "test:xhs", lease_seconds=60, max_attempts=3)
+        await queue.enqueue(
+            new_task("search_page", f"python:{page}", {"page": page}, source_keyword="python")
+            for page in range(3)
+        )
+        handled = []
+        failed_once = set()
+
+        async def handler(task):
+            await asyncio.sleep(0.01)
+            self.assertEqual(source_keyword_var.get(), "python")
+            if task.kind == "search_page":
+                await queue.enqueue(
+                    new_task("note_detail", str(note_id), {}, source_keyword=task.source_keyword)
+                    for note_id in range(task.payload["page"], task.payload["page"] + 2)
+                )
+            elif task.task_id not in failed_once:
+                failed_once.add(task.task_id)
+                raise ValueError("blocked")
+            handled.append(task.task_id)
+
+        workers = [
+            DistributedWorker(queue, handler, concurrency=2, poll_interval=0.01, idle_exit=0.05)
+            for _ in range(2)
+        ]
+        await asyncio.wait_for(asyncio.gather(*(worker.run() for worker in workers)), timeout=5)
+
+        self.assertEqual(sorted(handled), sorted(
+            [f"search_page:python:{page}" for page in range(3)] + [f"note_detail:{i}" for i in range(4)]
+        ))
+        self.assertEqual(sum(worker.failed for worker in workers), 4)
+        stats = await queue.stats()
+        self.assertEqual((stats["done"], stats["retried"], stats["pending"], stats["processing"]), (7, 4, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+import config
+
+from tools.js_sign_pool import JsSignError, JsSignPool, get_node_path
+
+SIGN_SCRIPT = """
+const crypto = require('crypto');
+function add(a, b) { return a + b }
+function md5(s) { return crypto.createHash('md5').update(s).digest('hex') }
+function fail() { throw new Error('sign failed') }
+function spin() { while (true) {} }
+"""
+
+
+@unittest.skipUnless(get_node_path(), "node is not installed")
+class TestJsSignPool(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script_path = os.path.join(self.temp_dir.name, "sign.js")
+        with open(self.script_path, "w", encoding="utf-8") as f:
+            f.write(SIGN_SCRIPT)
+        self.pool = JsSignPool(self.script_path, size=2)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        self.temp_dir.cleanup()
+
+    async def test_call(self):
+        results = await asyncio.gather(*[self.pool.call("add", i, 1) for i in range(20)])
+        self.assertEqual(results, [i + 1 for i in range(20)])
+        self.assertEqual(await self.pool.call("md5", "abc"), "900150983cd24fb0d6963f7d28e17f72")
+
+    async def test_error_keeps_worker(self):
+        with self.assertRaises(JsSignError):
+            await self.pool.call("fail")
+        with self.assertRaises(JsSignError):
+            await self.pool.call("process.exit")
+        self.assertEqual(await self.pool.call("add", 1, 2), 3)
+
+    async def test_timeout_restarts_worker(self):
+        timeout, config.JS_SIGN_TIMEOUT = config.JS_SIGN_TIMEOUT, 1
+        try:
+            self.pool.size = 1
+            with self.assertRaises(JsSignError):
+                await self.pool.call("spin")
+            self.assertEqual(await self.pool.call("add", 2, 2), 4)
+        finally:
+            config.JS_SIGN_TIMEOUT = timeout
+
+    async def test_cancel_restarts_worker(self):
+        self.pool.size = 1
+        task = asyncio.create_task(self.pool.call("spin"))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertFalse(self.pool._workers[0].alive)
+        self.assertEqual(await self.pool.call("add", 3, 3), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+
+import config
+from tools.rate_limiter import RateLimiter, TokenBucket, rate_limit_hook
+
+RATE_LIMITS = {
+    "api.example.com": {"rate": 20, "burst": 2},
+    "api.example.com/x/reply": {"rate": 5, "burst": 1},
+}
+
+
+class TestRateLimiter(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        RateLimiter._buckets.clear()
+
+    def test_token_bucket_reserve(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+    @patch.object(config, "RATE_LIMIT_DEFAULT", None)
+    @patch.object(config, "RATE_LIMITS", RATE_LIMITS)
+    def test_match_longest_key(self):
+        self.assertEqual(RateLimiter.match("api.example.com", "/x/reply/main")[0], "api.example.com/x/reply")
+        self.assertEqual(RateLimiter.match("api.example.com", "/x/replyx")[0], "api.example.com")
+        self.assertIsNone(RateLimiter.match("cdn.example.com", "/a.jpg"))
+
+    @patch.object(config, "RATE_LIMIT_DEFAULT", None)
+    @patch.object(config, "RATE_LIMITS", RATE_LIMITS)
+    async def test_hook_limits_requests_per_host(self):
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200)),
+            event_hooks={"request": [rate_limit_hook]},
+        )
+        async with client:
+            start = time.monotonic()
+            await asyncio.gather(*[client.get("https://api.example.com/x/search") for _ in range(6)])
+            # burst 2 个立即发出，剩下 4 个按每秒 20 个补充
+            self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+            start = time.monotonic()
+            await asyncio.gather(*[client.get("https://cdn.example.com/a.jpg") for _ in range(6)])
+            self.assertLess(time.monotonic() - start, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
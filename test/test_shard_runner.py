@@ -0,0 +1,87 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase, mock
+
+import config
+from store.xhs.xhs_store_impl import XhsCsvStoreImplement
+from tools.shard_runner import ShardRunner, apply_shard, build_shard_argv
+
+
+class TestShardRunner(IsolatedAsyncioTestCase):
+
+    async def test_apply_shard_partitions_config(self):
+        keywords, creators = [f"keyword{i}" for i in range(20)], [f"user{i}" for i in range(20)]
+        shard_keywords, shard_creators = [], []
+        origin = config.KEYWORDS, config.XHS_CREATOR_ID_LIST, config.USER_DATA_DIR, config.CDP_DEBUG_PORT
+        try:
+            for shard_index in range(3):
+                config.KEYWORDS, config.XHS_CREATOR_ID_LIST = ",".join(keywords), creators
+                config.USER_DATA_DIR, config.CDP_DEBUG_PORT = origin[2], origin[3]
+                apply_shard(shard_index, 3)
+                shard_keywords.append(config.KEYWORDS.split(",") if config.KEYWORDS else [])
+                shard_creators.append(config.XHS_CREATOR_ID_LIST)
+                self.assertEqual(config.USER_DATA_DIR % "xhs", f"xhs_user_data_dir_shard{shard_index}")
+        finally:
+            config.KEYWORDS, config.XHS_CREATOR_ID_LIST, config.USER_DATA_DIR, config.CDP_DEBUG_PORT = origin
+        self.assertEqual(sorted(sum(shard_keywords, [])), sorted(keywords))
+        self.assertEqual(sorted(sum(shard_creators, [])), sorted(creators))
+        self.assertTrue(all(shard_keywords))
+
+    def test_build_shard_argv(self):
+        argv = ["--platform", "xhs", "--workers", "4", "--shard_index=3", "--type", "search"]
+        self.assertEqual(
+            build_shard_argv(argv, 1, 4),
+            ["--platform", "xhs", "--type", "search", "--workers", "1", "--shard_index", "1", "--shard_count", "4"],
+        )
+
+    async def test_run_reports_failed_shards(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            script = os.path.join(tmp_dir, "shard.py")
+            with open(script, "w") as f:
+                f.write("import sys\nprint(sys.argv[-3])\nsys.exit(int(sys.argv[-3]) % 2)\n")
+            with mock.patch.object(sys, "argv", [script]):
+                runner = ShardRunner(3, argv=[])
+                failed = await asyncio.wait_for(runner.run(), timeout=30)
+        self.assertEqual([shard.shard_index for shard in failed], [1])
+        self.assertEqual([shard.last_line for shard in runner.shards], ["0", "1", "2"])
+
+    async def test_shards_write_separate_data_files(self):
+        origin = config.SHARD_INDEX, config.SHARD_COUNT
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = XhsCsvStoreImplement()
+            store.csv_store_path = tmp_dir
+            try:
+                config.SHARD_COUNT = 2
+                for shard_index in range(2):
+                    config.SHARD_INDEX = shard_index
+                    await store.store_content({"note_id": str(shard_index)})
+                await store.close()
+            finally:
+                config.SHARD_INDEX, config.SHARD_COUNT = origin
+            file_names = sorted(os.listdir(tmp_dir))
+            self.assertEqual(len(file_names), 2)
+            self.assertTrue(file_names[0].endswith("_shard0.csv") and file_names[1].endswith("_shard1.csv"))
+            for shard_index, file_name in enumerate(file_names):
+                with open(os.path.join(tmp_dir, file_name), encoding="utf-8-sig") as f:
+                    self.assertEqual(f.read().split(), ["note_id", str(shard_index)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+from typing import Dict, List
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from base.base_crawler import AbstractStore
+from store.write_behind import WriteBehindStore
+
+
+class MemoryStore(AbstractStore):
+
+    def __init__(self):
+        self.batches: List[tuple] = []
+        self.closed = False
+
+    async def store_content(self, content_item: Dict):
+        self.batches.append(("content", [content_item]))
+
+    async def store_comment(self, comment_item: Dict):
+        if comment_item.get("bad"):
+            raise ValueError("bad comment")
+        self.batches.append(("comment", [comment_item]))
+
+    async def store_creator(self, creator: Dict):
+        self.batches.append(("creator", [creator]))
+
+    async def store_batch(self, store_type: str, items: List[Dict]):
+        if len(items) > 1:
+            if any(item.get("bad") for item in items):
+                raise ValueError("bad batch")
+            self.batches.append((store_type, items))
+            return
+        await super().store_batch(store_type, items)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestWriteBehindStore(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.table_settings = config.WRITE_BEHIND_TABLE_SETTINGS
+        config.WRITE_BEHIND_TABLE_SETTINGS = {"comment": {"batch_size": 100, "max_latency": 10}}
+
+    def tearDown(self):
+        config.WRITE_BEHIND_TABLE_SETTINGS = self.table_settings
+
+    async def test_batch_by_store_type_and_drain_on_close(self):
+        store = MemoryStore()
+        write_behind_store = WriteBehindStore(store)
+        for i in range(250):
+            await write_behind_store.store_comment({"comment_id": i})
+        await write_behind_store.store_content({"note_id": 1})
+        await write_behind_store.close()
+
+        comment_batches = [items for store_type, items in store.batches if store_type == "comment"]
+        self.assertEqual([len(items) for items in comment_batches], [100, 100, 50])
+        self.assertIn(("content", [{"note_id": 1}]), store.batches)
+        self.assertTrue(store.closed)
+
+    async def test_bad_item_does_not_drop_batch(self):
+        store = MemoryStore()
+        write_behind_store = WriteBehindStore(store)
+        await write_behind_store.store_comment({"comment_id": 1})
+        await write_behind_store.store_comment({"comment_id": 2, "bad": True})
+        await write_behind_store.store_comment({"comment_id": 3})
+        await write_behind_store.close()
+        self.assertEqual([items[0]["comment_id"] for _, items in store.batches], [1, 3])
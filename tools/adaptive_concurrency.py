@@ -0,0 +1,198 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 全局自适应并发控制（AIMD）：请求持续成功时并发窗口逐步加一，出现封禁、验证码等信号时窗口按比例缩小
+import asyncio
+import collections
+import time
+from typing import Deque, Dict, Optional, Union
+
+import httpx
+
+import config
+from tools import utils
+from var import platform_var
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    可以替代 asyncio.Semaphore 使用（async with limiter），并发上限随成功 / 封禁信号动态调整
+    """
+    # 按平台区分，一个进程同时爬取多个平台时某个平台被封禁不会拖慢其他平台
+    _instances: Dict[str, "AdaptiveConcurrencyLimiter"] = {}
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 decrease_factor: float = 0.5, cooldown: float = 10):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.successes = 0
+        self.blocks = 0
+        self._success_streak = 0
+        self._last_decrease_at = 0.0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+    @classmethod
+    def get_instance(cls) -> "AdaptiveConcurrencyLimiter":
+        """
+        获取当前平台整个爬取过程共享的并发控制器
+        Returns:
+
+        """
+        platform = platform_var.get() or config.PLATFORM
+        if platform not in cls._instances:
+            cls._instances[platform] = cls(
+                initial=config.MAX_CONCURRENCY_NUM,
+                min_limit=config.ADAPTIVE_CONCURRENCY_MIN,
+                max_limit=config.ADAPTIVE_CONCURRENCY_MAX,
+                decrease_factor=config.ADAPTIVE_CONCURRENCY_DECREASE_FACTOR,
+                cooldown=config.ADAPTIVE_CONCURRENCY_COOLDOWN,
+            )
+        return cls._instances[platform]
+
+    @classmethod
+    def get_current(cls) -> Optional["AdaptiveConcurrencyLimiter"]:
+        """
+        获取当前平台已经创建的并发控制器，还没有创建时返回 None
+        Returns:
+
+        """
+        return cls._instances.get(platform_var.get() or config.PLATFORM)
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已经分配到并发名额后才被取消，需要归还
+                self.release()
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake_up()
+
+    def _wake_up(self):
+        # 名额直接交给等待者，避免被新来的请求插队
+        while self._waiters and self.in_flight < self.limit:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    def record_success(self):
+        """
+        请求成功，连续成功的次数达到当前窗口大小时窗口加一（加性增）
+        Returns:
+
+        """
+        self.successes += 1
+        self._success_streak += 1
+        if self._success_streak >= self.limit and self.limit < self.max_limit:
+            self._success_streak = 0
+            self._set_limit(self.limit + 1, "success")
+
+    def record_block(self, reason: str = ""):
+        """
+        出现封禁、验证码等信号，窗口按比例缩小（乘性减），冷却时间内的多次信号只缩小一次
+        Args:
+            reason: 信号来源，用于日志
+
+        Returns:
+
+        """
+        self.blocks += 1
+        self._success_streak = 0
+        now = time.monotonic()
+        if now - self._last_decrease_at < self.cooldown:
+            return
+        self._last_decrease_at = now
+        self._set_limit(max(self.min_limit, int(self.limit * self.decrease_factor)), f"block: {reason}")
+
+    def _set_limit(self, limit: int, reason: str):
+        if limit == self.limit:
+            return
+        utils.logger.info(
+            f"[AdaptiveConcurrencyLimiter] concurrency window {self.limit} -> {limit} ({reason}), "
+            f"in_flight: {self.in_flight}, waiting: {len(self._waiters)}"
+        )
+        self.limit = limit
+        self._wake_up()
+
+    def snapshot(self) -> Dict:
+        """
+        当前并发窗口等指标
+        Returns:
+
+        """
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "successes": self.successes,
+            "blocks": self.blocks,
+        }
+
+
+def get_concurrency_limiter(size: int = None) -> Union[AdaptiveConcurrencyLimiter, asyncio.Semaphore]:
+    """
+    获取爬取任务使用的并发控制，开启自适应并发时同一平台的所有任务共享同一个控制器，否则和原来一样每次新建信号量
+    Args:
+        size: 信号量大小，流水线的各个阶段按自己的工作任务数传入，默认为 MAX_CONCURRENCY_NUM
+
+    Returns:
+
+    """
+    if config.ENABLE_ADAPTIVE_CONCURRENCY:
+        return AdaptiveConcurrencyLimiter.get_instance()
+    return asyncio.Semaphore(size or config.MAX_CONCURRENCY_NUM)
+
+
+def record_success():
+    limiter = AdaptiveConcurrencyLimiter.get_current() if config.ENABLE_ADAPTIVE_CONCURRENCY else None
+    if limiter:
+        limiter.record_success()
+
+
+def record_block(reason: str = ""):
+    limiter = AdaptiveConcurrencyLimiter.get_current() if config.ENABLE_ADAPTIVE_CONCURRENCY else None
+    if limiter:
+        limiter.record_block(reason)
+
+
+async def adaptive_concurrency_hook(response: httpx.Response):
+    """
+    httpx 的 response 事件钩子，根据状态码上报成功或封禁信号
+    """
+    if response.status_code in config.ADAPTIVE_CONCURRENCY_BLOCK_STATUS:
+        record_block(f"{response.url.host} status {response.status_code}")
+    elif response.is_success:
+        record_success()
@@ -0,0 +1,227 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 文件类存储（csv / json / jsonl）的缓冲写入器，缓存打开的文件句柄并批量落盘
+import asyncio
+import csv
+import io
+import json
+import os
+import pathlib
+import time
+from typing import Any, Dict, List, Optional
+
+import aiofiles
+
+import config
+from tools import utils
+
+
+class AsyncBufferedFileWriter:
+    """
+    一个文件对应一个写入器，写入内容先放到内存缓冲区，缓冲条数或距离上次落盘的时间超过阈值时批量写入文件；
+    缓冲区不为空时有一个定时落盘任务，保证没有新写入时数据也最多延迟 flush_interval 秒落盘
+    """
+    # 按文件路径缓存的写入器，程序退出时通过 close_all 统一落盘并关闭
+    _writers: Dict[str, "AsyncBufferedFileWriter"] = {}
+
+    def __init__(self, file_path: str, encoding: str = "utf-8", newline: Optional[str] = None,
+                 flush_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.file_path = file_path
+        self.encoding = encoding
+        self.newline = newline
+        self.flush_size = flush_size or config.FILE_STORE_FLUSH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else config.FILE_STORE_FLUSH_INTERVAL
+        self._buffer: List[str] = []
+        self._file = None
+        self._lock = asyncio.Lock()
+        self._last_flush_time = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def get_writer(cls, file_path: str, **kwargs: Any) -> "AsyncBufferedFileWriter":
+        """
+        获取文件对应的写入器，不存在时创建
+        Args:
+            file_path: 文件路径
+            **kwargs: 创建写入器时的参数
+
+        Returns:
+
+        """
+        writer = cls._writers.get(file_path)
+        if writer is None:
+            writer = cls(file_path, **kwargs)
+            cls._writers[file_path] = writer
+        return writer
+
+    @classmethod
+    def _select_writers(cls, dir_path: Optional[str] = None) -> List["AsyncBufferedFileWriter"]:
+        return [
+            writer for writer in cls._writers.values()
+            if isinstance(writer, cls) and (dir_path is None or os.path.dirname(writer.file_path) == dir_path)
+        ]
+
+    @classmethod
+    async def flush_all(cls, dir_path: Optional[str] = None) -> None:
+        """
+        把写入器的缓冲区落盘
+        Args:
+            dir_path: 只处理该目录下的文件，为空时处理当前类型的所有写入器
+
+        Returns:
+
+        """
+        for writer in cls._select_writers(dir_path):
+            await writer.flush()
+
+    @classmethod
+    async def close_all(cls, dir_path: Optional[str] = None) -> None:
+        """
+        把写入器的缓冲区落盘并关闭文件
+        Args:
+            dir_path: 只处理该目录下的文件，为空时处理当前类型的所有写入器
+
+        Returns:
+
+        """
+        for writer in cls._select_writers(dir_path):
+            cls._writers.pop(writer.file_path, None)
+            try:
+                await writer.close()
+            except Exception as e:
+                utils.logger.error(f"[AsyncBufferedFileWriter.close_all] close {writer.file_path} error: {e}")
+
+    async def _open(self) -> None:
+        pathlib.Path(self.file_path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = await aiofiles.open(self.file_path, mode="a", encoding=self.encoding, newline=self.newline)
+
+    async def write(self, text: str) -> None:
+        """
+        写入一段文本，满足落盘条件时批量写入文件
+        Args:
+            text:
+
+        Returns:
+
+        """
+        self._buffer.append(text)
+        if len(self._buffer) >= self.flush_size or time.monotonic() - self._last_flush_time >= self.flush_interval:
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(max(0.0, self._last_flush_time + self.flush_interval - time.monotonic()))
+        # 开始落盘后不再允许 close 取消该任务，避免取出的缓冲内容还没写入文件就被丢弃
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            utils.logger.error(f"[AsyncBufferedFileWriter._flush_later] flush {self.file_path} error: {e}")
+
+    async def flush(self) -> None:
+        """
+        把缓冲区的内容写入文件
+        Returns:
+
+        """
+        async with self._lock:
+            self._last_flush_time = time.monotonic()
+            if not self._buffer:
+                return
+            texts, self._buffer = self._buffer, []
+            if self._file is None:
+                await self._open()
+            await self._file.write("".join(texts))
+            await self._file.flush()
+
+    async def close(self) -> None:
+        """
+        落盘并关闭文件
+        Returns:
+
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        async with self._lock:
+            if self._file is not None:
+                await self._file.close()
+                self._file = None
+
+
+class AsyncJsonlWriter(AsyncBufferedFileWriter):
+    """
+    JSON Lines 写入器，每条记录追加一行；指定 json_array_file 时，关闭时把所有行合并成一个 JSON 数组文件
+    """
+
+    def __init__(self, file_path: str, json_array_file: Optional[str] = None, **kwargs: Any):
+        super().__init__(file_path, **kwargs)
+        self.json_array_file = json_array_file
+
+    async def write_item(self, item: Dict) -> None:
+        await self.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    async def close(self) -> None:
+        await super().close()
+        if self.json_array_file:
+            await self.export_json_array()
+
+    async def export_json_array(self) -> None:
+        """
+        把中间文件中的记录追加到 JSON 数组文件中（同一天多次运行会合并到同一个文件），完成后删除中间文件
+        Returns:
+
+        """
+        if not os.path.exists(self.file_path):
+            return
+        save_data = []
+        if os.path.exists(self.json_array_file):
+            async with aiofiles.open(self.json_array_file, "r", encoding=self.encoding) as file:
+                save_data = json.loads(await file.read() or "[]")
+        async with aiofiles.open(self.file_path, "r", encoding=self.encoding) as file:
+            async for line in file:
+                if line.strip():
+                    save_data.append(json.loads(line))
+        async with aiofiles.open(self.json_array_file, "w", encoding=self.encoding) as file:
+            await file.write(json.dumps(save_data, ensure_ascii=False, indent=4))
+        os.remove(self.file_path)
+        utils.logger.info(f"[AsyncJsonlWriter.export_json_array] export {len(save_data)} items to {self.json_array_file}")
+
+
+class AsyncCsvWriter(AsyncBufferedFileWriter):
+    """
+    CSV 写入器，表头只在文件为空时写入一次
+    """
+
+    def __init__(self, file_path: str, encoding: str = "utf-8-sig", newline: Optional[str] = "", **kwargs: Any):
+        super().__init__(file_path, encoding=encoding, newline=newline, **kwargs)
+        self._header_written = os.path.exists(file_path) and os.path.getsize(file_path) > 0
+
+    async def write_row(self, item: Dict) -> None:
+        """
+        写入一行数据，第一次写入空文件时先写表头
+        Args:
+            item:
+
+        Returns:
+
+        """
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if not self._header_written:
+            writer.writerow(item.keys())
+            self._header_written = True
+        writer.writerow(item.values())
+        await self.write(buf.getvalue())
@@ -0,0 +1,189 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : parquet 列式存储写入器，表结构取自 schema/tables.sql，按表缓冲记录后批量写入 row group
+import asyncio
+import json
+import os
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import config
+from tools import utils
+from tools.async_file_writer import AsyncBufferedFileWriter
+
+if TYPE_CHECKING:
+    # pyarrow 只在 parquet 存储中用到，在函数里按需导入，其他存储方式不需要安装 pyarrow
+    import pyarrow as pa
+
+TABLES_SQL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "schema", "tables.sql")
+
+# MySQL 整数类型映射为 int64，其余（varchar/text/longtext 等）都按字符串存储，和入库时保持一致
+INT_COLUMN_TYPES = ("int", "bigint", "tinyint", "smallint", "mediumint")
+
+# 自增主键只在数据库中有意义，不写入 parquet
+IGNORE_COLUMNS = ("id",)
+
+# 建表语句中以这些关键字开头的行是索引/约束定义，不是字段
+INDEX_KEYWORDS = ("PRIMARY", "UNIQUE", "KEY", "INDEX", "CONSTRAINT", "FULLTEXT")
+
+_table_schemas: Optional[Dict[str, "pa.Schema"]] = None
+
+
+def parse_table_columns(sql: str) -> Dict[str, List[tuple]]:
+    """
+    解析建表语句和 ALTER TABLE ADD COLUMN 语句，得到每张表的字段及类型
+    Args:
+        sql: schema/tables.sql 的内容
+
+    Returns: {table_name: [(column_name, column_type), ...]}
+
+    """
+    sql = re.sub(r"--[^\n]*", "", sql)
+    tables: Dict[str, List[tuple]] = {}
+    for statement in sql.split(";"):
+        create_match = re.search(r"CREATE\s+TABLE\s+`?(\w+)`?\s*\((.*)\)", statement, re.I | re.S)
+        if create_match:
+            columns = tables.setdefault(create_match.group(1), [])
+            for line in create_match.group(2).splitlines():
+                column_match = re.match(r"\s*(`?)(\w+)\1\s+(\w+)", line)
+                if not column_match:
+                    continue
+                quoted, column_name, column_type = column_match.groups()
+                if not quoted and column_name.upper() in INDEX_KEYWORDS:
+                    continue
+                columns.append((column_name, column_type.lower()))
+            continue
+        for table_name, column_name, column_type in re.findall(
+                r"ALTER\s+TABLE\s+`?(\w+)`?\s+ADD\s+COLUMN\s+`?(\w+)`?\s+(\w+)", statement, re.I):
+            tables.setdefault(table_name, []).append((column_name, column_type.lower()))
+    return tables
+
+
+def get_table_schema(table_name: str) -> "pa.Schema":
+    """
+    获取表对应的 parquet schema
+    Args:
+        table_name: schema/tables.sql 中的表名
+
+    Returns:
+
+    """
+    import pyarrow as pa
+
+    global _table_schemas
+    if _table_schemas is None:
+        with open(TABLES_SQL_PATH, encoding="utf-8") as f:
+            tables = parse_table_columns(f.read())
+        _table_schemas = {}
+        for name, columns in tables.items():
+            fields = {}
+            for column_name, column_type in columns:
+                if column_name in IGNORE_COLUMNS:
+                    continue
+                fields[column_name] = pa.int64() if column_type in INT_COLUMN_TYPES else pa.string()
+            _table_schemas[name] = pa.schema(list(fields.items()))
+    if table_name not in _table_schemas:
+        raise ValueError(f"[get_table_schema] table {table_name} not found in {TABLES_SQL_PATH}")
+    return _table_schemas[table_name]
+
+
+def _to_int(value: Any, column: str) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        utils.logger.warning(f"[AsyncParquetWriter] column {column} expects an integer, got {value!r}, stored as null")
+        return None
+
+
+def _to_str(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+class AsyncParquetWriter(AsyncBufferedFileWriter):
+    """
+    一个 parquet 文件对应一张表，记录缓冲到 PARQUET_ROW_GROUP_SIZE 条后写入一个 row group，关闭时写入剩余记录和文件尾
+    """
+
+    def __init__(self, file_path: str, table_name: str, row_group_size: Optional[int] = None,
+                 compression: Optional[str] = None, **kwargs: Any):
+        super().__init__(file_path, **kwargs)
+        self.table_name = table_name
+        self.schema = get_table_schema(table_name)
+        self.row_group_size = row_group_size or config.PARQUET_ROW_GROUP_SIZE
+        self.compression = compression or config.PARQUET_COMPRESSION
+        self._rows: List[Dict] = []
+
+    async def write_item(self, item: Dict) -> None:
+        """
+        写入一条记录，不在表结构中的字段会被忽略
+        Args:
+            item:
+
+        Returns:
+
+        """
+        self._rows.append(item)
+        if len(self._rows) >= self.row_group_size:
+            await self.flush()
+
+    def _to_table(self, rows: List[Dict]) -> "pa.Table":
+        import pyarrow as pa
+
+        arrays = []
+        for field in self.schema:
+            if pa.types.is_integer(field.type):
+                values = [_to_int(row.get(field.name), f"{self.table_name}.{field.name}") for row in rows]
+            else:
+                values = [_to_str(row.get(field.name)) for row in rows]
+            arrays.append(pa.array(values, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _write_table(self, table: "pa.Table") -> None:
+        import pyarrow.parquet as pq
+
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+            self._file = pq.ParquetWriter(self.file_path, self.schema, compression=self.compression)
+        self._file.write_table(table, row_group_size=len(table))
+
+    async def flush(self) -> None:
+        """
+        把缓冲的记录作为一个 row group 写入文件
+        Returns:
+
+        """
+        async with self._lock:
+            if not self._rows:
+                return
+            rows, self._rows = self._rows, []
+            table = self._to_table(rows)
+            await asyncio.to_thread(self._write_table, table)
+
+    async def close(self) -> None:
+        """
+        写入剩余记录并关闭文件（parquet 的文件尾在关闭时写入）
+        Returns:
+
+        """
+        await self.flush()
+        async with self._lock:
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+                self._file = None
@@ -13,18 +13,21 @@ import os
 import asyncio
 import socket
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set
 from playwright.async_api import Browser, BrowserContext, Playwright
 
 import config
 from tools.browser_launcher import BrowserLauncher
 from tools import utils
+from var import platform_var
 
 
 class CDPBrowserManager:
     """
     CDP浏览器管理器，负责启动和管理通过CDP连接的浏览器
     """
+    # 同一进程中多个平台同时启动浏览器时，端口在浏览器真正监听前就要占住，避免选到同一个端口
+    _reserved_ports: Set[int] = set()
 
     def __init__(self):
         self.launcher = BrowserLauncher()
@@ -47,7 +50,7 @@ class CDPBrowserManager:
             browser_path = await self._get_browser_path()
 
             # 2. 获取可用端口
-            self.debug_port = self.launcher.find_available_port(config.CDP_DEBUG_PORT)
+            self.debug_port = self._reserve_port()
 
             # 3. 启动浏览器
             await self._launch_browser(browser_path, headless)
@@ -68,6 +71,16 @@ class CDPBrowserManager:
             await self.cleanup()
             raise
 
+    def _reserve_port(self) -> int:
+        """
+        获取可用端口并登记，跳过同一进程中其他浏览器已经占用的端口
+        """
+        port = self.launcher.find_available_port(config.CDP_DEBUG_PORT)
+        while port in CDPBrowserManager._reserved_ports:
+            port = self.launcher.find_available_port(port + 1)
+        CDPBrowserManager._reserved_ports.add(port)
+        return port
+
     async def _get_browser_path(self) -> str:
         """
         获取浏览器路径
@@ -131,7 +144,7 @@ class CDPBrowserManager:
             user_data_dir = os.path.join(
                 os.getcwd(),
                 "browser_data",
-                f"cdp_{config.USER_DATA_DIR % config.PLATFORM}",
+                f"cdp_{config.USER_DATA_DIR % (platform_var.get() or config.PLATFORM)}",
             )
             os.makedirs(user_data_dir, exist_ok=True)
             utils.logger.info(f"[CDPBrowserManager] 用户数据目录: {user_data_dir}")
@@ -305,6 +318,7 @@ class CDPBrowserManager:
             # 关闭浏览器进程（如果配置为自动关闭）
             if config.AUTO_CLOSE_BROWSER:
                 self.launcher.cleanup()
+                CDPBrowserManager._reserved_ports.discard(self.debug_port)
             else:
                 utils.logger.info(
                     "[CDPBrowserManager] 浏览器进程保持运行（AUTO_CLOSE_BROWSER=False）"
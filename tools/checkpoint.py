@@ -0,0 +1,268 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 爬取断点：把搜索页码、search_id、评论游标、创作者分页游标等爬取前沿定期写入文件，
+#            使用 --resume 启动时从断点继续，已完成的帖子、评论和创作者不再重复抓取
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import config
+from base.base_crawler import AbstractStore
+from tools import utils
+from var import crawler_type_var, platform_var
+
+
+class PageFrontier:
+    """
+    跟踪一个搜索关键词已经交给下游处理的搜索页，页内的数据全部处理完后才推进断点中的页码，
+    中断时还在队列中没处理完的数据会在恢复时重新抓取
+    """
+
+    def __init__(self, page: int):
+        self.page = page
+        self.pending: Dict[int, Set[str]] = {}
+        self.exhausted = False
+
+    def feed(self, page: int, item_ids: Iterable[str]):
+        if not self.pending:
+            # 跳过的页（START_PAGE 之前）不会交给下游，直接推进到当前页
+            self.page = max(self.page, page)
+        self.pending[page] = set(item_ids)
+
+    def finish(self, item_id: str):
+        for item_ids in self.pending.values():
+            item_ids.discard(item_id)
+
+    def advance(self) -> bool:
+        """
+        推进到第一个还有未完成数据的页
+        Returns:
+            页码是否变化
+        """
+        page = self.page
+        for fed_page in sorted(self.pending):
+            if self.pending[fed_page]:
+                break
+            del self.pending[fed_page]
+            self.page = fed_page + 1
+        return self.page != page
+
+    @property
+    def finished(self) -> bool:
+        return self.exhausted and not self.pending
+
+
+class CrawlCheckpoint:
+    """
+    一次爬取的断点，按平台保存为一个 json 文件：
+    frontier 保存各任务的游标（如 search:关键词 -> 页码、search_id），done 保存已经完成的任务 key（如 note:帖子id）
+    """
+    _instances: Dict[str, "CrawlCheckpoint"] = {}
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.frontier: Dict[str, Dict[str, Any]] = {}
+        self.done: Set[str] = set()
+        self._pages: Dict[str, PageFrontier] = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._saving: Optional[asyncio.Task] = None
+        if resume:
+            self.load()
+
+    @classmethod
+    def get_instance(cls) -> "CrawlCheckpoint":
+        """
+        获取当前平台的断点，文件名包含平台、爬取类型和分片序号
+        Returns:
+
+        """
+        platform = platform_var.get() or config.PLATFORM
+        if platform not in cls._instances:
+            name = f"{platform}_{crawler_type_var.get() or config.CRAWLER_TYPE}"
+            if config.SHARD_COUNT > 1:
+                name += f"_shard{config.SHARD_INDEX}"
+            cls._instances[platform] = cls(
+                os.path.join(config.CHECKPOINT_DIR, f"{name}.json"), resume=config.RESUME
+            )
+        return cls._instances[platform]
+
+    @classmethod
+    async def close_all(cls):
+        """
+        程序退出时把所有断点写入文件
+        Returns:
+
+        """
+        while cls._instances:
+            _, checkpoint = cls._instances.popitem()
+            try:
+                if checkpoint._saving:
+                    await checkpoint._saving
+                checkpoint.save()
+            except Exception as e:
+                utils.logger.error(f"[CrawlCheckpoint.close_all] save {checkpoint.path} error: {e}")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            utils.logger.info(f"[CrawlCheckpoint.load] no checkpoint at {self.path}, start from the beginning")
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.frontier = data.get("frontier", {})
+        self.done = set(data.get("done", []))
+        utils.logger.info(
+            f"[CrawlCheckpoint.load] resume from {self.path}, frontier: {len(self.frontier)}, done: {len(self.done)}"
+        )
+
+    def save(self):
+        """
+        立即写入断点，调用前存储中缓冲的数据需要已经落盘
+        """
+        if not config.ENABLE_CHECKPOINT or not self._dirty:
+            return
+        self._dirty = False
+        self._write(self._snapshot())
+
+    async def flush_and_save(self):
+        """
+        定期保存：先记录断点快照，再把存储缓冲的数据落盘，最后写入快照，
+        保证断点中标记完成的数据都已经保存，快照之后完成的数据留到下一次保存
+        """
+        try:
+            self._dirty = False
+            snapshot = self._snapshot()
+            for store in list(AbstractStore._instances.values()):
+                await store.flush()
+            self._write(snapshot)
+        except Exception as e:
+            self._dirty = True
+            utils.logger.error(f"[CrawlCheckpoint.flush_and_save] save {self.path} error: {e}")
+        finally:
+            self._saving = None
+
+    def _snapshot(self) -> str:
+        return json.dumps({"frontier": self.frontier, "done": sorted(self.done)}, ensure_ascii=False)
+
+    def _write(self, snapshot: str):
+        # 先写临时文件再替换，进程在写入过程中崩溃也不会留下损坏的断点文件
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(snapshot)
+        os.replace(tmp_path, self.path)
+        self._saved_at = time.monotonic()
+
+    def _changed(self):
+        self._dirty = True
+        if (
+            config.ENABLE_CHECKPOINT
+            and self._saving is None
+            and time.monotonic() - self._saved_at >= config.CHECKPOINT_SAVE_INTERVAL
+        ):
+            self._saving = asyncio.create_task(self.flush_and_save())
+
+    def get(self, key: str) -> Dict[str, Any]:
+        """
+        获取任务的游标状态，返回的是副本，修改后通过 set 保存
+        Args:
+            key: 任务 key
+
+        Returns:
+
+        """
+        return dict(self.frontier.get(key, {}))
+
+    def set(self, key: str, state: Dict[str, Any]):
+        self.frontier[key] = state
+        self._changed()
+
+    def is_done(self, key: str) -> bool:
+        return key in self.done
+
+    def mark_done(self, key: str):
+        self.done.add(key)
+        self._changed()
+
+    def start_pages(self, key: str, default_page: int) -> PageFrontier:
+        """
+        开始跟踪一个关键词的搜索页
+        Args:
+            key: 任务 key，如 search:关键词
+            default_page: 没有断点时的起始页
+
+        Returns:
+
+        """
+        frontier = PageFrontier(self.frontier.get(key, {}).get("page", default_page))
+        self._pages[key] = frontier
+        return frontier
+
+    def feed_page(self, key: str, page: int, item_ids: List[str], **state):
+        """
+        记录一个搜索页交给下游处理的数据，state 中是恢复时需要的其他参数（如 search_id）
+        Args:
+            key: 任务 key
+            page: 页码
+            item_ids: 页内数据的 id
+            **state:
+
+        Returns:
+
+        """
+        frontier = self._pages[key]
+        frontier.feed(page, item_ids)
+        frontier.advance()
+        self.set(key, {**self.frontier.get(key, {}), **state, "page": frontier.page})
+
+    def finish_item(self, key: str, item_id: str):
+        """
+        搜索页中的一条数据处理结束（成功或失败都要调用），不再阻塞断点中页码的推进；
+        成功与否由调用方通过 mark_done 单独记录
+        Args:
+            key: 数据来源的任务 key
+            item_id: 数据 id
+
+        Returns:
+
+        """
+        frontier = self._pages.get(key)
+        if frontier is None:
+            return
+        frontier.finish(item_id)
+        if frontier.advance():
+            self.frontier.setdefault(key, {})["page"] = frontier.page
+            self._changed()
+        if frontier.finished:
+            self.mark_done(key)
+
+    def finish_pages(self, key: str):
+        """
+        搜索页已经全部翻完，页内数据处理完后任务标记为完成
+        Args:
+            key: 任务 key
+
+        Returns:
+
+        """
+        frontier = self._pages[key]
+        frontier.exhausted = True
+        if frontier.finished:
+            self.mark_done(key)
+
+
+def get_checkpoint() -> CrawlCheckpoint:
+    return CrawlCheckpoint.get_instance()
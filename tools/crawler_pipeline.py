@@ -0,0 +1,170 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 搜索翻页 -> 详情 -> 评论 的流水线调度，各阶段由有界队列连接，前一页的评论还在抓取时下一页的搜索和详情已经开始
+import asyncio
+import contextvars
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, List, Optional
+
+import config
+from tools import utils
+from var import source_keyword_var
+
+# 阶段处理函数：处理一个数据，返回交给下一个阶段的数据列表（没有时返回 None）
+StageHandler = Callable[[Any], Awaitable[Optional[Iterable[Any]]]]
+
+
+class PipelineStage:
+    def __init__(self, name: str, handler: StageHandler, workers: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.next_stage: Optional["PipelineStage"] = None
+        self.processed = 0
+
+    async def put(self, item: Any):
+        # 记录放入队列时的上下文（如 source_keyword_var），处理时在同样的上下文中执行
+        await self.queue.put((item, contextvars.copy_context()))
+
+    async def work(self, pipeline_name: str):
+        while True:
+            item, context = await self.queue.get()
+            try:
+                outputs = await context.run(asyncio.create_task, self.handler(item))
+                self.processed += 1
+                if outputs and self.next_stage:
+                    for output in outputs:
+                        await self.next_stage.put(output)
+            except Exception as e:
+                utils.logger.error(f"[CrawlerPipeline.{pipeline_name}] stage {self.name} handle item error: {e}")
+            finally:
+                self.queue.task_done()
+
+
+class CrawlerPipeline:
+    """
+    线性流水线：生产者产生的数据依次经过各个阶段，每个阶段有独立的工作任务数和有界队列，
+    队列满时上游等待（背压）
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: List[PipelineStage] = []
+
+    def add_stage(self, name: str, handler: StageHandler, workers: int = 1,
+                  queue_size: int = None) -> "CrawlerPipeline":
+        """
+        追加一个阶段
+        Args:
+            name: 阶段名称
+            handler: 处理函数，返回值中的数据会放入下一个阶段
+            workers: 并发处理的工作任务数
+            queue_size: 队列长度，默认 config.PIPELINE_QUEUE_SIZE
+
+        Returns:
+
+        """
+        stage = PipelineStage(name, handler, workers, queue_size or config.PIPELINE_QUEUE_SIZE)
+        if self.stages:
+            self.stages[-1].next_stage = stage
+        self.stages.append(stage)
+        return self
+
+    async def run(self, producer: AsyncIterable[Any]):
+        """
+        启动各阶段的工作任务，把生产者产生的数据放入第一个阶段，等所有阶段处理完后结束
+        Args:
+            producer: 异步生成器，例如按页产生搜索结果
+
+        Returns:
+
+        """
+        async def feed():
+            async for item in producer:
+                await self.stages[0].put(item)
+
+        await self._run(feed())
+
+    async def run_keywords(self, producer: Callable[[str], AsyncIterable[Any]], keywords: List[str] = None):
+        """
+        每个关键词使用独立的生产者，按 config.KEYWORD_CONCURRENCY 并发翻页，产生的数据进入同一条流水线
+        Args:
+            producer: 传入关键词，返回该关键词搜索结果的异步生成器
+            keywords: 关键词列表，默认取 config.KEYWORDS
+
+        Returns:
+
+        """
+        async def feed(keyword: str):
+            async for item in producer(keyword):
+                await self.stages[0].put(item)
+
+        await self._run(run_keywords(feed, keywords))
+
+    async def _run(self, feeding: Awaitable):
+        if not self.stages:
+            raise ValueError("pipeline has no stage")
+        workers: List[asyncio.Task] = [
+            asyncio.create_task(stage.work(self.name))
+            for stage in self.stages
+            for _ in range(stage.workers)
+        ]
+        try:
+            await feeding
+            # 上游阶段处理完时已经把数据放入下游，按顺序等待即可
+            for stage in self.stages:
+                await stage.queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        utils.logger.info(
+            f"[CrawlerPipeline.{self.name}] finished, processed: "
+            + ", ".join(f"{stage.name}={stage.processed}" for stage in self.stages)
+        )
+
+
+def get_keywords() -> List[str]:
+    # 多进程分片时某个分片可能没有分到关键词，空字符串不作为关键词搜索
+    return [keyword for keyword in config.KEYWORDS.split(",") if keyword]
+
+
+async def run_keywords(handler: Callable[[str], Awaitable[Any]], keywords: List[str] = None):
+    """
+    按 config.KEYWORD_CONCURRENCY 并发执行每个关键词的爬取，每个关键词在独立的任务中执行，
+    source_keyword_var、翻页计数和 CRAWLER_MAX_NOTES_COUNT 数量限制都按关键词各自独立；并发数为 1 时和逐个关键词执行一致
+    Args:
+        handler: 传入关键词，完成该关键词的爬取
+        keywords: 关键词列表，默认取 config.KEYWORDS
+
+    Returns:
+
+    """
+    pending = list(keywords if keywords is not None else get_keywords())
+
+    async def worker():
+        while pending:
+            keyword = pending.pop(0)
+            source_keyword_var.set(keyword)
+            await handler(keyword)
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(max(1, config.KEYWORD_CONCURRENCY), len(pending)))
+    ]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
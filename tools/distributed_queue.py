@@ -0,0 +1,387 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 基于 Redis 的分布式任务队列：协调进程把关键词分页、帖子详情、评论、创作者等任务入队，
+#            多个 worker 进程 / 节点以租约方式领取，成功后确认，租约过期或失败的任务重新入队重试
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+from redis.asyncio import Redis
+
+import config
+from config import db_config
+from tools import utils
+from var import crawler_type_var, platform_var, source_keyword_var
+
+
+class WorkTask(BaseModel):
+    task_id: str = Field(title="task id, the same id is only enqueued once")
+    kind: str = Field(title="task kind, search_page | note_detail | comments | creator")
+    payload: Dict = Field(default_factory=dict, title="task arguments")
+    crawler_type: str = Field(default="", title="crawler type of the coordinator, used for store file names")
+    source_keyword: str = Field(default="", title="search keyword the task comes from")
+    attempts: int = Field(default=0, title="failed attempts")
+    last_error: str = Field(default="", title="last error message")
+    lease_id: str = Field(default="", title="id of the current lease, changed on every claim")
+
+
+def new_task(kind: str, key: str, payload: Dict, source_keyword: str = "") -> WorkTask:
+    """
+    创建任务，任务 id 由任务类型和业务主键组成，同一个帖子被多个关键词搜到时只会入队一次
+    Args:
+        kind: 任务类型
+        key: 业务主键，例如关键词+页码、帖子 id、创作者 id
+        payload: 任务参数
+        source_keyword: 任务来源的搜索关键词
+
+    Returns:
+
+    """
+    return WorkTask(
+        task_id=f"{kind}:{key}",
+        kind=kind,
+        payload=payload,
+        crawler_type=crawler_type_var.get() or config.CRAWLER_TYPE,
+        source_keyword=source_keyword,
+    )
+
+
+class RedisWorkQueue:
+    """
+    任务以 id 保存在 hash 中，队列、处理中列表和租约有序集合里只保存 id：
+    pending(list) -> processing(list) + leases(zset, 成员为 任务id|租约id, score 为租约到期时间) -> ack 删除 / 重试回到 pending / 超过次数进入 dead
+    每次领取生成新的租约 id，取出 id 和写入租约在同一个 Lua 脚本中原子执行，处理中的任务一定有租约；
+    租约过期后原 worker 迟到的确认、失败和续租不会影响重新领取的 worker
+    seen 集合只对还没有完成的任务去重，任务确认或进入 dead 后移出，之后再次运行协调进程时可以重新入队
+    保证至少执行一次，worker 在租约到期前崩溃时任务会被其他 worker 重新执行，存储层按主键更新所以重复执行不会产生重复数据
+    """
+    # KEYS: pending, processing, leases  ARGV: 租约到期时间, 租约 id
+    CLAIM_SCRIPT = """
+local task_id = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+if not task_id then
+    return false
+end
+redis.call('ZADD', KEYS[3], ARGV[1], task_id .. '|' .. ARGV[2])
+return task_id
+"""
+
+    def __init__(self, redis_client: Redis, name: str, lease_seconds: float = None, max_attempts: int = None):
+        self._redis = redis_client
+        self.name = name
+        self.lease_seconds = lease_seconds if lease_seconds is not None else config.DISTRIBUTED_LEASE_SEC
+        self.max_attempts = max_attempts if max_attempts is not None else config.DISTRIBUTED_MAX_ATTEMPTS
+
+    def _key(self, suffix: str) -> str:
+        return f"{self.name}:{suffix}"
+
+    async def enqueue(self, tasks: Iterable[WorkTask]) -> int:
+        """
+        任务入队，已经在队列中（未完成）的任务 id 会被跳过
+        Args:
+            tasks: 任务列表
+
+        Returns:
+            新入队的任务数量
+        """
+        count = 0
+        for task in tasks:
+            if not await self._redis.sadd(self._key("seen"), task.task_id):
+                continue
+            await self._redis.hset(self._key("tasks"), task.task_id, task.model_dump_json())
+            await self._redis.lpush(self._key("pending"), task.task_id)
+            count += 1
+        return count
+
+    async def claim(self) -> Optional[WorkTask]:
+        """
+        领取一个任务并加上租约，没有可领取的任务时返回 None
+        Returns:
+
+        """
+        await self.requeue_expired()
+        while True:
+            lease_id = uuid.uuid4().hex
+            task_id = await self._redis.eval(
+                self.CLAIM_SCRIPT, 3, self._key("pending"), self._key("processing"), self._key("leases"),
+                time.time() + self.lease_seconds, lease_id,
+            )
+            if task_id is None:
+                return None
+            task = await self._load(task_id)
+            if task:
+                task.lease_id = lease_id
+                return task
+            # 任务数据已经被删除（重复入队的 id 已确认完成），丢弃这个 id
+            await self._redis.zrem(self._key("leases"), f"{task_id}|{lease_id}")
+            await self._redis.lrem(self._key("processing"), 0, task_id)
+
+    @staticmethod
+    def _lease_member(task: WorkTask) -> str:
+        return f"{task.task_id}|{task.lease_id}"
+
+    async def extend_lease(self, task: WorkTask) -> bool:
+        """
+        延长租约，租约已经过期被回收时返回 False
+        Args:
+            task: 任务
+
+        Returns:
+
+        """
+        member = self._lease_member(task)
+        if await self._redis.zscore(self._key("leases"), member) is None:
+            return False
+        await self._redis.zadd(self._key("leases"), {member: time.time() + self.lease_seconds}, xx=True)
+        return True
+
+    async def ack(self, task: WorkTask):
+        """
+        确认任务完成
+        Args:
+            task: 任务
+
+        Returns:
+
+        """
+        # 租约已经过期时任务已被回收，可能正由其他 worker 执行，迟到的确认不能删除它的数据
+        if not await self._redis.zrem(self._key("leases"), self._lease_member(task)):
+            return
+        await self._redis.lrem(self._key("processing"), 0, task.task_id)
+        await self._redis.hdel(self._key("tasks"), task.task_id)
+        await self._redis.srem(self._key("seen"), task.task_id)
+        await self._redis.hincrby(self._key("stats"), "done", 1)
+
+    async def fail(self, task: WorkTask, error: str):
+        """
+        任务执行失败，没有超过最大次数时重新入队，否则进入 dead 列表
+        Args:
+            task: 任务
+            error: 错误信息
+
+        Returns:
+
+        """
+        # 租约已经过期时任务已被回收重新入队，这里不再重复处理
+        if not await self._redis.zrem(self._key("leases"), self._lease_member(task)):
+            return
+        await self._retry(task, error)
+
+    async def requeue_expired(self) -> int:
+        """
+        回收租约过期的任务，按失败处理
+        Returns:
+            回收的任务数量
+        """
+        count = 0
+        for member in await self._redis.zrangebyscore(self._key("leases"), 0, time.time()):
+            # 多个 worker 同时回收时只有删除租约成功的一方负责重新入队
+            if not await self._redis.zrem(self._key("leases"), member):
+                continue
+            task = await self._load(member.rsplit("|", 1)[0])
+            if task:
+                await self._retry(task, "lease expired")
+                count += 1
+        return count
+
+    async def _retry(self, task: WorkTask, error: str):
+        await self._redis.lrem(self._key("processing"), 0, task.task_id)
+        task.attempts += 1
+        task.last_error = error
+        await self._redis.hset(self._key("tasks"), task.task_id, task.model_dump_json())
+        if task.attempts >= self.max_attempts:
+            utils.logger.error(
+                f"[RedisWorkQueue.{self.name}] task {task.task_id} failed {task.attempts} times, last error: {error}"
+            )
+            await self._redis.lpush(self._key("dead"), task.task_id)
+            await self._redis.srem(self._key("seen"), task.task_id)
+            await self._redis.hincrby(self._key("stats"), "failed", 1)
+        else:
+            utils.logger.warning(
+                f"[RedisWorkQueue.{self.name}] task {task.task_id} will be retried, attempts: {task.attempts}, error: {error}"
+            )
+            await self._redis.lpush(self._key("pending"), task.task_id)
+            await self._redis.hincrby(self._key("stats"), "retried", 1)
+
+    async def _load(self, task_id: str) -> Optional[WorkTask]:
+        raw = await self._redis.hget(self._key("tasks"), task_id)
+        if raw is None:
+            return None
+        return WorkTask.model_validate_json(raw)
+
+    async def is_drained(self) -> bool:
+        """
+        队列中没有待领取和处理中的任务，处理中的任务可能还会派生新任务，所以两者都为空才算完成
+        Returns:
+
+        """
+        return (
+            await self._redis.llen(self._key("pending")) == 0
+            and await self._redis.llen(self._key("processing")) == 0
+        )
+
+    async def stats(self) -> Dict[str, int]:
+        counters = await self._redis.hgetall(self._key("stats"))
+        return {
+            "pending": await self._redis.llen(self._key("pending")),
+            "processing": await self._redis.llen(self._key("processing")),
+            "dead": await self._redis.llen(self._key("dead")),
+            **{key: int(value) for key, value in counters.items()},
+        }
+
+
+    async def close(self):
+        await self._redis.close()
+
+
+class DistributedWorker:
+    """
+    并发领取并执行任务，执行期间定时续租；队列清空并持续空闲 idle_exit 秒后退出
+    """
+
+    def __init__(self, queue: RedisWorkQueue, handler: Callable[[WorkTask], Awaitable[None]],
+                 concurrency: int = None, poll_interval: float = None, idle_exit: float = None):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency or config.DISTRIBUTED_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval if poll_interval is not None else config.DISTRIBUTED_POLL_INTERVAL
+        self.idle_exit = idle_exit if idle_exit is not None else config.DISTRIBUTED_IDLE_EXIT_SEC
+        self.processed = 0
+        self.failed = 0
+
+    async def run(self):
+        workers = [asyncio.create_task(self._worker()) for _ in range(max(1, self.concurrency))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        utils.logger.info(
+            f"[DistributedWorker.{self.queue.name}] finished, processed: {self.processed}, failed: {self.failed}"
+        )
+
+    async def _worker(self):
+        idle_since: Optional[float] = None
+        while True:
+            task = await self.queue.claim()
+            if task is None:
+                if not await self.queue.is_drained():
+                    idle_since = None
+                elif idle_since is None:
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since >= self.idle_exit:
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            idle_since = None
+            await self.process(task)
+
+    async def process(self, task: WorkTask):
+        """
+        执行一个任务，成功确认，异常时交给队列重试
+        Args:
+            task: 任务
+
+        Returns:
+
+        """
+        crawler_type_var.set(task.crawler_type)
+        source_keyword_var.set(task.source_keyword)
+        heartbeat = asyncio.create_task(self._keep_lease(task))
+        try:
+            await self.handler(task)
+        except Exception as e:
+            utils.logger.error(f"[DistributedWorker.process] task {task.task_id} error: {e!r}")
+            self.failed += 1
+            await self.queue.fail(task, repr(e))
+            return
+        finally:
+            heartbeat.cancel()
+        self.processed += 1
+        await self.queue.ack(task)
+
+    async def _keep_lease(self, task: WorkTask):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await self.queue.extend_lease(task):
+                utils.logger.warning(f"[DistributedWorker._keep_lease] lease of task {task.task_id} lost")
+                return
+
+
+def create_redis_client() -> Redis:
+    return Redis(
+        host=db_config.REDIS_DB_HOST,
+        port=db_config.REDIS_DB_PORT,
+        db=db_config.REDIS_DB_NUM,
+        password=db_config.REDIS_DB_PWD,
+        decode_responses=True,
+    )
+
+
+def get_work_queue(redis_client: Redis = None) -> RedisWorkQueue:
+    """
+    获取当前平台的任务队列，不同平台的任务在不同的队列中
+    Args:
+        redis_client: 默认按 db_config 的 redis 配置创建
+
+    Returns:
+
+    """
+    platform = platform_var.get() or config.PLATFORM
+    return RedisWorkQueue(redis_client or create_redis_client(), f"{config.DISTRIBUTED_QUEUE_NAME}:{platform}")
+
+
+async def run_coordinator(crawler, queue: RedisWorkQueue = None) -> Dict[str, int]:
+    """
+    协调进程：按当前配置生成任务并入队，不启动浏览器
+    Args:
+        crawler: 平台爬虫，由它把配置转换为任务
+        queue: 任务队列
+
+    Returns:
+        入队后的队列统计
+    """
+    own_queue = queue is None
+    queue = queue or get_work_queue()
+    try:
+        tasks: List[WorkTask] = crawler.build_distributed_tasks()
+        added = await queue.enqueue(tasks)
+        stats = await queue.stats()
+    finally:
+        if own_queue:
+            await queue.close()
+    utils.logger.info(
+        f"[run_coordinator] {queue.name} enqueued {added}/{len(tasks)} tasks, queue stats: {stats}"
+    )
+    return stats
+
+
+async def run_worker(crawler, queue: RedisWorkQueue = None):
+    """
+    worker 进程：在爬虫完成登录后调用，领取任务交给爬虫执行，爬取结果照常写入 store
+    Args:
+        crawler: 已经启动的平台爬虫
+        queue: 任务队列
+
+    Returns:
+
+    """
+    own_queue = queue is None
+    queue = queue or get_work_queue()
+    try:
+        await DistributedWorker(queue, lambda task: crawler.handle_task(task, queue)).run()
+    finally:
+        if own_queue:
+            await queue.close()
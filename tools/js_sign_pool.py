@@ -0,0 +1,220 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : execjs 签名脚本的常驻 Node 进程池，脚本只在进程启动时加载一次，通过管道按行收发 JSON，
+#            避免 execjs 每次调用都启动新的 node 进程并在事件循环中同步等待
+import asyncio
+import itertools
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+import config
+from tools import utils
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "libs", "js_sign_worker.js")
+
+
+class JsSignError(Exception):
+    """签名脚本执行出错或 Node 进程异常退出"""
+
+
+def get_node_path() -> Optional[str]:
+    """
+    查找 node 可执行文件
+    Returns:
+
+    """
+    return shutil.which("node") or shutil.which("nodejs")
+
+
+class JsSignWorker:
+    """
+    单个常驻的 Node 进程，同一时间只处理一个请求
+    """
+
+    def __init__(self, script_path: str, node_path: str):
+        self.script_path = script_path
+        self.node_path = node_path
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._ids = itertools.count(1)
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    async def start(self):
+        """
+        启动 Node 进程并等待签名脚本加载完成
+        Returns:
+
+        """
+        self._process = await asyncio.create_subprocess_exec(
+            self.node_path, WORKER_SCRIPT, self.script_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=2 ** 20,
+        )
+        try:
+            message = await self._read_message(config.JS_SIGN_TIMEOUT)
+        except Exception:
+            await self.close()
+            raise
+        if not message.get("ready"):
+            await self.close()
+            raise JsSignError(f"unexpected handshake from js sign worker: {message}")
+
+    async def call(self, method: str, *args) -> Any:
+        """
+        调用签名脚本中的函数，超时或进程退出时结束该进程，由进程池在下次使用前重新启动
+        Args:
+            method: 签名脚本中的函数名
+            *args: 函数参数，需要能被 JSON 序列化
+
+        Returns:
+
+        """
+        request_id = next(self._ids)
+        try:
+            self._process.stdin.write((json.dumps({"id": request_id, "method": method, "args": args}) + "\n").encode())
+            await self._process.stdin.drain()
+            message = await self._read_message(config.JS_SIGN_TIMEOUT)
+        except BaseException:
+            # 调用被取消时进程里可能还留着未读的响应，同样要结束进程，避免下次调用读到错位的结果
+            await self.close()
+            raise
+        if message.get("id") != request_id:
+            await self.close()
+            raise JsSignError(f"js sign worker response out of order: {message}")
+        if "error" in message:
+            raise JsSignError(message["error"])
+        return message.get("result")
+
+    async def _read_message(self, timeout: float) -> Dict:
+        try:
+            line = await asyncio.wait_for(self._process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            raise JsSignError(f"js sign worker timed out after {timeout}s: {self.script_path}")
+        if not line:
+            raise JsSignError(f"js sign worker exited unexpectedly: {self.script_path}")
+        return json.loads(line)
+
+    async def close(self):
+        if not self.alive:
+            self._process = None
+            return
+        process, self._process = self._process, None
+        try:
+            process.stdin.close()
+            await asyncio.wait_for(process.wait(), 3)
+        except (asyncio.TimeoutError, ConnectionError):
+            process.kill()
+            await process.wait()
+
+
+class JsSignPool:
+    """
+    按签名脚本路径共享的 Node 进程池，空闲进程放在队列中，调用时取出一个，用完放回
+    """
+    _pools: Dict[str, "JsSignPool"] = {}
+
+    def __init__(self, script_path: str, size: int = None):
+        self.script_path = script_path
+        self.size = max(1, size or config.JS_SIGN_POOL_SIZE)
+        self.node_path = get_node_path() if config.ENABLE_JS_SIGN_POOL else None
+        self._workers: List[JsSignWorker] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._execjs_ctx = None
+        if config.ENABLE_JS_SIGN_POOL and not self.node_path:
+            utils.logger.warning(f"[JsSignPool] node not found, fallback to execjs for {script_path}")
+
+    @classmethod
+    def get_pool(cls, script_path: str) -> "JsSignPool":
+        """
+        获取签名脚本对应的进程池，同一个脚本只创建一个
+        Args:
+            script_path: 签名脚本路径
+
+        Returns:
+
+        """
+        pool = cls._pools.get(script_path)
+        if pool is None:
+            pool = cls(script_path)
+            cls._pools[script_path] = pool
+        return pool
+
+    async def call(self, method: str, *args) -> Any:
+        """
+        调用签名脚本中的函数
+        Args:
+            method: 签名脚本中的函数名
+            *args: 函数参数
+
+        Returns:
+
+        """
+        if not self.node_path:
+            return await asyncio.to_thread(self._call_execjs, method, *args)
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._workers = [JsSignWorker(self.script_path, self.node_path) for _ in range(self.size)]
+            for worker in self._workers:
+                self._idle.put_nowait(worker)
+        worker = await self._idle.get()
+        try:
+            if not worker.alive:
+                await worker.start()
+            return await worker.call(method, *args)
+        finally:
+            self._idle.put_nowait(worker)
+
+    def _call_execjs(self, method: str, *args) -> Any:
+        import execjs
+
+        if self._execjs_ctx is None:
+            with open(self.script_path, mode="r", encoding="utf-8-sig") as f:
+                self._execjs_ctx = execjs.compile(f.read())
+        return self._execjs_ctx.call(method, *args)
+
+    async def close(self):
+        for worker in self._workers:
+            await worker.close()
+        self._workers = []
+        self._idle = None
+
+    @classmethod
+    async def close_all(cls):
+        """
+        结束所有进程池中的 Node 进程
+        Returns:
+
+        """
+        pools = list(cls._pools.values())
+        cls._pools.clear()
+        for pool in pools:
+            await pool.close()
+
+
+async def sign(script_path: str, method: str, *args) -> Any:
+    """
+    通过常驻的 Node 进程池调用签名脚本中的函数
+    Args:
+        script_path: 签名脚本路径，例如 libs/douyin.js
+        method: 签名脚本中的函数名
+        *args: 函数参数
+
+    Returns:
+
+    """
+    return await JsSignPool.get_pool(script_path).call(method, *args)
@@ -0,0 +1,129 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按 host / 接口路径统一限速的令牌桶，所有经过 AbstractApiClient 连接池的请求在发送前取令牌，
+#            替代各平台分散的随机 sleep
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+import config
+
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个，令牌不够时等待补充
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        预占一个令牌，返回需要等待的秒数；令牌可以预占为负数，并发的请求会按先后顺序排队等待
+        Returns:
+
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0
+        return -self._tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """
+    按 config.RATE_LIMITS 中的 key（host 或 host + 路径前缀）共享令牌桶，请求匹配最长的 key
+    """
+    _buckets: Dict[str, TokenBucket] = {}
+
+    @classmethod
+    def match(cls, host: str, path: str) -> Optional[Tuple[str, Dict]]:
+        """
+        查找请求对应的限速配置
+        Args:
+            host: 请求的域名
+            path: 请求路径
+
+        Returns:
+            (key, {"rate", "burst"})，没有配置且没有默认配置时返回 None
+        """
+        target = host + path
+        best_key = None
+        for key in config.RATE_LIMITS:
+            if (target == key or target.startswith(key.rstrip("/") + "/")) and (
+                    best_key is None or len(key) > len(best_key)):
+                best_key = key
+        if best_key is not None:
+            return best_key, config.RATE_LIMITS[best_key]
+        if config.RATE_LIMIT_DEFAULT:
+            return host, config.RATE_LIMIT_DEFAULT
+        return None
+
+    @classmethod
+    def get_bucket(cls, host: str, path: str = "") -> Optional[TokenBucket]:
+        matched = cls.match(host, path)
+        if matched is None:
+            return None
+        key, setting = matched
+        bucket = cls._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(setting["rate"], setting.get("burst", 1))
+            cls._buckets[key] = bucket
+        return bucket
+
+    @classmethod
+    async def acquire(cls, host: str, path: str = ""):
+        """
+        请求发送前获取令牌，没有限速配置的 host 直接返回
+        Args:
+            host: 请求的域名
+            path: 请求路径
+
+        Returns:
+
+        """
+        bucket = cls.get_bucket(host, path)
+        if bucket is not None:
+            await bucket.acquire()
+
+
+async def rate_limit_hook(request: httpx.Request):
+    """
+    httpx 的 request 事件钩子，在请求（包括重定向）发出前限速
+    """
+    await RateLimiter.acquire(request.url.host, request.url.path)
+
+
+def crawl_interval(interval: float) -> float:
+    """
+    开启统一限速后不再额外 sleep，返回 0；否则保留原来的随机间隔
+    Args:
+        interval: 原来的爬取间隔（秒）
+
+    Returns:
+
+    """
+    return 0 if config.ENABLE_RATE_LIMIT else interval
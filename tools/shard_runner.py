@@ -0,0 +1,277 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：  
+# 1. 不得用于任何商业用途。  
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。  
+# 3. 不得进行大规模爬取或对平台造成运营干扰。  
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。   
+# 5. 不得用于任何非法或不当的用途。
+#   
+# 详细许可条款请参阅项目根目录下的LICENSE文件。  
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。  
+
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 本机多进程分片运行：父进程启动 K 个子进程，每个子进程按哈希分到一部分关键词 / 创作者 / 指定 id，
+#            使用各自的浏览器数据目录和 CDP 端口，父进程汇总各分片进度并统一关闭
+import asyncio
+import os
+import shutil
+import sys
+import time
+import zlib
+from typing import List, Optional
+
+import config
+from tools import utils
+
+# 按分片拆分的配置列表，关键词单独处理
+SHARDED_CONFIG_LISTS = (
+    "XHS_SPECIFIED_NOTE_URL_LIST",
+    "XHS_CREATOR_ID_LIST",
+    "DY_SPECIFIED_ID_LIST",
+    "DY_CREATOR_ID_LIST",
+    "KS_SPECIFIED_ID_LIST",
+    "KS_CREATOR_ID_LIST",
+    "BILI_SPECIFIED_ID_LIST",
+    "BILI_CREATOR_ID_LIST",
+    "WEIBO_SPECIFIED_ID_LIST",
+    "WEIBO_CREATOR_ID_LIST",
+    "TIEBA_SPECIFIED_ID_LIST",
+    "TIEBA_NAME_LIST",
+    "TIEBA_CREATOR_URL_LIST",
+    "ZHIHU_SPECIFIED_ID_LIST",
+    "ZHIHU_CREATOR_URL_LIST",
+    "TIKTOK_SPECIFIED_ID_LIST",
+    "TIKTOK_CREATOR_ID_LIST",
+)
+
+# 每个分片的 CDP 起始端口间隔，子进程同时启动浏览器时从不同端口开始查找可用端口
+SHARD_CDP_PORT_STEP = 10
+
+# 子进程命令行中由分片运行器重新设置的参数
+SHARD_ARGS = ("--workers", "--shard_index", "--shard_count")
+
+
+def shard_of(value: str, shard_count: int) -> int:
+    """
+    计算数据所属的分片，使用 crc32 保证不同进程中结果一致（内置 hash 对字符串加了随机盐）
+    Args:
+        value: 关键词、创作者 id 等
+        shard_count: 分片数量
+
+    Returns:
+
+    """
+    return zlib.crc32(str(value).encode("utf-8")) % shard_count
+
+
+def apply_shard(shard_index: int, shard_count: int):
+    """
+    子进程启动时调用，只保留属于当前分片的关键词和 id 列表，并使用分片独立的浏览器数据目录和 CDP 端口
+    Args:
+        shard_index: 当前分片序号
+        shard_count: 分片数量
+
+    Returns:
+
+    """
+    config.KEYWORDS = ",".join(
+        keyword for keyword in config.KEYWORDS.split(",")
+        if keyword and shard_of(keyword, shard_count) == shard_index
+    )
+    for name in SHARDED_CONFIG_LISTS:
+        values = getattr(config, name, None)
+        if values:
+            setattr(config, name, [value for value in values if shard_of(value, shard_count) == shard_index])
+    config.USER_DATA_DIR = get_shard_user_data_dir(shard_index)
+    config.CDP_DEBUG_PORT += shard_index * SHARD_CDP_PORT_STEP
+    utils.logger.info(
+        f"[apply_shard] shard {shard_index}/{shard_count}, keywords: {config.KEYWORDS}"
+    )
+
+
+def get_shard_user_data_dir(shard_index: int) -> str:
+    return f"{config.USER_DATA_DIR}_shard{shard_index}"
+
+
+def prepare_user_data_dirs(platforms: List[str], shard_count: int):
+    """
+    第一次分片运行时把已保存的登录状态复制到各分片的浏览器数据目录，避免每个分片都重新登录；
+    Chrome 的单例锁文件不复制，否则子进程的浏览器会认为目录已被占用
+    Args:
+        platforms: 本次运行的平台
+        shard_count: 分片数量
+
+    Returns:
+
+    """
+    if not config.SAVE_LOGIN_STATE:
+        return
+    browser_data_dir = os.path.join(os.getcwd(), "browser_data")
+    for platform in platforms:
+        for prefix in ("", "cdp_"):
+            source = os.path.join(browser_data_dir, prefix + config.USER_DATA_DIR % platform)
+            if not os.path.isdir(source):
+                continue
+            for shard_index in range(shard_count):
+                target = os.path.join(browser_data_dir, prefix + get_shard_user_data_dir(shard_index) % platform)
+                if os.path.exists(target):
+                    continue
+                utils.logger.info(f"[prepare_user_data_dirs] copy login state {source} -> {target}")
+                shutil.copytree(source, target, ignore=shutil.ignore_patterns("Singleton*", "*.lock"))
+
+
+def build_shard_argv(argv: List[str], shard_index: int, shard_count: int) -> List[str]:
+    """
+    生成子进程的命令行参数：沿用父进程的参数，去掉分片相关参数后重新指定
+    Args:
+        argv: 父进程的命令行参数（不含程序名）
+        shard_index: 分片序号
+        shard_count: 分片数量
+
+    Returns:
+
+    """
+    shard_argv = []
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+            continue
+        if arg in SHARD_ARGS:
+            skip_value = True
+            continue
+        if arg.split("=", 1)[0] in SHARD_ARGS:
+            continue
+        shard_argv.append(arg)
+    return shard_argv + [
+        "--workers", "1", "--shard_index", str(shard_index), "--shard_count", str(shard_count)
+    ]
+
+
+class ShardProcess:
+    def __init__(self, shard_index: int, shard_count: int):
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self.last_line = ""
+
+    @property
+    def name(self) -> str:
+        return f"shard {self.shard_index}/{self.shard_count}"
+
+    @property
+    def status(self) -> str:
+        if self.process is None:
+            return "pending"
+        if self.process.returncode is None:
+            return "running"
+        return "finished" if self.process.returncode == 0 else f"failed({self.process.returncode})"
+
+    async def start(self, program: List[str]):
+        env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+        self.process = await asyncio.create_subprocess_exec(
+            *program,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=env,
+        )
+        self.started_at = time.monotonic()
+
+    async def forward_output(self):
+        """
+        转发子进程输出，每行加上分片前缀，并记录最后一行作为进度
+        """
+        async for line in self.process.stdout:
+            text = line.decode("utf-8", errors="replace").rstrip()
+            if text:
+                self.last_line = text
+                sys.stdout.write(f"[{self.name}] {text}\n")
+                sys.stdout.flush()
+
+    async def wait(self) -> int:
+        await asyncio.gather(self.forward_output(), self.process.wait())
+        self.finished_at = time.monotonic()
+        return self.process.returncode
+
+    async def terminate(self, timeout: float):
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            utils.logger.warning(f"[ShardProcess.terminate] {self.name} did not exit in {timeout}s, kill it")
+            self.process.kill()
+            await self.process.wait()
+
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+
+class ShardRunner:
+    """
+    启动并管理分片子进程，定时汇总进度；父进程被中断或取消时统一关闭所有子进程
+    """
+
+    def __init__(self, shard_count: int, argv: List[str] = None):
+        self.shard_count = shard_count
+        self.argv = list(sys.argv[1:] if argv is None else argv)
+        self.shards = [ShardProcess(index, shard_count) for index in range(shard_count)]
+
+    async def run(self) -> List[ShardProcess]:
+        """
+        运行所有分片直到结束
+        Returns:
+            失败的分片
+        """
+        program = [sys.executable, os.path.abspath(sys.argv[0])]
+        progress_task: Optional[asyncio.Task] = None
+        try:
+            for shard in self.shards:
+                await shard.start(program + build_shard_argv(self.argv, shard.shard_index, self.shard_count))
+            progress_task = asyncio.create_task(self.report_progress())
+            await asyncio.gather(*(shard.wait() for shard in self.shards))
+        finally:
+            if progress_task:
+                progress_task.cancel()
+            await asyncio.gather(
+                *(shard.terminate(config.SHARD_SHUTDOWN_TIMEOUT) for shard in self.shards)
+            )
+            self.log_progress()
+        return [shard for shard in self.shards if shard.process is None or shard.process.returncode != 0]
+
+    async def report_progress(self):
+        while True:
+            await asyncio.sleep(config.SHARD_PROGRESS_INTERVAL)
+            self.log_progress()
+
+    def log_progress(self):
+        running = sum(1 for shard in self.shards if shard.status == "running")
+        utils.logger.info(
+            f"[ShardRunner] {running}/{self.shard_count} shards running: "
+            + "; ".join(
+                f"{shard.name} {shard.status} {shard.elapsed():.0f}s" for shard in self.shards
+                if shard.process is not None
+            )
+        )
+        for shard in self.shards:
+            if shard.status == "running" and shard.last_line:
+                utils.logger.info(f"[ShardRunner] {shard.name} last output: {shard.last_line[:200]}")
+
+
+async def run_shards(platforms: List[str]):
+    """
+    父进程入口：准备各分片的登录状态后启动 SHARD_WORKERS 个子进程，有分片失败时抛出异常
+    Args:
+        platforms: 本次运行的平台
+
+    Returns:
+
+    """
+    prepare_user_data_dirs(platforms, config.SHARD_WORKERS)
+    failed = await ShardRunner(config.SHARD_WORKERS).run()
+    if failed:
+        raise RuntimeError(f"shards failed: {', '.join(shard.name for shard in failed)}")
@@ -12,6 +12,8 @@
 import argparse
 import logging
 
+import config
+
 from .crawler_util import *
 from .slider_util import *
 from .time_util import *
@@ -40,3 +42,14 @@ def str2bool(v):
         return False
     else:
         raise argparse.ArgumentTypeError('Boolean value expected.')
+
+
+def get_shard_suffix() -> str:
+    """
+    本机多进程分片运行时，数据文件名加上分片序号，避免多个进程写入同一个文件
+    Returns:
+
+    """
+    if config.SHARD_COUNT > 1:
+        return f"_shard{config.SHARD_INDEX}"
+    return ""
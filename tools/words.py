@@ -12,7 +12,12 @@
 import asyncio
 import json
 import logging
+import math
+import os
+import time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
 
 import aiofiles
 import jieba
@@ -22,62 +27,269 @@ from wordcloud import WordCloud
 import config
 from tools import utils
 
-plot_lock = asyncio.Lock()
+# 分词和词云绘制都是 CPU 密集型操作，放到进程池中执行，避免阻塞爬虫的事件循环
+_executor: Optional[ProcessPoolExecutor] = None
+# 限制提交到进程池中未完成的任务数，任务积压时新数据先在内存中合并，等待下一批提交
+_executor_semaphore: Optional[asyncio.Semaphore] = None
+# 每次提交给一个子进程分词的最少文本条数，数据量小时不拆分
+MIN_TEXTS_PER_CHUNK = 50
+
+# 子进程中的停用词
+_worker_stop_words = set()
+
+
+def load_stop_words(stop_words_file: str) -> set:
+    with open(stop_words_file, 'r', encoding='utf-8') as f:
+        return set(f.read().strip().split('\n'))
+
+
+def _init_worker(stop_words_file: str, custom_words: Dict[str, str]):
+    """
+    进程池子进程的初始化：加载停用词和自定义词典
+    """
+    global _worker_stop_words
+    logging.getLogger('jieba').setLevel(logging.WARNING)
+    _worker_stop_words = load_stop_words(stop_words_file)
+    for word, group in custom_words.items():
+        jieba.add_word(word)
+
+
+def _count_words(texts: List[str]) -> Counter:
+    """
+    在子进程中对文本分词并统计词频
+    """
+    words = jieba.lcut(' '.join(texts))
+    return Counter(word for word in words if word not in _worker_stop_words and len(word.strip()) > 0)
+
+
+def _render_word_cloud(word_freq: Dict[str, int], save_words_prefix: str, font_path: str):
+    """
+    在子进程中绘制词云图并保存
+    """
+    top_20_word_freq = {word: freq for word, freq in
+                        sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:20]}
+    wordcloud = WordCloud(
+        font_path=font_path,
+        width=800,
+        height=400,
+        background_color='white',
+        max_words=200,
+        stopwords=_worker_stop_words,
+        colormap='viridis',
+        contour_color='steelblue',
+        contour_width=1
+    ).generate_from_frequencies(top_20_word_freq)
+
+    # Save word cloud image
+    plt.figure(figsize=(10, 5), facecolor='white')
+    plt.imshow(wordcloud, interpolation='bilinear')
+
+    plt.axis('off')
+    plt.tight_layout(pad=0)
+    plt.savefig(f"{save_words_prefix}_word_cloud.png", format='png', dpi=300)
+    plt.close()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=config.WORDCLOUD_WORKERS,
+            initializer=_init_worker,
+            initargs=(config.STOP_WORDS_FILE, config.CUSTOM_WORDS),
+        )
+    return _executor
+
+
+def executor_busy() -> bool:
+    """
+    进程池中未完成的任务数是否已达到上限
+    """
+    return _executor_semaphore is not None and _executor_semaphore.locked()
+
+
+async def run_in_executor(func: Callable, *args):
+    """
+    在进程池中执行函数，未完成的任务数达到 WORDCLOUD_MAX_PENDING_TASKS 时等待
+    Args:
+        func: 模块级函数（需要可以被 pickle）
+        *args:
+
+    Returns:
+
+    """
+    global _executor_semaphore
+    if _executor_semaphore is None:
+        _executor_semaphore = asyncio.Semaphore(config.WORDCLOUD_MAX_PENDING_TASKS)
+    async with _executor_semaphore:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), func, *args)
+
+
+def shutdown_executor():
+    global _executor, _executor_semaphore
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    _executor = None
+    _executor_semaphore = None
+
 
 class AsyncWordCloudGenerator:
+    # 所有生成器实例，程序退出时通过 flush_all 统一保存词频并生成词云
+    _instances: List["AsyncWordCloudGenerator"] = []
+
     def __init__(self):
-        logging.getLogger('jieba').setLevel(logging.WARNING)
         self.stop_words_file = config.STOP_WORDS_FILE
         self.lock = asyncio.Lock()
         self.stop_words = self.load_stop_words()
         self.custom_words = config.CUSTOM_WORDS
-        for word, group in self.custom_words.items():
-            jieba.add_word(word)
+        # 增量模式下每个词云文件前缀的累计词频、等待分词的文本、有新数据未落盘的前缀、上次生成词云的时间
+        self.word_freqs: Dict[str, Counter] = {}
+        self.pending_texts: Dict[str, List[str]] = {}
+        self.dirty_prefixes = set()
+        self.last_render_time: Dict[str, float] = {}
+        self._drain_task: Optional[asyncio.Task] = None
+        AsyncWordCloudGenerator._instances.append(self)
 
     def load_stop_words(self):
-        with open(self.stop_words_file, 'r', encoding='utf-8') as f:
-            return set(f.read().strip().split('\n'))
+        return load_stop_words(self.stop_words_file)
 
-    async def generate_word_frequency_and_cloud(self, data, save_words_prefix):
-        all_text = ' '.join(item['content'] for item in data)
-        words = [word for word in jieba.lcut(all_text) if word not in self.stop_words and len(word.strip()) > 0]
-        word_freq = Counter(words)
+    async def count_words(self, texts: List[str]) -> Counter:
+        """
+        在进程池中分词并统计词频，文本较多时拆分给多个子进程并行分词
+        Args:
+            texts:
 
-        # Save word frequency to file
+        Returns:
+
+        """
+        if not texts:
+            return Counter()
+        chunk_size = max(MIN_TEXTS_PER_CHUNK, math.ceil(len(texts) / config.WORDCLOUD_WORKERS))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        word_freq = Counter()
+        for chunk_word_freq in await asyncio.gather(*[run_in_executor(_count_words, chunk) for chunk in chunks]):
+            word_freq.update(chunk_word_freq)
+        return word_freq
+
+    async def load_word_freq(self, save_words_prefix) -> Counter:
+        """
+        读取之前保存的词频文件，程序重启后可以在已有词频上继续累加
+        Args:
+            save_words_prefix:
+
+        Returns:
+
+        """
+        freq_file = f"{save_words_prefix}_word_freq.json"
+        if not os.path.exists(freq_file):
+            return Counter()
+        try:
+            async with aiofiles.open(freq_file, 'r', encoding='utf-8') as file:
+                return Counter(json.loads(await file.read()))
+        except Exception as e:
+            utils.logger.error(f"[AsyncWordCloudGenerator.load_word_freq] load {freq_file} error: {e}")
+            return Counter()
+
+    async def save_word_freq(self, word_freq, save_words_prefix):
         freq_file = f"{save_words_prefix}_word_freq.json"
         async with aiofiles.open(freq_file, 'w', encoding='utf-8') as file:
             await file.write(json.dumps(word_freq, ensure_ascii=False, indent=4))
 
-        # Try to acquire the plot lock without waiting
-        if plot_lock.locked():
-            utils.logger.info("Skipping word cloud generation as the lock is held.")
+    async def add_items(self, data, save_words_prefix):
+        """
+        增量模式：新增的记录放入待分词队列后立即返回，由后台任务在进程池中分词并累加到该前缀的词频中；
+        词频文件和词云图按 WORDCLOUD_RENDER_INTERVAL 间隔刷新，程序退出时由 flush_all 做最后一次刷新
+        Args:
+            data: 新增的评论列表
+            save_words_prefix: 词频/词云文件前缀
+
+        Returns:
+
+        """
+        texts = [item['content'] for item in data if isinstance(item.get('content'), str)]
+        if not texts:
+            return
+        async with self.lock:
+            if save_words_prefix not in self.word_freqs:
+                self.word_freqs[save_words_prefix] = await self.load_word_freq(save_words_prefix)
+                self.last_render_time[save_words_prefix] = time.monotonic()
+        self.pending_texts.setdefault(save_words_prefix, []).extend(texts)
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        """
+        后台任务：把积压的文本按前缀合并成一批提交到进程池分词，到了刷新间隔时保存词频并生成词云
+        """
+        while self.pending_texts:
+            pending_texts, self.pending_texts = self.pending_texts, {}
+            for save_words_prefix, texts in pending_texts.items():
+                try:
+                    self.word_freqs[save_words_prefix].update(await self.count_words(texts))
+                    self.dirty_prefixes.add(save_words_prefix)
+                    if time.monotonic() - self.last_render_time[save_words_prefix] >= config.WORDCLOUD_RENDER_INTERVAL:
+                        await self.flush(save_words_prefix)
+                except Exception as e:
+                    utils.logger.error(f"[AsyncWordCloudGenerator._drain] count words of {save_words_prefix} error: {e}")
+
+    async def flush(self, save_words_prefix, wait_plot: bool = False):
+        """
+        保存某个前缀的词频文件并生成词云图
+        Args:
+            save_words_prefix:
+            wait_plot: 进程池繁忙时是否等待，False 时跳过本次生成，留到下次刷新
+
+        Returns:
+
+        """
+        async with self.lock:
+            if save_words_prefix not in self.dirty_prefixes:
+                return
+            self.dirty_prefixes.discard(save_words_prefix)
+            self.last_render_time[save_words_prefix] = time.monotonic()
+            word_freq = Counter(self.word_freqs[save_words_prefix])
+        await self.save_word_freq(word_freq, save_words_prefix)
+        if not wait_plot and executor_busy():
+            utils.logger.info("Skipping word cloud generation as the process pool is busy.")
+            self.dirty_prefixes.add(save_words_prefix)
+            return
+        await self.generate_word_cloud(word_freq, save_words_prefix)
+
+    @classmethod
+    async def flush_all(cls):
+        """
+        程序退出时处理完积压的文本，保存所有未落盘的词频并生成词云图，最后关闭进程池
+        Returns:
+
+        """
+        for generator in cls._instances:
+            try:
+                if generator._drain_task is not None:
+                    await generator._drain_task
+                await generator._drain()
+            except Exception as e:
+                utils.logger.error(f"[AsyncWordCloudGenerator.flush_all] count words error: {e}")
+            for save_words_prefix in list(generator.dirty_prefixes):
+                try:
+                    await generator.flush(save_words_prefix, wait_plot=True)
+                except Exception as e:
+                    utils.logger.error(f"[AsyncWordCloudGenerator.flush_all] generate {save_words_prefix} error: {e}")
+        shutdown_executor()
+
+    async def generate_word_frequency_and_cloud(self, data, save_words_prefix):
+        """
+        全量模式：对传入的全部数据重新分词并生成词云，数据量大时请使用增量模式 add_items
+        """
+        word_freq = await self.count_words([item['content'] for item in data if isinstance(item.get('content'), str)])
+
+        # Save word frequency to file
+        await self.save_word_freq(word_freq, save_words_prefix)
+
+        if executor_busy():
+            utils.logger.info("Skipping word cloud generation as the process pool is busy.")
             return
 
         await self.generate_word_cloud(word_freq, save_words_prefix)
 
     async def generate_word_cloud(self, word_freq, save_words_prefix):
-        await plot_lock.acquire()
-        top_20_word_freq = {word: freq for word, freq in
-                            sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:20]}
-        wordcloud = WordCloud(
-            font_path=config.FONT_PATH,
-            width=800,
-            height=400,
-            background_color='white',
-            max_words=200,
-            stopwords=self.stop_words,
-            colormap='viridis',
-            contour_color='steelblue',
-            contour_width=1
-        ).generate_from_frequencies(top_20_word_freq)
-
-        # Save word cloud image
-        plt.figure(figsize=(10, 5), facecolor='white')
-        plt.imshow(wordcloud, interpolation='bilinear')
-
-        plt.axis('off')
-        plt.tight_layout(pad=0)
-        plt.savefig(f"{save_words_prefix}_word_cloud.png", format='png', dpi=300)
-        plt.close()
-
-        plot_lock.release()
\ No newline at end of file
+        await run_in_executor(_render_word_cloud, dict(word_freq), save_words_prefix, config.FONT_PATH)